@@ -80,4 +80,24 @@ class GradeRecordAdmin(admin.ModelAdmin):
 @admin.register(Semester)
 class SemesterAdmin(admin.ModelAdmin):
     list_display = ('semester', 'start_date', 'end_date')
-    list_filter = ('semester', 'start_date', 'end_date')
\ No newline at end of file
+    list_filter = ('semester', 'start_date', 'end_date')
+
+
+@admin.register(LectureWaitlistEntry)
+class LectureWaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ("student", "lecture", "status", "created_at")
+    list_filter = ("status",)
+    list_select_related = ("student", "lecture")
+
+
+@admin.register(CourseCompletion)
+class CourseCompletionAdmin(admin.ModelAdmin):
+    list_display = ("student", "course", "passed")
+    list_filter = ("passed",)
+    list_select_related = ("student", "course")
+
+
+@admin.register(AcademicSummary)
+class AcademicSummaryAdmin(admin.ModelAdmin):
+    list_display = ("student", "gpa", "total_credits", "updated_at")
+    list_select_related = ("student",)
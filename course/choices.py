@@ -9,4 +9,27 @@ DAYS_OF_WEEK = [
     (5, _("პარასკევი")),
     (6, _("შაბათი")),
     (7, _("კვირა")),
-]
\ No newline at end of file
+]
+
+WAITLIST_STATUSES = [
+    (1, _("მოლოდინში")),
+    (2, _("ჩაირიცხა")),
+    (3, _("გაუქმდა")),
+]
+
+SYLLABUS_JOB_STATUSES = [
+    (1, _("მოლოდინში")),
+    (2, _("ვერ შეიქმნა")),
+]
+
+SYLLABUS_BATCH_STATUSES = [
+    (1, _("მოლოდინში")),
+    (2, _("ვერ შეიქმნა")),
+    (3, _("მზადაა")),
+]
+
+
+FINAL_EXAM_NAMES = ["დასკვნითი გამოცდა", "Final Exam"]
+BACHELOR_THESIS_NAMES = ["საბაკალავრო ნაშრომი", "Bachelor Thesis"]
+MASTER_THESIS_NAMES = ["სამაგისტრო ნაშრომი", "Master Thesis"]
+THESIS_NAMES = BACHELOR_THESIS_NAMES + MASTER_THESIS_NAMES
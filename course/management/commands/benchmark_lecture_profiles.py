@@ -0,0 +1,98 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from course.models import Department, Course, Lecture
+from course.serilalizers import LectureDisplaySerializer, \
+    LectureCompactProfile
+from user.models import User
+
+
+def _best_of(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+class Command(BaseCommand):
+    help = ("Compare rendering the lecture list with the nested "
+            "LectureDisplaySerializer and with the compact profile. "
+            "The lectures are generated in a transaction "
+            "that is rolled back.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lectures",
+            type=int,
+            default=200,
+            help="Number of generated lectures."
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Number of runs, the best one is reported."
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            department = Department.objects.create(
+                name="Benchmark",
+                code="BENCH"
+            )
+            professor = User.objects.create_user(
+                "Benchmark",
+                "Professor",
+                "benchmark.professor@example.com",
+                None,
+                username="benchmark_professor",
+                role=2
+            )
+            courses = []
+            for i in range(20):
+                course = Course.objects.create(
+                    name=f"Benchmark {i}",
+                    code=f"BENCH{i:04}",
+                    department=department
+                )
+                if courses:
+                    course.prerequisites.add(courses[-1])
+                courses.append(course)
+            lectures = Lecture.objects.bulk_create([
+                Lecture(
+                    name=f"Benchmark {i}",
+                    course=courses[i % len(courses)],
+                    professor=professor,
+                    uni_year=1,
+                    capacity=10
+                ) for i in range(options["lectures"])
+            ])
+            queryset = Lecture.objects.filter(
+                pk__in=[lecture.pk for lecture in lectures]
+            ).prefetch_related(
+                "resources",
+                "professor",
+                "professor__department",
+                "course",
+                "course__department",
+                "course__prerequisites",
+                "course__prerequisites__prerequisites",
+            )
+            full = _best_of(
+                lambda: LectureDisplaySerializer(queryset.all(), many=True)
+                .data,
+                options["repeat"]
+            )
+            compact = _best_of(
+                lambda: list(LectureCompactProfile.values(queryset.all())),
+                options["repeat"]
+            )
+            transaction.set_rollback(True)
+        self.stdout.write(
+            f"{options['lectures']} lectures: "
+            f"nested {full * 1000:.1f} ms, "
+            f"compact {compact * 1000:.1f} ms, "
+            f"{full / compact:.1f}x faster"
+        )
@@ -0,0 +1,93 @@
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import tempfile
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from course.utils.pdf_renderers import RENDERERS
+from course.utils.syllabus_generator import SyllabusGenerator
+
+
+def _benchmark(backend, data, documents, results):
+    """
+    Render the syllabus with the backend in a separate process,
+    so the peak RSS of every backend is measured on its own.
+    Renderers that start child processes (wkhtmltopdf) are
+    measured by the peak RSS of their children.
+    """
+    try:
+        generator = SyllabusGenerator(data)
+        timings = []
+        with tempfile.TemporaryDirectory() as directory:
+            # The first document pays the renderer setup
+            for i in range(documents + 1):
+                output_path = os.path.join(directory, f"{i}.pdf")
+                started = time.perf_counter()
+                result = generator.generate_syllabus(output_path, backend)
+                timings.append(time.perf_counter() - started)
+                if isinstance(result, dict):
+                    raise RuntimeError(result["error"])
+        own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        results.put({
+            "backend": backend,
+            "first_ms": timings[0] * 1000,
+            "mean_ms": statistics.mean(timings[1:]) * 1000,
+            "p95_ms": sorted(timings[1:])[int(len(timings[1:]) * 0.95) - 1]
+            * 1000,
+            # ru_maxrss is in kilobytes on Linux
+            "peak_rss_mb": max(own, children) / 1024,
+        })
+    except Exception as e:
+        results.put({"backend": backend, "error": str(e)})
+
+
+class Command(BaseCommand):
+    help = ("Compare the per-document latency and the peak RSS "
+            "of the syllabus PDF renderers.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--backend",
+            action="append",
+            choices=list(RENDERERS),
+            help="Renderer to benchmark, all of them by default."
+        )
+        parser.add_argument(
+            "--documents",
+            type=int,
+            default=20,
+            help="Number of documents rendered per backend."
+        )
+        parser.add_argument(
+            "--data",
+            default=settings.BASE_DIR / "test_syllabus.json",
+            help="Syllabus data to render."
+        )
+
+    def handle(self, *args, **options):
+        with open(options["data"]) as file:
+            data = json.load(file)
+        results = multiprocessing.Queue()
+        for backend in options["backend"] or RENDERERS:
+            process = multiprocessing.Process(
+                target=_benchmark,
+                args=(backend, data, options["documents"], results)
+            )
+            process.start()
+            result = results.get()
+            process.join()
+            if "error" in result:
+                self.stdout.write(self.style.WARNING(
+                    f"{backend}: skipped ({result['error']})"
+                ))
+                continue
+            self.stdout.write(
+                f"{backend}: first {result['first_ms']:.0f} ms, "
+                f"mean {result['mean_ms']:.0f} ms, "
+                f"p95 {result['p95_ms']:.0f} ms, "
+                f"peak RSS {result['peak_rss_mb']:.0f} MB"
+            )
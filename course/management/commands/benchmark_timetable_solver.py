@@ -0,0 +1,101 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from course.utils.timetable_solver import TimetableSolver
+
+
+def synthetic_university(size, seed=0):
+    """
+    Generate the lectures, auditoriums and course students of
+    a university with the given number of lectures.
+    The students of a program's year take most of their courses
+    from that year, and one elective from anywhere.
+    :return: (lectures, auditoriums, cohorts)
+    """
+    generator = random.Random(seed)
+    courses = max(size * 2 // 3, 1)
+    professors = max(size // 3, 1)
+    years = 4
+    programs = max(courses // (years * 6), 1)
+
+    lectures = []
+    for index in range(size):
+        course = index % courses
+        lectures.append({
+            "course": course,
+            "professor": generator.randrange(professors),
+            "capacity": generator.choice([20, 30, 30, 40, 40, 60, 60, 90]),
+            "needs_computers": generator.random() < 0.15,
+        })
+
+    # 30 periods a week, the auditoriums are used 75% of the time
+    auditoriums = []
+    for room in range(max(size // 22 + 1, 2)):
+        auditoriums.append((
+            room,
+            generator.choice([30, 40, 60, 60, 120]) if room else 120,
+            generator.random() < 0.25 or room == 1,
+        ))
+    # Every lecture fits at least one auditorium with computers
+    auditoriums.append((len(auditoriums), 120, True))
+
+    cohorts = {course: set() for course in range(courses)}
+    student = 0
+    for program in range(programs):
+        for year in range(years):
+            pool = [
+                course for course in range(courses)
+                if course % (programs * years) == program * years + year
+            ]
+            if not pool:
+                continue
+            for _ in range(30):
+                taken = generator.sample(pool, min(len(pool), 5))
+                taken.append(generator.randrange(courses))
+                for course in taken:
+                    cohorts[course].add(student)
+                student += 1
+    return lectures, auditoriums, cohorts
+
+
+class Command(BaseCommand):
+    help = ("Measure the timetable solver on synthetic universities "
+            "of increasing size.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[100, 500, 1000, 2000, 4000],
+            help="Numbers of lectures of the universities."
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Seed of the generated universities."
+        )
+
+    def handle(self, *args, **options):
+        for size in options["sizes"]:
+            lectures, auditoriums, cohorts = synthetic_university(
+                size,
+                options["seed"]
+            )
+            greedy = TimetableSolver(
+                lectures,
+                auditoriums,
+                cohorts,
+                iterations=0
+            ).solve()
+            started = time.perf_counter()
+            result = TimetableSolver(lectures, auditoriums, cohorts).solve()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{size} lectures, {len(auditoriums)} auditoriums: "
+                f"{elapsed:.2f} s, "
+                f"{len(result['unscheduled'])} unscheduled, "
+                f"{greedy['clashes']} student clashes greedy, "
+                f"{result['clashes']} after {result['moves']} moves"
+            )
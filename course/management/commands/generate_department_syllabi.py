@@ -0,0 +1,62 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from course.models import Department
+from course.utils.syllabus_batch import SyllabusBatch
+
+
+class Command(BaseCommand):
+    help = ("Generate the syllabi of a department's lectures, or of the "
+            "given syllabus data, into one zip.")
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument(
+            "--department",
+            type=int,
+            help="Department whose current semester lectures are used."
+        )
+        source.add_argument(
+            "--payloads",
+            help="JSON file with a list of syllabus data."
+        )
+        parser.add_argument(
+            "--output",
+            help="Path of the zip, a new file under the media root "
+                 "by default."
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Number of render processes, the number of CPUs by default."
+        )
+
+    def handle(self, *args, **options):
+        if options["department"] is not None:
+            department = Department.objects.filter(
+                pk=options["department"]
+            ).first()
+            if department is None:
+                raise CommandError("Department not found")
+            batch = SyllabusBatch.from_department(
+                department,
+                workers=options["workers"]
+            )
+        else:
+            with open(options["payloads"]) as file:
+                payloads = json.load(file)
+            if not isinstance(payloads, list):
+                raise CommandError("The payloads file must have a list")
+            batch = SyllabusBatch.from_payloads(
+                payloads,
+                workers=options["workers"]
+            )
+        result = batch.run(options["output"])
+        for error in result["errors"]:
+            self.stdout.write(self.style.WARNING(
+                f"#{error['index']} {error['course_code'] or ''}: "
+                f"{error['error']}"
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['rendered']} syllabi written to {result['path']}, "
+            f"{result['failed']} failed"
+        ))
@@ -0,0 +1,60 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from course.models import Semester
+from course.serilalizers import TimetableSerializer
+from utils.helpers import get_semester
+
+
+class Command(BaseCommand):
+    help = ("Assign a day, a time slot and an auditorium to the given "
+            "lectures of a semester and create them.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "lectures",
+            help="JSON file with a list of lectures (name, course, "
+                 "professor, uni_year, capacity, needs_computers)."
+        )
+        parser.add_argument(
+            "--semester",
+            type=int,
+            help="Semester of the lectures, the current one by default."
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Print the schedule without creating the lectures."
+        )
+
+    def handle(self, *args, **options):
+        if options["semester"] is not None:
+            semester = Semester.objects.filter(pk=options["semester"]).first()
+        else:
+            semester = get_semester()
+        if semester is None:
+            raise CommandError("Semester not found")
+        with open(options["lectures"]) as file:
+            lectures = json.load(file)
+        serializer = TimetableSerializer(data={
+            "semester": semester.pk,
+            "lectures": lectures,
+            "dry_run": options["dry_run"],
+        })
+        if not serializer.is_valid():
+            raise CommandError(json.dumps(serializer.errors))
+        result = serializer.save()
+        if options["dry_run"]:
+            self.stdout.write(json.dumps(result["schedule"], indent=2))
+        for lecture in result["unscheduled"]:
+            self.stdout.write(self.style.WARNING(
+                f"{lecture['name']}: no free slot and auditorium"
+            ))
+        for error in result["errors"]:
+            self.stdout.write(self.style.WARNING(
+                f"#{error['row']}: {json.dumps(error['errors'])}"
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(result['schedule'])} lectures scheduled, "
+            f"{result['created']} created, "
+            f"{result['clashes']} student clashes"
+        ))
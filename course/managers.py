@@ -1,6 +1,7 @@
-from django.db import models
-from django.db.models import Q
-from django.db.models.aggregates import Sum
+from collections import defaultdict
+from django.db import models, transaction
+from django.db.models import F, Q, OuterRef, Subquery
+from django.db.models.aggregates import Count, Sum
 
 
 class CourseManager(models.Manager):
@@ -9,60 +10,337 @@ class CourseManager(models.Manager):
     missing prerequisites and failed prerequisites.
     """
     @staticmethod
-    def find_missing_prerequisites(course_instance, request):
+    def find_unmet_prerequisites(course_instance, student):
         """
-        This method finds the missing prerequisites for the user.
+        This method finds the prerequisites (including the indirect ones)
+        that the student has not completed or has failed.
+        It reads the prerequisite closure and the student's course
+        completion index in one query.
         :param course_instance: Course instance
-        :param request: Request
-        :return: QuerySet
+        :param student: User instance
+        :return: Tuple of missing and failed prerequisite names
         """
-        if course_instance.prerequisites.exists():
-            missing_prerequisites = (
-                course_instance.prerequisites.exclude(users=request.user)
+        from .models import PrerequisiteClosure, CourseCompletion
+        prerequisites = PrerequisiteClosure.objects.filter(
+            course=course_instance
+        ).annotate(
+            passed=Subquery(
+                CourseCompletion.objects.filter(
+                    student=student,
+                    course=OuterRef("prerequisite")
+                ).values("passed")[:1]
             )
-            return missing_prerequisites
+        ).values_list("prerequisite__name", "passed")
+        missing_prerequisites = []
+        failed_prerequisites = []
+        for name, passed in prerequisites:
+            if passed is None:
+                missing_prerequisites.append(name)
+            elif not passed:
+                failed_prerequisites.append(name)
+        return missing_prerequisites, failed_prerequisites
+
+
+class PrerequisiteClosureManager(models.Manager):
+    """
+    This manager class is responsible for keeping the transitive
+    closure of the course prerequisites up to date.
+    """
+    def rebuild(self, course_ids=None):
+        """
+        This method recalculates the closure rows of the given courses
+        and of every course that depends on them.
+        :param course_ids: Course ids, or None to rebuild everything
+        """
+        from .models import Course
+        edges = defaultdict(set)
+        for course_id, prerequisite_id in (
+                Course.prerequisites.through.objects.values_list(
+                    "from_course_id",
+                    "to_course_id"
+                )
+        ):
+            edges[course_id].add(prerequisite_id)
+
+        if course_ids is None:
+            course_ids = set(Course.objects.values_list("id", flat=True))
         else:
-            return None
+            course_ids = set(course_ids) | set(
+                self.filter(
+                    prerequisite_id__in=course_ids
+                ).values_list("course_id", flat=True)
+            )
+
+        rows = []
+        for course_id in course_ids:
+            depths = {}
+            frontier = edges[course_id]
+            depth = 1
+            while frontier:
+                frontier = {
+                    prerequisite_id for prerequisite_id in frontier
+                    if prerequisite_id not in depths and
+                    prerequisite_id != course_id
+                }
+                for prerequisite_id in frontier:
+                    depths[prerequisite_id] = depth
+                frontier = set().union(
+                    *(edges[prerequisite_id] for prerequisite_id in frontier)
+                )
+                depth += 1
+            rows.extend(
+                self.model(
+                    course_id=course_id,
+                    prerequisite_id=prerequisite_id,
+                    depth=depth
+                ) for prerequisite_id, depth in depths.items()
+            )
+
+        with transaction.atomic():
+            self.filter(course_id__in=course_ids).delete()
+            self.bulk_create(rows)
+
+
+class CourseCompletionManager(models.Manager):
+    """
+    This manager class is responsible for keeping the per-student
+    course completion index in sync with the grade records.
+    """
+    def refresh(self, student_id, course_id):
+        """
+        This method recalculates whether the student has passed the course.
+        A course is passed if any of its grade records is not failed.
+        :param student_id: User id
+        :param course_id: Course id
+        """
+        from .models import GradeRecord
+        records = GradeRecord.objects.filter(
+            student_id=student_id,
+            lecture__course_id=course_id
+        ).aggregate(
+            total=Count("id"),
+            passed=Count("id", filter=Q(failed=False))
+        )
+        if not records["total"]:
+            self.filter(student_id=student_id, course_id=course_id).delete()
+            return
+        self.update_or_create(
+            student_id=student_id,
+            course_id=course_id,
+            defaults={"passed": records["passed"] > 0}
+        )
+
+    def refresh_many(self, pairs):
+        """
+        This method recalculates the completion of many students
+        and courses with one grouped query. It is used when the
+        grade records are written in bulk and no signals are sent.
+        :param pairs: Iterable of (student id, course id) tuples
+        """
+        from .models import GradeRecord
+        pairs = set(pairs)
+        if not pairs:
+            return
+        records = GradeRecord.objects.filter(
+            student_id__in={student_id for student_id, _ in pairs},
+            lecture__course_id__in={course_id for _, course_id in pairs}
+        ).values(
+            "student_id",
+            "lecture__course_id"
+        ).annotate(
+            passed=Count("id", filter=Q(failed=False))
+        )
+        passed = {
+            (item["student_id"], item["lecture__course_id"]): item["passed"]
+            for item in records
+        }
+        passed = {pair: value for pair, value in passed.items() if pair in pairs}
+        removed = pairs - passed.keys()
+        with transaction.atomic():
+            if removed:
+                condition = Q()
+                for student_id, course_id in removed:
+                    condition |= Q(student_id=student_id, course_id=course_id)
+                self.filter(condition).delete()
+            self.bulk_create(
+                [
+                    self.model(
+                        student_id=student_id,
+                        course_id=course_id,
+                        passed=value > 0
+                    ) for (student_id, course_id), value in passed.items()
+                ],
+                update_conflicts=True,
+                unique_fields=["student", "course"],
+                update_fields=["passed"]
+            )
+
 
+class CourseGradeTotalManager(models.Manager):
+    """
+    This manager class is responsible for keeping the per-course
+    grade totals of the students up to date.
+    """
     @staticmethod
-    def find_failed_prerequisites(course_instance, request):
+    def _grade_point(total_grade):
+        from .utils.grade_calculator import GradeCalculator
+        return GradeCalculator.calculate_subject_grade_point(
+            total_grade
+        )["grade_point"]
+
+    def refresh(self, student_id, course_id):
         """
-        This method finds the failed prerequisites for the user.
-        :param course_instance: Course instance
-        :param request: Request
-        :return: QuerySet
+        This method recalculates the student's total grade for the course.
+        :param student_id: User id
+        :param course_id: Course id
         """
         from .models import Grade
-        if course_instance.prerequisites.exists():
-            prerequisite_grades = Grade.objects.filter(
-                student=request.user,
-                assignment__lecture__course__in=course_instance
-                .prerequisites
-                .all()
-            ).values(
-                "assignment__lecture__course__name"
-            ).annotate(
-                total_grade=Sum("grade"),
-                final_exam_grade=Sum(
-                    "grade",
-                    filter=Q(assignment__name="დასკვნითი გამოცდა")
-                )
+        total_grade = Grade.objects.filter(
+            student_id=student_id,
+            assignment__lecture__course_id=course_id
+        ).aggregate(total_grade=Sum("grade"))["total_grade"]
+        if total_grade is None:
+            self.filter(student_id=student_id, course_id=course_id).delete()
+            return
+        self.update_or_create(
+            student_id=student_id,
+            course_id=course_id,
+            defaults={
+                "total_grade": total_grade,
+                "grade_point": self._grade_point(total_grade)
+            }
+        )
+
+    def refresh_many(self, pairs):
+        """
+        This method recalculates the total grades of many students
+        and courses with one grouped query. It is used when the
+        grades are written in bulk and no signals are sent.
+        :param pairs: Iterable of (student id, course id) tuples
+        """
+        from .models import Grade
+        pairs = set(pairs)
+        if not pairs:
+            return
+        totals = Grade.objects.filter(
+            student_id__in={student_id for student_id, _ in pairs},
+            assignment__lecture__course_id__in={
+                course_id for _, course_id in pairs
+            }
+        ).values(
+            "student_id",
+            "assignment__lecture__course_id"
+        ).annotate(total_grade=Sum("grade"))
+        totals = {
+            (item["student_id"], item["assignment__lecture__course_id"]):
+                item["total_grade"]
+            for item in totals
+        }
+        totals = {pair: total for pair, total in totals.items() if pair in pairs}
+        removed = pairs - totals.keys()
+        with transaction.atomic():
+            if removed:
+                condition = Q()
+                for student_id, course_id in removed:
+                    condition |= Q(student_id=student_id, course_id=course_id)
+                self.filter(condition).delete()
+            self.bulk_create(
+                [
+                    self.model(
+                        student_id=student_id,
+                        course_id=course_id,
+                        total_grade=total_grade,
+                        grade_point=self._grade_point(total_grade)
+                    ) for (student_id, course_id), total_grade in totals.items()
+                ],
+                update_conflicts=True,
+                unique_fields=["student", "course"],
+                update_fields=["total_grade", "grade_point"]
+            )
+
+    def rebuild(self, student_id):
+        """
+        This method recalculates every course total of the student
+        with one grouped query.
+        :param student_id: User id
+        """
+        from .models import Grade
+        totals = Grade.objects.filter(
+            student_id=student_id,
+            assignment__isnull=False
+        ).values(
+            "assignment__lecture__course"
+        ).annotate(total_grade=Sum("grade"))
+        with transaction.atomic():
+            self.filter(student_id=student_id).delete()
+            self.bulk_create([
+                self.model(
+                    student_id=student_id,
+                    course_id=item["assignment__lecture__course"],
+                    total_grade=item["total_grade"],
+                    grade_point=self._grade_point(item["total_grade"])
+                ) for item in totals
+            ])
+
+
+class AcademicSummaryManager(models.Manager):
+    """
+    This manager class is responsible for keeping the students'
+    GPA and total credits up to date from their course totals.
+    """
+    def refresh(self, student_ids):
+        """
+        This method recalculates the summaries of the given students
+        with one grouped query over their course totals.
+        Only the courses the student is registered for are counted.
+        :param student_ids: User ids
+        """
+        from .models import CourseGradeTotal
+        totals = {
+            item["student"]: item for item in CourseGradeTotal.objects.filter(
+                student_id__in=student_ids,
+                course__users=F("student")
+            ).values("student").annotate(
+                grade_points=Sum(F("grade_point") * F("course__credits")),
+                total_credits=Sum("course__credits")
             )
-            if prerequisite_grades.exists():
-                failed_prerequisites = prerequisite_grades.filter(
-                    Q(
-                        final_exam_grade__lt=18
-                    ) | Q(
-                        final_exam_grade=None
-                    ) | Q(
-                        total_grade__lt=41
-                    )
+        }
+        summaries = []
+        for student_id in student_ids:
+            item = totals.get(student_id)
+            gpa = 0
+            total_credits = 0
+            if item and item["total_credits"]:
+                total_credits = item["total_credits"]
+                gpa = round(item["grade_points"] / total_credits, 2)
+            summaries.append(
+                self.model(
+                    student_id=student_id,
+                    gpa=gpa,
+                    total_credits=total_credits
                 )
-                return failed_prerequisites
-            else:
-                return False
-        else:
-            return None
+            )
+        self.bulk_create(
+            summaries,
+            update_conflicts=True,
+            unique_fields=["student"],
+            update_fields=["gpa", "total_credits", "updated_at"]
+        )
+
+    def for_student(self, student):
+        """
+        This method returns the student's summary, building it
+        from the grades if it doesn't exist yet.
+        :param student: User instance
+        :return: AcademicSummary instance
+        """
+        summary = self.filter(student=student).first()
+        if summary is None:
+            from .models import CourseGradeTotal
+            CourseGradeTotal.objects.rebuild(student.pk)
+            self.refresh([student.pk])
+            summary = self.get(student=student)
+        return summary
 
 
 class LectureManager(models.Manager):
@@ -70,35 +348,34 @@ class LectureManager(models.Manager):
     This manager class is responsible for finding the chosen
     lectures and overlapping lectures.
     """
-    def get_chosen_lectures(self, request):
+    def get_chosen_lectures(self, user):
         from utils.helpers import get_semester
         """
         This method finds the chosen lectures for the user.
-        :param request: Request instance
+        :param user: User instance
         :return: QuerySet
         """
         semester = get_semester()
         chosen_lectures = self.filter(
-            users=request.user,
+            users=user,
             semester=semester
         )
         return chosen_lectures
 
-    def get_overlapping_lectures(self, lecture_instance, request):
+    def get_overlapping_lectures(self, lecture_instance, user):
         """
         This method finds the overlapping lectures for the user.
         :param lecture_instance: Lecture instance
-        :param request: Request
+        :param user: User instance
         :return: QuerySet
         """
-        chosen_lectures = self.get_chosen_lectures(request)
+        chosen_lectures = self.get_chosen_lectures(user)
         overlapping_lectures = chosen_lectures.filter(
             Q(
                 start_time__lt=lecture_instance.end_time
             ) & Q(
                 end_time__gt=lecture_instance.start_time
             ),
-            day=lecture_instance.day,
-            users=request.user
+            day=lecture_instance.day
         ).exclude(id=lecture_instance.id)
         return overlapping_lectures
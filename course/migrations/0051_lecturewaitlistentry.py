@@ -0,0 +1,32 @@
+# Generated by Django 5.1.4 on 2026-10-17 10:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0050_assignmentsubmission'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LectureWaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='შეიქმნა')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='განახლდა')),
+                ('status', models.PositiveSmallIntegerField(choices=[(1, 'მოლოდინში'), (2, 'ჩაირიცხა'), (3, 'გაუქმდა')], default=1, verbose_name='სტატუსი')),
+                ('lecture', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='course.lecture', verbose_name='ლექცია')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to=settings.AUTH_USER_MODEL, verbose_name='სტუდენტი')),
+            ],
+            options={
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['lecture', 'status', 'created_at'], name='waitlist_lecture_status_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 1)), fields=('student', 'lecture'), name='unique_pending_waitlist_entry')],
+            },
+        ),
+    ]
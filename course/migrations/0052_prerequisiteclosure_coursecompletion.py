@@ -0,0 +1,77 @@
+# Generated by Django 5.1.4 on 2026-10-17 20:17
+
+import django.db.models.deletion
+from collections import defaultdict
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_closure_and_completions(apps, schema_editor):
+    Course = apps.get_model('course', 'Course')
+    GradeRecord = apps.get_model('course', 'GradeRecord')
+    PrerequisiteClosure = apps.get_model('course', 'PrerequisiteClosure')
+    CourseCompletion = apps.get_model('course', 'CourseCompletion')
+
+    edges = defaultdict(set)
+    for course_id, prerequisite_id in Course.prerequisites.through.objects.values_list('from_course_id', 'to_course_id'):
+        edges[course_id].add(prerequisite_id)
+    closure = []
+    for course_id in Course.objects.values_list('id', flat=True):
+        depths = {}
+        frontier = edges[course_id]
+        depth = 1
+        while frontier:
+            frontier = {p for p in frontier if p not in depths and p != course_id}
+            for prerequisite_id in frontier:
+                depths[prerequisite_id] = depth
+            frontier = set().union(*(edges[p] for p in frontier))
+            depth += 1
+        closure.extend(
+            PrerequisiteClosure(course_id=course_id, prerequisite_id=p, depth=d)
+            for p, d in depths.items()
+        )
+    PrerequisiteClosure.objects.bulk_create(closure)
+
+    passed = {}
+    for student_id, course_id, failed in GradeRecord.objects.values_list('student_id', 'lecture__course_id', 'failed'):
+        passed[(student_id, course_id)] = passed.get((student_id, course_id), False) or not failed
+    CourseCompletion.objects.bulk_create(
+        CourseCompletion(student_id=student_id, course_id=course_id, passed=value)
+        for (student_id, course_id), value in passed.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0051_lecturewaitlistentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseCompletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('passed', models.BooleanField(default=False, verbose_name='ჩააბარა')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='completions', to='course.course', verbose_name='კურსი')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_completions', to=settings.AUTH_USER_MODEL, verbose_name='სტუდენტი')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('student', 'course'), name='unique_course_completion')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PrerequisiteClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField(default=1, verbose_name='სიღრმე')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prerequisite_closure', to='course.course', verbose_name='კურსი')),
+                ('prerequisite', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dependent_closure', to='course.course', verbose_name='პრერეკვიზიტი')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('course', 'prerequisite'), name='unique_prerequisite_closure')],
+            },
+        ),
+        migrations.RunPython(populate_closure_and_completions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.1.4 on 2026-10-17 20:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Sum
+
+
+def grade_point(total_grade):
+    if 90 <= total_grade <= 100:
+        return 4
+    if 80 <= total_grade < 90:
+        return 3
+    if 70 <= total_grade < 80:
+        return 2
+    if 60 <= total_grade < 70:
+        return 1
+    return 0
+
+
+def populate_academic_summaries(apps, schema_editor):
+    Grade = apps.get_model('course', 'Grade')
+    CourseGradeTotal = apps.get_model('course', 'CourseGradeTotal')
+    AcademicSummary = apps.get_model('course', 'AcademicSummary')
+
+    totals = Grade.objects.filter(assignment__isnull=False).values(
+        'student_id', 'assignment__lecture__course_id'
+    ).annotate(total_grade=Sum('grade'))
+    CourseGradeTotal.objects.bulk_create(
+        CourseGradeTotal(
+            student_id=item['student_id'],
+            course_id=item['assignment__lecture__course_id'],
+            total_grade=item['total_grade'],
+            grade_point=grade_point(item['total_grade']),
+        ) for item in totals
+    )
+    summaries = CourseGradeTotal.objects.filter(
+        course__users=F('student')
+    ).values('student_id').annotate(
+        grade_points=Sum(F('grade_point') * F('course__credits')),
+        total_credits=Sum('course__credits'),
+    )
+    AcademicSummary.objects.bulk_create(
+        AcademicSummary(
+            student_id=item['student_id'],
+            gpa=round(item['grade_points'] / item['total_credits'], 2) if item['total_credits'] else 0,
+            total_credits=item['total_credits'] or 0,
+        ) for item in summaries
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0052_prerequisiteclosure_coursecompletion'),
+        ('user', '0023_alter_user_government_scholarship'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AcademicSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gpa', models.DecimalField(decimal_places=2, default=0, max_digits=3, verbose_name='GPA')),
+                ('total_credits', models.PositiveIntegerField(default=0, verbose_name='კრედიტები')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='განახლდა')),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='academic_summary', to=settings.AUTH_USER_MODEL, verbose_name='სტუდენტი')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CourseGradeTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_grade', models.DecimalField(decimal_places=2, max_digits=6, verbose_name='ჯამური ქულა')),
+                ('grade_point', models.DecimalField(decimal_places=2, max_digits=3, verbose_name='შეფასების ქულა')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grade_totals', to='course.course', verbose_name='კურსი')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_grade_totals', to=settings.AUTH_USER_MODEL, verbose_name='სტუდენტი')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('student', 'course'), name='unique_course_grade_total')],
+            },
+        ),
+        migrations.RunPython(populate_academic_summaries, migrations.RunPython.noop),
+    ]
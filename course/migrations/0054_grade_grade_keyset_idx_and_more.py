@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-17 20:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0053_coursegradetotal_academicsummary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='grade',
+            index=models.Index(fields=['created_at', 'id'], name='grade_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='graderecord',
+            index=models.Index(fields=['created_at', 'id'], name='graderecord_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-17 21:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0054_grade_grade_keyset_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lecture',
+            index=models.Index(fields=['semester', 'day', 'location', 'start_time'], name='lecture_location_slot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lecture',
+            index=models.Index(fields=['semester', 'day', 'professor', 'start_time'], name='lecture_professor_slot_idx'),
+        ),
+    ]
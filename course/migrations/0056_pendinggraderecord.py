@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-17 21:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0055_lecture_slot_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingGradeRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='შეიქმნა')),
+                ('lecture', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_grade_records', to='course.lecture', verbose_name='ლექცია')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_grade_records', to=settings.AUTH_USER_MODEL, verbose_name='სტუდენტი')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('student', 'lecture'), name='unique_pending_grade_record')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.4 on 2026-10-17 21:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0056_pendinggraderecord'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyllabusJobState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='შეიქმნა')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='განახლდა')),
+                ('job_id', models.CharField(max_length=64, unique=True, verbose_name='დავალების id')),
+                ('status', models.PositiveSmallIntegerField(choices=[(1, 'მოლოდინში'), (2, 'ვერ შეიქმნა')], default=1, verbose_name='სტატუსი')),
+                ('error', models.TextField(blank=True, default='', verbose_name='შეცდომა')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
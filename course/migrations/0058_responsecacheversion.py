@@ -0,0 +1,22 @@
+# Generated by Django 5.1.4 on 2026-10-17 21:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0057_syllabusjobstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResponseCacheVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('namespace', models.CharField(max_length=50, unique=True, verbose_name='სახელების სივრცე')),
+                ('stamp', models.CharField(max_length=32, verbose_name='ვერსია')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='განახლდა')),
+            ],
+        ),
+    ]
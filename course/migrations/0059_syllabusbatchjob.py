@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-17 22:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0058_responsecacheversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyllabusBatchJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='შეიქმნა')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='განახლდა')),
+                ('batch_id', models.CharField(max_length=32, unique=True, verbose_name='პაკეტის id')),
+                ('status', models.PositiveSmallIntegerField(choices=[(1, 'მოლოდინში'), (2, 'ვერ შეიქმნა'), (3, 'მზადაა')], default=1, verbose_name='სტატუსი')),
+                ('items', models.JSONField(default=list, verbose_name='სილაბუსები')),
+                ('errors', models.JSONField(default=list, verbose_name='შეცდომები')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='შედეგი')),
+                ('error', models.TextField(blank=True, default='', verbose_name='შეცდომა')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -1,8 +1,16 @@
 import datetime
 from django.db import models
 from django.utils.translation import gettext_lazy as _
-from course.choices import DAYS_OF_WEEK
-from course.managers import CourseManager, LectureManager
+from course.choices import DAYS_OF_WEEK, WAITLIST_STATUSES, \
+    SYLLABUS_JOB_STATUSES, SYLLABUS_BATCH_STATUSES
+from course.managers import (
+    CourseManager,
+    LectureManager,
+    PrerequisiteClosureManager,
+    CourseCompletionManager,
+    CourseGradeTotalManager,
+    AcademicSummaryManager
+)
 
 
 class TimestampedModel(models.Model):
@@ -184,6 +192,19 @@ class Lecture(TimestampedModel):
 
     objects = LectureManager()
 
+    class Meta:
+        indexes = [
+            # Auditorium and professor conflicts, see ScheduleConflicts
+            models.Index(
+                fields=["semester", "day", "location", "start_time"],
+                name="lecture_location_slot_idx"
+            ),
+            models.Index(
+                fields=["semester", "day", "professor", "start_time"],
+                name="lecture_professor_slot_idx"
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -210,6 +231,15 @@ class Grade(TimestampedModel):
         null=True
     )
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the grade list
+            models.Index(
+                fields=["created_at", "id"],
+                name="grade_keyset_idx"
+            ),
+        ]
+
     def __str__(self):
         return f"{self.grade}"
 
@@ -324,6 +354,15 @@ class GradeRecord(TimestampedModel):
         default=True
     )
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the grade record list
+            models.Index(
+                fields=["created_at", "id"],
+                name="graderecord_keyset_idx"
+            ),
+        ]
+
     def __str__(self):
         return f"{self.student} - {self.lecture} - {self.grade}"
 
@@ -380,3 +419,323 @@ class AssignmentSubmission(TimestampedModel):
         upload_to="assignment_submissions/",
         verbose_name=_("ფაილი")
     )
+
+
+class LectureWaitlistEntry(TimestampedModel):
+    """
+    LectureWaitlistEntry model for students waiting
+    for a free seat in a full lecture.
+    Pending entries are served in FIFO order.
+    """
+    student = models.ForeignKey(
+        "user.User",
+        on_delete=models.CASCADE,
+        related_name="waitlist_entries",
+        verbose_name=_("სტუდენტი")
+    )
+    lecture = models.ForeignKey(
+        "course.Lecture",
+        on_delete=models.CASCADE,
+        related_name="waitlist_entries",
+        verbose_name=_("ლექცია")
+    )
+    status = models.PositiveSmallIntegerField(
+        choices=WAITLIST_STATUSES,
+        default=1,
+        verbose_name=_("სტატუსი")
+    )
+
+    class Meta:
+        ordering = ["created_at", "id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "lecture"],
+                condition=models.Q(status=1),
+                name="unique_pending_waitlist_entry"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["lecture", "status", "created_at"],
+                name="waitlist_lecture_status_idx"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.student} - {self.lecture} - {self.status}"
+
+
+class PrerequisiteClosure(models.Model):
+    """
+    PrerequisiteClosure model which stores every direct and
+    indirect prerequisite of a course.
+    It is rebuilt whenever Course.prerequisites changes.
+    """
+    course = models.ForeignKey(
+        "course.Course",
+        on_delete=models.CASCADE,
+        related_name="prerequisite_closure",
+        verbose_name=_("კურსი")
+    )
+    prerequisite = models.ForeignKey(
+        "course.Course",
+        on_delete=models.CASCADE,
+        related_name="dependent_closure",
+        verbose_name=_("პრერეკვიზიტი")
+    )
+    depth = models.PositiveSmallIntegerField(
+        verbose_name=_("სიღრმე"),
+        default=1
+    )
+
+    objects = PrerequisiteClosureManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["course", "prerequisite"],
+                name="unique_prerequisite_closure"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.course} - {self.prerequisite}"
+
+
+class CourseCompletion(models.Model):
+    """
+    CourseCompletion model which indexes the courses
+    a student has a grade record for and whether
+    the student has passed them.
+    It is kept in sync with GradeRecord.
+    """
+    student = models.ForeignKey(
+        "user.User",
+        on_delete=models.CASCADE,
+        related_name="course_completions",
+        verbose_name=_("სტუდენტი")
+    )
+    course = models.ForeignKey(
+        "course.Course",
+        on_delete=models.CASCADE,
+        related_name="completions",
+        verbose_name=_("კურსი")
+    )
+    passed = models.BooleanField(
+        verbose_name=_("ჩააბარა"),
+        default=False
+    )
+
+    objects = CourseCompletionManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "course"],
+                name="unique_course_completion"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.student} - {self.course} - {self.passed}"
+
+
+class CourseGradeTotal(models.Model):
+    """
+    CourseGradeTotal model which stores the total grade
+    and grade point of a student in a course.
+    It is kept in sync with Grade.
+    """
+    student = models.ForeignKey(
+        "user.User",
+        on_delete=models.CASCADE,
+        related_name="course_grade_totals",
+        verbose_name=_("სტუდენტი")
+    )
+    course = models.ForeignKey(
+        "course.Course",
+        on_delete=models.CASCADE,
+        related_name="grade_totals",
+        verbose_name=_("კურსი")
+    )
+    total_grade = models.DecimalField(
+        max_digits=6,
+        decimal_places=2,
+        verbose_name=_("ჯამური ქულა")
+    )
+    grade_point = models.DecimalField(
+        max_digits=3,
+        decimal_places=2,
+        verbose_name=_("შეფასების ქულა")
+    )
+
+    objects = CourseGradeTotalManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "course"],
+                name="unique_course_grade_total"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.student} - {self.course} - {self.total_grade}"
+
+
+class AcademicSummary(models.Model):
+    """
+    AcademicSummary model which stores the GPA and total credits
+    of a student, so the profile doesn't recalculate them.
+    """
+    student = models.OneToOneField(
+        "user.User",
+        on_delete=models.CASCADE,
+        related_name="academic_summary",
+        verbose_name=_("სტუდენტი")
+    )
+    gpa = models.DecimalField(
+        max_digits=3,
+        decimal_places=2,
+        default=0,
+        verbose_name=_("GPA")
+    )
+    total_credits = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("კრედიტები")
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_("განახლდა")
+    )
+
+    objects = AcademicSummaryManager()
+
+    def __str__(self):
+        return f"{self.student} - {self.gpa}"
+
+
+class PendingGradeRecord(models.Model):
+    """
+    PendingGradeRecord model which marks a (student, lecture) pair
+    whose grade record recalculation is waiting in the queue.
+    It is kept in the database, so the web processes and the workers
+    see the same marks.
+    """
+    student = models.ForeignKey(
+        "user.User",
+        on_delete=models.CASCADE,
+        related_name="pending_grade_records",
+        verbose_name=_("სტუდენტი")
+    )
+    lecture = models.ForeignKey(
+        "course.Lecture",
+        on_delete=models.CASCADE,
+        related_name="pending_grade_records",
+        verbose_name=_("ლექცია")
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name=_("შეიქმნა")
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "lecture"],
+                name="unique_pending_grade_record"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.student} - {self.lecture}"
+
+
+class SyllabusJobState(TimestampedModel):
+    """
+    SyllabusJobState model which stores the state of a pending
+    or failed syllabus render, so the web processes and the workers
+    see the same state. Generated syllabi are known by their file.
+    """
+    job_id = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name=_("დავალების id")
+    )
+    status = models.PositiveSmallIntegerField(
+        choices=SYLLABUS_JOB_STATUSES,
+        default=1,
+        verbose_name=_("სტატუსი")
+    )
+    error = models.TextField(
+        blank=True,
+        default="",
+        verbose_name=_("შეცდომა")
+    )
+
+    def __str__(self):
+        return f"{self.job_id} - {self.status}"
+
+
+class SyllabusBatchJob(TimestampedModel):
+    """
+    SyllabusBatchJob model which stores a batch of syllabi
+    rendered by the Celery workers (see SyllabusBatch.start).
+    The status view only reports the batches recorded here.
+    """
+    batch_id = models.CharField(
+        max_length=32,
+        unique=True,
+        verbose_name=_("პაკეტის id")
+    )
+    status = models.PositiveSmallIntegerField(
+        choices=SYLLABUS_BATCH_STATUSES,
+        default=1,
+        verbose_name=_("სტატუსი")
+    )
+    items = models.JSONField(
+        default=list,
+        verbose_name=_("სილაბუსები")
+    )
+    errors = models.JSONField(
+        default=list,
+        verbose_name=_("შეცდომები")
+    )
+    result = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name=_("შედეგი")
+    )
+    error = models.TextField(
+        blank=True,
+        default="",
+        verbose_name=_("შეცდომა")
+    )
+
+    def __str__(self):
+        return f"{self.batch_id} - {self.status}"
+
+
+class ResponseCacheVersion(models.Model):
+    """
+    ResponseCacheVersion model which stores the version stamp of
+    a cached response namespace (see utils.response_cache).
+    It is kept in the database, so a bump in one process
+    invalidates the responses cached by every other process.
+    """
+    namespace = models.CharField(
+        max_length=50,
+        unique=True,
+        verbose_name=_("სახელების სივრცე")
+    )
+    stamp = models.CharField(
+        max_length=32,
+        verbose_name=_("ვერსია")
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_("განახლდა")
+    )
+
+    def __str__(self):
+        return f"{self.namespace} - {self.stamp}"
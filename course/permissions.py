@@ -63,6 +63,16 @@ class IsManagement(BasePermission):
         return request.user.role == 4 or request.user.role == 3
 
 
+class IsStudent(BasePermission):
+    """
+    This permission class checks if the user is a student.
+    """
+    def has_permission(self, request, view):
+        if not request.user.is_authenticated:
+            return False
+        return request.user.role == 1
+
+
 class IsThisLecturesProfessor(BasePermission):
     """
     This permission class checks if the user is the professor of
@@ -1,2 +1,3 @@
 from .model_serializers import *
-from .registering_serializers import *
\ No newline at end of file
+from .registering_serializers import *
+from .compact_serializers import *
@@ -0,0 +1,51 @@
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Trim
+
+
+class LectureCompactProfile:
+    """
+    This class is used to render lectures in the compact profile
+    (?view=compact) of the lecture list.
+
+    Instead of the nested LectureDisplaySerializer, it selects
+    flat ids and a few denormalized names with values(),
+    so no model instances or serializer fields are built.
+    """
+    fields = [
+        "id",
+        "name",
+        "day",
+        "start_time",
+        "end_time",
+        "capacity",
+        "uni_year",
+        "course",
+        "professor",
+        "location",
+        "semester",
+    ]
+    annotations = {
+        "course_name": F("course__name"),
+        "course_code": F("course__code"),
+        "course_credits": F("course__credits"),
+        "professor_name": Trim(Concat(
+            "professor__first_name",
+            Value(" "),
+            "professor__last_name"
+        )),
+    }
+
+    @classmethod
+    def values(cls, queryset):
+        """
+        This method turns the lecture queryset into the compact rows.
+        :param queryset: Lecture queryset
+        :return: Queryset of dictionaries
+        """
+        if not queryset.ordered:
+            # Keep the pages stable
+            queryset = queryset.order_by("pk")
+        return queryset.prefetch_related(None).values(
+            *cls.fields,
+            **cls.annotations
+        )
@@ -1,11 +1,44 @@
+import csv
+import io
+from decimal import Decimal
+from django.db import transaction
 from rest_framework import serializers
 from course.models import *
 from user.models import User
 from utils.helpers import get_semester
-from user.tasks import add_grade_record
+from course.choices import FINAL_EXAM_NAMES, THESIS_NAMES
+from course.utils.grade_record_dispatcher import GradeRecordDispatcher
+from course.utils.schedule_conflicts import ScheduleConflicts
+from course.utils.timetable_solver import TimetableSolver
+from utils.response_cache import response_cache
+
+
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    This field takes the objects from the "preloaded" context
+    ({model: {pk: object}}) when they are there, so validating
+    many rows doesn't query every relation of every row.
+    """
+    def to_internal_value(self, data):
+        preloaded = self.context.get("preloaded", {}).get(
+            self.get_queryset().model
+        )
+        if preloaded and not isinstance(data, bool):
+            try:
+                return preloaded[int(data)]
+            except (KeyError, TypeError, ValueError):
+                pass
+        return super().to_internal_value(data)
 
 
 class LectureModificationSerializer(serializers.ModelSerializer):
+    """
+    This class is used to create and update lectures.
+    The auditorium and professor conflicts are found by ScheduleConflicts,
+    given in the context when many lectures are validated at once.
+    """
+    serializer_related_field = PreloadedPrimaryKeyRelatedField
+
     class Meta:
         model = Lecture
         fields = "__all__"
@@ -14,52 +47,218 @@ class LectureModificationSerializer(serializers.ModelSerializer):
             "updated_at": {"read_only": True}
         }
 
-        def validate(self, data):
-            auditorium = data["location"]
-            start_time = data["start_time"]
-            end_time = data["end_time"]
-            capacity = data["capacity"]
-            professor = data["professor"]
-            day = data["day"]
-            semester = get_semester()
-
-            if Lecture.objects.filter(
-                    location=auditorium,
-                    start_time__lt=end_time,
-                    end_time__gt=start_time,
-                    day=day,
-                    semester=semester
-            ).exists():
-                raise serializers.ValidationError(
-                    "This auditorium is already reserved."
-                )
+    def _value(self, data, name):
+        """
+        This method returns the new value of the field,
+        or the current one if a partial update doesn't change it.
+        """
+        if name in data:
+            return data[name]
+        return getattr(self.instance, name, None)
 
-            if start_time >= end_time:
-                raise serializers.ValidationError(
-                    "Start time must be before the end time."
-                )
+    def validate(self, data):
+        auditorium = self._value(data, "location")
+        start_time = self._value(data, "start_time")
+        end_time = self._value(data, "end_time")
+        capacity = self._value(data, "capacity")
+        professor = self._value(data, "professor")
+        day = self._value(data, "day")
+        semester = self._value(data, "semester") or get_semester()
+
+        if start_time is not None and end_time is not None and \
+                start_time >= end_time:
+            raise serializers.ValidationError(
+                "Start time must be before the end time."
+            )
 
-            if auditorium.capacity < capacity:
-                raise serializers.ValidationError(
-                    "Auditorium capacity is not enough."
-                )
+        if auditorium is not None and capacity is not None and \
+                auditorium.capacity < capacity:
+            raise serializers.ValidationError(
+                "Auditorium capacity is not enough."
+            )
 
-            if not professor.role == 2:
-                raise serializers.ValidationError(
-                    "This user is not a professor."
+        if professor is not None and not professor.role == 2:
+            raise serializers.ValidationError(
+                "This user is not a professor."
+            )
+
+        if start_time is not None and end_time is not None:
+            conflicts = self.context.get("conflicts") or \
+                ScheduleConflicts(semester)
+            errors = conflicts.check(
+                {
+                    "day": day,
+                    "start_time": start_time,
+                    "end_time": end_time,
+                    "location": auditorium,
+                    "professor": professor,
+                },
+                exclude=getattr(self.instance, "pk", None)
+            )
+            if errors:
+                raise serializers.ValidationError(errors)
+
+        return data
+
+
+class BulkLectureSerializer(serializers.Serializer):
+    """
+    This class is used to import the timetable of a semester.
+
+    The semester's lectures are loaded once into the interval indexes
+    of ScheduleConflicts, and every valid lecture is added to them,
+    so the lectures are checked against the timetable and each other
+    without a conflict query per lecture.
+    Valid lectures are saved, invalid ones are reported with their errors.
+    """
+    semester = serializers.PrimaryKeyRelatedField(
+        queryset=Semester.objects.all()
+    )
+    lectures = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False
+    )
+
+    @staticmethod
+    def _preload(rows):
+        """
+        This method fetches the courses, auditoriums and professors
+        of all the rows at once.
+        :return: Dictionary of model to {pk: object}
+        """
+        related = {"course": Course, "location": Auditorium, "professor": User}
+        preloaded = {}
+        for name, model in related.items():
+            ids = set()
+            for row in rows:
+                try:
+                    ids.add(int(row.get(name)))
+                except (TypeError, ValueError):
+                    continue
+            preloaded[model] = model.objects.in_bulk(ids)
+        return preloaded
+
+    def validate(self, data):
+        conflicts = ScheduleConflicts(data["semester"]).preload()
+        preloaded = self._preload(data["lectures"])
+        preloaded[Semester] = {data["semester"].pk: data["semester"]}
+        # One serializer validates all the rows, so its fields
+        # are built once
+        row_serializer = LectureModificationSerializer(context={
+            **self.context,
+            "conflicts": conflicts,
+            "preloaded": preloaded
+        })
+        valid_rows = []
+        errors = []
+        for number, row in enumerate(data["lectures"], start=1):
+            try:
+                lecture = row_serializer.run_validation(
+                    {**row, "semester": data["semester"].pk}
                 )
+            except serializers.ValidationError as e:
+                errors.append({
+                    "row": number,
+                    "errors": serializers.as_serializer_error(e)
+                })
+                continue
+            if lecture.get("start_time") is not None and \
+                    lecture.get("end_time") is not None:
+                conflicts.add(lecture)
+            valid_rows.append(lecture)
+        data["rows"] = valid_rows
+        data["errors"] = errors
+        return data
 
-            if professor.lectures.filter(
-                    semester=semester,
-                    start_time__lt=end_time,
-                    end_time__gt=start_time,
-                    day=day
-            ).exists():
-                raise serializers.ValidationError(
-                    "This professor already has a lecture."
+    def create(self, validated_data):
+        """
+        The lectures are inserted at once, and since bulk inserts don't
+        send signals, the cached lecture responses are invalidated here.
+        """
+        rows = validated_data["rows"]
+        with transaction.atomic():
+            lectures = Lecture.objects.bulk_create([
+                Lecture(**{
+                    name: value for name, value in row.items()
+                    if name != "resources"
+                }) for row in rows
+            ])
+            Lecture.resources.through.objects.bulk_create([
+                Lecture.resources.through(
+                    lecture_id=lecture.pk,
+                    resource_id=resource.pk
                 )
+                for lecture, row in zip(lectures, rows)
+                for resource in row.get("resources", [])
+            ])
+        if lectures:
+            response_cache.bump("lecture", "course", "user")
+        return {"created": len(lectures), "errors": validated_data["errors"]}
 
-            return data
+
+class TimetableLectureSerializer(serializers.Serializer):
+    """
+    This class is used to validate a lecture to be scheduled.
+    Lectures don't store whether they need computers,
+    so it is given with every lecture.
+    """
+    name = serializers.CharField(max_length=50)
+    course = serializers.IntegerField()
+    professor = serializers.IntegerField(required=False, allow_null=True)
+    uni_year = serializers.IntegerField(min_value=0)
+    capacity = serializers.IntegerField(min_value=1, default=30)
+    needs_computers = serializers.BooleanField(default=False)
+
+
+class TimetableSerializer(serializers.Serializer):
+    """
+    This class is used to schedule the lectures of a semester.
+
+    TimetableSolver assigns a day, a time slot and an auditorium to
+    every lecture, then the schedule is validated and bulk-created
+    by BulkLectureSerializer, unless it is a dry run.
+    """
+    semester = serializers.PrimaryKeyRelatedField(
+        queryset=Semester.objects.all()
+    )
+    lectures = serializers.ListField(
+        child=TimetableLectureSerializer(),
+        allow_empty=False
+    )
+    dry_run = serializers.BooleanField(default=False)
+
+    def create(self, validated_data):
+        semester = validated_data["semester"]
+        lectures = validated_data["lectures"]
+        result = TimetableSolver.for_semester(semester, lectures).solve()
+        schedule = [
+            {
+                **{
+                    name: value for name, value in lecture.items()
+                    if name != "needs_computers"
+                },
+                "start_time": lecture["start_time"].isoformat(),
+                "end_time": lecture["end_time"].isoformat(),
+            }
+            for lecture in result["schedule"]
+        ]
+        response = {
+            "created": 0,
+            "schedule": schedule,
+            "unscheduled": [
+                lectures[index] for index in result["unscheduled"]
+            ],
+            "clashes": result["clashes"],
+            "errors": [],
+        }
+        if not validated_data["dry_run"] and schedule:
+            bulk = BulkLectureSerializer(
+                data={"semester": semester.pk, "lectures": schedule},
+                context=self.context
+            )
+            bulk.is_valid(raise_exception=True)
+            response.update(bulk.save())
+        return response
 
 
 class DepartmentSerializer(serializers.ModelSerializer):
@@ -294,41 +493,171 @@ class GradeModificationSerializer(serializers.ModelSerializer):
         """
         If the assignment is a final exam or a bachelor's thesis, then
         the grade record will be added to the queue.
+        The recalculation is enqueued after the transaction commits.
         """
         assignment = validated_data.get("assignment")
         student = validated_data.get("student")
         created = super().create(validated_data)
-        if assignment.name in [
-            "დასკვნითი გამოცდა",
-            "საბაკალავრო ნაშრომი",
-            "სამაგისტრო ნაშრომი",
-            "Final Exam",
-            "Bachelor Thesis",
-            "Master Thesis"
-        ]:
-            add_grade_record.delay(student.pk, assignment.lecture.pk)
+        if assignment.name in FINAL_EXAM_NAMES + THESIS_NAMES:
+            GradeRecordDispatcher.schedule(student.pk, assignment.lecture_id)
         return created
 
     def update(self, instance, validated_data):
         """
         If the assignment is a final exam or a bachelor's thesis, then
         the grade record will be added to the queue.
+        The recalculation is enqueued after the transaction commits.
         """
         updated = super().update(instance, validated_data)
         assignment = validated_data.get("assignment")
         student = validated_data.get("student")
-        if assignment.name in [
-            "დასკვნითი გამოცდა",
-            "საბაკალავრო ნაშრომი",
-            "სამაგისტრო ნაშრომი",
-            "Final Exam",
-            "Bachelor Thesis",
-            "Master Thesis"
-        ]:
-            add_grade_record.delay(student.pk, assignment.lecture.pk)
+        if assignment.name in FINAL_EXAM_NAMES + THESIS_NAMES:
+            GradeRecordDispatcher.schedule(student.pk, assignment.lecture_id)
         return updated
 
 
+class BulkGradeRowSerializer(serializers.Serializer):
+    """
+    This class is used to validate one row of the bulk grading.
+    """
+    student = serializers.IntegerField()
+    grade = serializers.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        min_value=Decimal(0)
+    )
+
+
+class BulkGradeSerializer(serializers.Serializer):
+    """
+    This class is used to grade many students for one assignment.
+
+    The rows are given as a "grades" list of {"student", "grade"}
+    objects or as a CSV file with "student" and "grade" columns.
+    Every row is checked against the lecture roster and the assignment
+    max points fetched once, so the number of queries doesn't
+    depend on the number of rows.
+    Valid rows are saved, invalid ones are reported with their errors.
+    """
+    assignment = serializers.PrimaryKeyRelatedField(
+        queryset=Assignment.objects.select_related("lecture")
+    )
+    grades = serializers.ListField(
+        child=serializers.DictField(),
+        required=False,
+        allow_empty=False
+    )
+    file = serializers.FileField(required=False)
+
+    def validate_assignment(self, assignment):
+        user = self.context["request"].user
+        if user.role == 2 and assignment.lecture.professor_id != user.pk:
+            raise serializers.ValidationError(
+                "You are not the professor of this lecture."
+            )
+        return assignment
+
+    @staticmethod
+    def _read_csv(file):
+        """
+        This method reads the rows of the uploaded CSV file.
+        :param file: Uploaded file
+        :return: List of dictionaries
+        """
+        try:
+            content = file.read().decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise serializers.ValidationError(
+                {"file": "The file must be UTF-8 encoded."}
+            )
+        reader = csv.DictReader(io.StringIO(content))
+        if not {"student", "grade"} <= set(reader.fieldnames or []):
+            raise serializers.ValidationError(
+                {"file": "The file must have student and grade columns."}
+            )
+        return list(reader)
+
+    def validate(self, data):
+        if "grades" in data:
+            rows = data["grades"]
+        elif "file" in data:
+            rows = self._read_csv(data["file"])
+        else:
+            raise serializers.ValidationError(
+                "Either grades or file is required."
+            )
+        assignment = data["assignment"]
+        roster = set(
+            assignment.lecture.users.filter(
+                role=1
+            ).values_list("pk", flat=True)
+        )
+        graded = set(
+            Grade.objects.filter(
+                assignment=assignment
+            ).values_list("student_id", flat=True)
+        )
+
+        valid_rows = []
+        errors = []
+        seen = set()
+        for number, row in enumerate(rows, start=1):
+            row_serializer = BulkGradeRowSerializer(data=row)
+            if not row_serializer.is_valid():
+                errors.append({"row": number, "errors": row_serializer.errors})
+                continue
+            student = row_serializer.validated_data["student"]
+            grade = row_serializer.validated_data["grade"]
+            if student not in roster:
+                row_errors = ["This student is not in this lecture."]
+            elif student in graded or student in seen:
+                row_errors = ["This student is already graded."]
+            elif grade > assignment.max_points:
+                row_errors = ["Grade cannot be higher than the max points."]
+            else:
+                seen.add(student)
+                valid_rows.append(row_serializer.validated_data)
+                continue
+            errors.append({"row": number, "student": student,
+                           "errors": row_errors})
+
+        data["rows"] = valid_rows
+        data["errors"] = errors
+        return data
+
+    def create(self, validated_data):
+        """
+        The grades are inserted at once, and since bulk inserts don't
+        send signals, the course totals and summaries are refreshed here.
+        If the assignment is a final exam or a thesis, the grade records
+        of all the students are recalculated in one task.
+        """
+        assignment = validated_data["assignment"]
+        course_id = assignment.lecture.course_id
+        with transaction.atomic():
+            grades = Grade.objects.bulk_create([
+                Grade(
+                    student_id=row["student"],
+                    assignment=assignment,
+                    grade=row["grade"]
+                ) for row in validated_data["rows"]
+            ])
+            student_ids = [grade.student_id for grade in grades]
+            if student_ids:
+                CourseGradeTotal.objects.refresh_many(
+                    (student_id, course_id) for student_id in student_ids
+                )
+                AcademicSummary.objects.refresh(student_ids)
+            if assignment.name in FINAL_EXAM_NAMES + THESIS_NAMES:
+                with GradeRecordDispatcher.batch():
+                    for student_id in student_ids:
+                        GradeRecordDispatcher.schedule(
+                            student_id,
+                            assignment.lecture_id
+                        )
+        return {"created": len(grades), "errors": validated_data["errors"]}
+
+
 class AuditoriumSerializer(serializers.ModelSerializer):
     """
     This class is used to serialize the Auditorium model.
@@ -1,5 +1,9 @@
+from django.db import transaction
 from rest_framework import serializers
-from course.models import Lecture, Course, GradeRecord
+from course.models import Course, LectureWaitlistEntry
+from course.tasks import process_lecture_waitlist
+from course.utils.registration_eligibility import RegistrationEligibility
+from course.utils.seat_reservation import SeatReservation
 from payment.models import Payment
 from payment.utils import PaymentCalculator
 
@@ -24,40 +28,23 @@ class RegisterCourseSerializer(serializers.Serializer):
                 "Only students are allowed to register the course"
             )
 
-        missing_prerequisites = (
-            Course.objects.find_missing_prerequisites(course, request)
+        missing_prerequisites, failed_prerequisites = (
+            Course.objects.find_unmet_prerequisites(course, request.user)
         )
 
-        if missing_prerequisites is not None:
-            if missing_prerequisites.exists():
-                raise serializers.ValidationError(
-                    f"You can't register the course because "
-                    f"you have not completed the following "
-                    f"prerequisites: {", ".join(
-                        missing_prerequisites.values_list(
-                            "name", flat=True
-                        )
-                    )}")
-
-        failed_prerequisites = (
-            Course.objects.find_failed_prerequisites(course, request)
-        )
-
-        if failed_prerequisites is not None:
-            if failed_prerequisites is False:
-                raise serializers.ValidationError(
-                    "You have not received the appropriate grades in "
-                    "prerequisites."
-                )
+        if missing_prerequisites:
+            raise serializers.ValidationError(
+                f"You can't register the course because "
+                f"you have not completed the following "
+                f"prerequisites: {", ".join(missing_prerequisites)}"
+            )
 
-            if failed_prerequisites.exists():
-                raise serializers.ValidationError(
-                    f"You can't register the course because you have failed "
-                    f"the following prerequisites: {", ".join(
-                        failed_prerequisites.values_list(
-                            "assignment__lecture__course__name", flat=True
-                        )
-                    )}")
+        if failed_prerequisites:
+            raise serializers.ValidationError(
+                f"You can't register the course because you have failed "
+                f"the following prerequisites: "
+                f"{", ".join(failed_prerequisites)}"
+            )
         return data
 
     def create(self, validated_data):
@@ -84,97 +71,78 @@ class RegisterLectureSerializer(serializers.Serializer):
     validating the lecture registration.
     """
     lecture_id = serializers.IntegerField()
+    waitlist = serializers.BooleanField(default=False)
 
     def validate(self, data):
         request = self.context["request"]
         lecture_id = data.get("lecture_id")
 
-        try:
-            lecture = Lecture.objects.get(id=lecture_id)
-        except Lecture.DoesNotExist:
+        verdict = RegistrationEligibility(request.user).evaluate(lecture_id)
+        if verdict is None:
             raise serializers.ValidationError("Lecture not found")
 
-        if request.user.role != 1:
+        if not verdict.is_student:
             raise serializers.ValidationError(
                 "Only students are allowed to register the course"
             )
 
-        if lecture.capacity == 0 and request.user not in lecture.users.all():
-            raise serializers.ValidationError(
-                "You can't register the lecture because it is full"
-            )
+        if verdict.is_full:
+            if not data.get("waitlist"):
+                raise serializers.ValidationError(
+                    "You can't register the lecture because it is full"
+                )
+            if verdict.is_waitlisted:
+                raise serializers.ValidationError(
+                    "You are already in the waitlist of this lecture"
+                )
 
-        print(request.user.loan)
-        if request.user.loan > 0:
-            print(request.user.loan)
+        if verdict.has_loan:
             raise serializers.ValidationError(
                 "You can't register the lecture because "
                 "you have not payed the fee"
             )
 
-        if request.user not in lecture.course.users.all():
+        if not verdict.is_course_registered:
             raise serializers.ValidationError(
                 "You can't register the lecture because "
                 "you have not registered the course"
             )
 
-        overlapping_lectures = (
-            Lecture.objects.get_overlapping_lectures(lecture, request)
-        )
-
-        if overlapping_lectures.exists():
+        if verdict.overlapping_lectures:
             raise serializers.ValidationError(
                 "You can't register the lecture because you have overlapping "
-                "lectures: " + ", ".join(
-                    overlapping_lectures.values_list("name", flat=True)
-                )
+                "lectures: " + ", ".join(verdict.overlapping_lectures)
             )
+        data["verdict"] = verdict
         return data
 
     def create(self, validated_data):
         """
         This method registers the lecture for the user.
+        The eligibility verdict from validation is reused
+        instead of fetching the lecture again.
         """
-        lecture_id = validated_data.get("lecture_id")
-        lecture = Lecture.objects.get(id=lecture_id)
+        verdict = validated_data.pop("verdict")
+        lecture = verdict.lecture
         request = self.context["request"]
-        lectures = request.user.lectures
+        reservation = SeatReservation(request.user, lecture)
 
-        if request.user in lecture.users.all():
+        if verdict.is_registered:
             # If the user is already registered for the lecture
-            grade_record = GradeRecord.objects.filter(
+            if reservation.release() and verdict.has_waitlist:
+                # The freed seat goes to the first student in the waitlist
+                transaction.on_commit(
+                    lambda: process_lecture_waitlist.delay(lecture.pk)
+                )
+        elif not reservation.reserve():
+            if not validated_data.get("waitlist"):
+                raise serializers.ValidationError(
+                    "You can't register the lecture because it is full"
+                )
+            entry, _ = LectureWaitlistEntry.objects.get_or_create(
                 student=request.user,
-                lecture__course=lecture.course,
-                is_active=False
-            ).order_by("-created_at")
-            if grade_record.count() > 0:
-                # If the user has already registered for
-                # the course in the past
-                old_lecture = grade_record.first().lecture
-                lectures.add(old_lecture)
-                grade = grade_record.first()
-                grade.is_active = True
-                grade.save()
-            lecture.users.remove(request.user)
-            lecture.capacity += 1
-            lecture.save()
-        else:
-            # If the user is not registered for the lecture
-            duplicate_lecture = lectures.filter(
-                course=lecture.course
-            ).order_by("-created_at")
-            if duplicate_lecture.exists():
-                # If the user has already registered
-                # for the course in the past
-                lectures.remove(duplicate_lecture.first())
-                grade = GradeRecord.objects.filter(
-                    student=request.user,
-                    lecture__course=lecture.course,
-                    is_active=True
-                ).first()
-                grade.is_active = False
-                grade.save()
-            lecture.users.add(request.user)
-            lecture.capacity -= 1
-            lecture.save()
+                lecture=lecture,
+                status=1
+            )
+            validated_data["waitlist_entry"] = entry.pk
         return validated_data
@@ -0,0 +1,311 @@
+from django.db.models.signals import post_save, post_delete, pre_delete, \
+    pre_save, m2m_changed
+from django.dispatch import receiver
+from course.models import Semester, Course, Grade, GradeRecord, \
+    PrerequisiteClosure, CourseCompletion, CourseGradeTotal, \
+    AcademicSummary, Lecture, Department, Faculty, Resource, Assignment
+from user.models import User
+from utils.helpers import semester_resolver
+from utils.response_cache import response_cache
+
+
+@receiver([post_save, post_delete], sender=Semester)
+def invalidate_current_semester(sender, **kwargs):
+    """
+    Drop the memoized current semester whenever a semester changes.
+    """
+    semester_resolver.invalidate()
+
+
+@receiver(m2m_changed, sender=Course.prerequisites.through)
+def rebuild_prerequisite_closure(sender, instance, action, reverse, pk_set,
+                                 **kwargs):
+    """
+    Rebuild the prerequisite closure of the courses whose
+    prerequisites were changed.
+    """
+    if action not in ["post_add", "post_remove", "post_clear"]:
+        return
+    if reverse:
+        # instance is the prerequisite, pk_set are the dependent courses
+        course_ids = pk_set or Course.objects.values_list("id", flat=True)
+    else:
+        course_ids = [instance.pk]
+    PrerequisiteClosure.objects.rebuild(course_ids)
+
+
+@receiver(pre_delete, sender=Course)
+def collect_dependent_courses(sender, instance, **kwargs):
+    """
+    Remember the courses depending on the deleted course,
+    because their closure rows are cascaded away with it.
+    """
+    instance.dependent_course_ids = list(
+        PrerequisiteClosure.objects.filter(
+            prerequisite=instance
+        ).values_list("course_id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Course)
+def rebuild_dependent_closure(sender, instance, **kwargs):
+    """
+    Rebuild the closure of the courses that depended on the deleted course.
+    """
+    dependent_course_ids = getattr(instance, "dependent_course_ids", None)
+    if dependent_course_ids:
+        PrerequisiteClosure.objects.rebuild(dependent_course_ids)
+
+
+@receiver(post_save, sender=Course)
+def refresh_summaries_of_course(sender, instance, created, **kwargs):
+    """
+    Refresh the academic summaries of the students graded in the course,
+    since its credits may have changed.
+    """
+    if created:
+        return
+    student_ids = list(
+        CourseGradeTotal.objects.filter(
+            course=instance
+        ).values_list("student_id", flat=True)
+    )
+    if student_ids:
+        AcademicSummary.objects.refresh(student_ids)
+
+
+@receiver([post_save, post_delete], sender=GradeRecord)
+def refresh_course_completion(sender, instance, **kwargs):
+    """
+    Keep the student's course completion index in sync
+    with their grade records.
+    """
+    course_id = Course.objects.filter(
+        lecture=instance.lecture_id
+    ).values_list("id", flat=True).first()
+    if course_id is not None:
+        CourseCompletion.objects.refresh(instance.student_id, course_id)
+
+
+def _grade_course(grade):
+    """
+    Return the (student id, course id) pair the grade counts for.
+    """
+    course_id = Course.objects.filter(
+        lecture__assignment=grade.assignment_id
+    ).values_list("id", flat=True).first()
+    return grade.student_id, course_id
+
+
+def _refresh_grade_totals(pairs):
+    """
+    Refresh the course totals and the summaries of the given pairs.
+    """
+    pairs = {pair for pair in pairs if pair[1] is not None}
+    for student_id, course_id in pairs:
+        CourseGradeTotal.objects.refresh(student_id, course_id)
+    if pairs:
+        AcademicSummary.objects.refresh(
+            list({student_id for student_id, _ in pairs})
+        )
+
+
+@receiver(pre_save, sender=Grade)
+def remember_previous_grade_course(sender, instance, **kwargs):
+    """
+    Remember the student and course the grade counted for before
+    the update, in case the grade is moved to another student or lecture.
+    """
+    instance.previous_grade_course = None
+    if instance.pk:
+        previous = Grade.objects.filter(pk=instance.pk).values(
+            "student_id",
+            "assignment__lecture__course_id"
+        ).first()
+        if previous:
+            instance.previous_grade_course = (
+                previous["student_id"],
+                previous["assignment__lecture__course_id"]
+            )
+
+
+@receiver(post_save, sender=Grade)
+def refresh_grade_totals_on_save(sender, instance, **kwargs):
+    """
+    Update the student's course total and GPA after a grade is saved.
+    """
+    pairs = [_grade_course(instance)]
+    previous = getattr(instance, "previous_grade_course", None)
+    if previous:
+        pairs.append(previous)
+    _refresh_grade_totals(pairs)
+
+
+@receiver(post_delete, sender=Grade)
+def refresh_grade_totals_on_delete(sender, instance, **kwargs):
+    """
+    Update the student's course total and GPA after a grade is deleted.
+    """
+    _refresh_grade_totals([_grade_course(instance)])
+
+
+@receiver(m2m_changed, sender=User.courses.through)
+def refresh_summary_on_courses_change(sender, instance, action, reverse,
+                                      pk_set, **kwargs):
+    """
+    Refresh the academic summary when the student's courses change,
+    because only the registered courses count towards the GPA.
+    """
+    if action not in ["post_add", "post_remove", "post_clear"]:
+        return
+    if not reverse:
+        student_ids = [instance.pk]
+    elif pk_set:
+        student_ids = list(pk_set)
+    else:
+        student_ids = list(
+            CourseGradeTotal.objects.filter(
+                course=instance
+            ).values_list("student_id", flat=True)
+        )
+    AcademicSummary.objects.refresh(student_ids)
+
+
+def _refresh_moved_grades(grades, records, course_ids):
+    """
+    Refresh the course totals, the summaries and the course completions
+    of the students whose grades moved between the given courses.
+    :param grades: Grade QuerySet that moved
+    :param records: GradeRecord QuerySet that moved
+    :param course_ids: The previous and the new course id
+    """
+    course_ids = [
+        course_id for course_id in course_ids if course_id is not None
+    ]
+    student_ids = set(grades.values_list("student_id", flat=True))
+    CourseGradeTotal.objects.refresh_many(
+        (student_id, course_id)
+        for student_id in student_ids for course_id in course_ids
+    )
+    if student_ids:
+        AcademicSummary.objects.refresh(list(student_ids))
+    for student_id in set(records.values_list("student_id", flat=True)):
+        for course_id in course_ids:
+            CourseCompletion.objects.refresh(student_id, course_id)
+
+
+@receiver(pre_save, sender=Lecture)
+def remember_previous_lecture_course(sender, instance, **kwargs):
+    """
+    Remember the course of the lecture before the update.
+    """
+    instance.previous_course_id = None
+    if instance.pk:
+        instance.previous_course_id = Lecture.objects.filter(
+            pk=instance.pk
+        ).values_list("course_id", flat=True).first()
+
+
+@receiver(post_save, sender=Lecture)
+def refresh_grade_totals_on_lecture_move(sender, instance, **kwargs):
+    """
+    Move the lecture's grades to the new course's totals
+    when the lecture is reassigned to another course.
+    """
+    previous_course_id = getattr(instance, "previous_course_id", None)
+    if previous_course_id is None or \
+            previous_course_id == instance.course_id:
+        return
+    _refresh_moved_grades(
+        Grade.objects.filter(assignment__lecture=instance),
+        GradeRecord.objects.filter(lecture=instance),
+        [previous_course_id, instance.course_id]
+    )
+
+
+@receiver(pre_save, sender=Assignment)
+def remember_previous_assignment_course(sender, instance, **kwargs):
+    """
+    Remember the course of the assignment's lecture before the update.
+    """
+    instance.previous_course_id = None
+    if instance.pk:
+        instance.previous_course_id = Assignment.objects.filter(
+            pk=instance.pk
+        ).values_list("lecture__course_id", flat=True).first()
+
+
+@receiver(post_save, sender=Assignment)
+def refresh_grade_totals_on_assignment_move(sender, instance, **kwargs):
+    """
+    Move the assignment's grades to the new course's totals
+    when the assignment is reassigned to a lecture of another course.
+    """
+    previous_course_id = getattr(instance, "previous_course_id", None)
+    if previous_course_id is None:
+        return
+    course_id = Lecture.objects.filter(
+        pk=instance.lecture_id
+    ).values_list("course_id", flat=True).first()
+    if previous_course_id == course_id:
+        return
+    _refresh_moved_grades(
+        Grade.objects.filter(assignment=instance),
+        GradeRecord.objects.none(),
+        [previous_course_id, course_id]
+    )
+
+
+@receiver([post_save, post_delete], sender=Lecture)
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=Department)
+@receiver([post_save, post_delete], sender=Resource)
+def invalidate_catalog_responses(sender, **kwargs):
+    """
+    Lectures and courses are nested in the lecture, course
+    and user responses.
+    """
+    response_cache.bump("lecture", "course", "user")
+
+
+@receiver([post_save, post_delete], sender=Faculty)
+def invalidate_faculty_responses(sender, **kwargs):
+    response_cache.bump("user")
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_responses(sender, update_fields=None, **kwargs):
+    """
+    Users are listed, and professors are nested in the lectures.
+    Saving only the last login doesn't change any response.
+    """
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    response_cache.bump("lecture", "course", "user")
+
+
+MEMBERSHIP_NAMESPACES = {
+    # The prerequisites are nested in the lecture and course responses
+    Course.prerequisites.through: ["lecture", "course"],
+    # The resources are listed in the lecture and user responses
+    Lecture.resources.through: ["lecture", "user"],
+    # Registering a lecture changes its capacity, the users__username
+    # filter and the lectures nested in the user responses
+    User.lectures.through: ["lecture", "user"],
+    # Registering a course changes the users__username filter
+    # and the courses of the user responses
+    User.courses.through: ["course", "user"],
+}
+
+
+@receiver(m2m_changed, sender=Course.prerequisites.through)
+@receiver(m2m_changed, sender=Lecture.resources.through)
+@receiver(m2m_changed, sender=User.lectures.through)
+@receiver(m2m_changed, sender=User.courses.through)
+def invalidate_membership_responses(sender, action, **kwargs):
+    """
+    The memberships are used by the filters and nested in the responses.
+    Only the namespaces that show the membership are invalidated.
+    """
+    if action in ["post_add", "post_remove", "post_clear"]:
+        response_cache.bump(*MEMBERSHIP_NAMESPACES[sender])
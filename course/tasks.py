@@ -0,0 +1,109 @@
+import os
+import uuid
+from celery import shared_task
+from django.db import transaction
+from course.models import Lecture, LectureWaitlistEntry, SyllabusBatchJob
+from course.utils.registration_eligibility import RegistrationEligibility
+from course.utils.seat_reservation import SeatReservation
+from course.utils.syllabus_generator import SyllabusGenerator
+from course.utils.syllabus_jobs import SyllabusJob
+
+
+@shared_task
+def process_lecture_waitlist(lecture):
+    """
+    Register waiting students for the lecture in FIFO order
+    for as long as the lecture has free seats.
+    The eligibility is checked again, since the student's loan,
+    courses and timetable may have changed since they joined
+    the waitlist. Ineligible students are skipped and keep their place.
+    :param: lecture - Lecture id
+    :return: number of registered students
+    """
+    lecture = Lecture.objects.filter(pk=lecture).first()
+    if lecture is None:
+        return 0
+    skipped = []
+    registered = 0
+    while True:
+        with transaction.atomic():
+            entry = LectureWaitlistEntry.objects.select_for_update(
+                skip_locked=True
+            ).select_related(
+                "student"
+            ).filter(
+                lecture=lecture,
+                status=1
+            ).exclude(
+                pk__in=skipped
+            ).first()
+            if entry is None:
+                return registered
+            verdict = RegistrationEligibility(entry.student).evaluate(
+                lecture.pk
+            )
+            if not verdict.is_registered:
+                if not verdict.is_eligible:
+                    skipped.append(entry.pk)
+                    continue
+                if not SeatReservation(entry.student, lecture).reserve():
+                    return registered
+                registered += 1
+            entry.status = 2
+            entry.save(update_fields=["status", "updated_at"])
+
+
+@shared_task
+def generate_syllabus(job_id, data):
+    """
+    Render the syllabus PDF of the job.
+    The task is routed to the "syllabus" queue (see CELERY_TASK_ROUTES),
+    whose worker concurrency bounds the parallel renders.
+    :param: job_id - hash of the syllabus data
+    :param: data - syllabus data
+    :return: path of the generated syllabus relative to the media root
+    """
+    job = SyllabusJob(job_id)
+    os.makedirs(os.path.dirname(job.path), exist_ok=True)
+    # Rendered under a temporary name, so the job is only seen as ready
+    # once the file is complete
+    temporary_path = f"{job.path}.{uuid.uuid4().hex}.pdf"
+    result = SyllabusGenerator(data).generate_syllabus(temporary_path)
+    if isinstance(result, dict):
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        job.fail(result["error"])
+        return None
+    os.replace(temporary_path, job.path)
+    job.finish()
+    return job.relative_path
+
+
+@shared_task
+def pack_syllabus_batch(batch_id):
+    """
+    Pack the syllabi of a batch into one zip, once the
+    generate_syllabus tasks of its items have finished.
+    :param: batch_id - SyllabusBatchJob batch id
+    :return: media url of the zip, rendered and failed counts and errors
+    """
+    from course.utils.syllabus_batch import SyllabusBatch
+    batch = SyllabusBatchJob.objects.get(batch_id=batch_id)
+    result = SyllabusBatch.pack(batch)
+    batch.status = 3
+    batch.result = result
+    batch.save(update_fields=["status", "result", "updated_at"])
+    return result
+
+
+@shared_task
+def fail_syllabus_batch(request, exc, traceback, batch_id):
+    """
+    Mark the batch as failed when one of its renders crashed,
+    since the chord callback is not called then.
+    :param: batch_id - SyllabusBatchJob batch id
+    """
+    SyllabusBatchJob.objects.filter(batch_id=batch_id).update(
+        status=2,
+        error=str(exc)
+    )
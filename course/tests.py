@@ -1,3 +1,1614 @@
-from django.test import TestCase
+import datetime
+import importlib
+import json
+import os
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from celery import current_app
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from course.models import Department, Course, Lecture, Semester, \
+    Assignment, Grade, GradeRecord, Faculty, Auditorium, PendingGradeRecord, \
+    SyllabusJobState, LectureWaitlistEntry, PrerequisiteClosure, \
+    CourseCompletion, CourseGradeTotal, AcademicSummary, ResponseCacheVersion, \
+    SyllabusBatchJob
+from course.serilalizers import LectureDisplaySerializer, \
+    LectureCompactProfile
+from course.utils import SeatReservation
+from course.utils.pdf_renderers import RendererPool
+from course.utils.syllabus_generator import SyllabusGenerator
+from course.utils.grade_calculator import GradeCalculator
+from course.utils.grade_record_dispatcher import GradeRecordDispatcher
+from course.utils.timetable_solver import TimetableSolver
+from course.tasks import generate_syllabus, process_lecture_waitlist, \
+    fail_syllabus_batch
+from user.tasks import add_grade_records
+from user.models import User
+from utils.helpers import get_semester, semester_resolver
+from utils.response_cache import response_cache
 
-# Create your tests here.
+
+class LectureFixtureMixin:
+    """
+    Creates a lecture and a number of students to register for it.
+    """
+    capacity = 10
+    students_count = 40
+
+    def setUp(self):
+        department = Department.objects.create(name="Physics", code="PHY")
+        course = Course.objects.create(
+            name="Mechanics",
+            code="PHY1010",
+            department=department
+        )
+        self.lecture = Lecture.objects.create(
+            name="Mechanics I",
+            course=course,
+            uni_year=1,
+            capacity=self.capacity
+        )
+        self.students = [
+            User.objects.create_user(
+                f"Student{i}",
+                f"Student{i}",
+                f"student{i}@example.com",
+                "pass123!",
+                username=f"student{i}",
+                role=1
+            ) for i in range(self.students_count)
+        ]
+
+
+class SeatReservationConcurrencyTest(LectureFixtureMixin, TransactionTestCase):
+    """
+    Fires parallel registrations at one lecture and checks
+    that the lecture is never oversubscribed.
+    It runs on SQLite too, whose IMMEDIATE transactions make the
+    connections wait for each other (see DATABASES).
+    """
+    def _reserve(self, student):
+        try:
+            return SeatReservation(student, self.lecture).reserve()
+        finally:
+            connection.close()
+
+    def test_parallel_registrations_fill_exact_capacity(self):
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            results = list(executor.map(self._reserve, self.students))
+
+        self.lecture.refresh_from_db()
+        self.assertEqual(results.count(True), self.capacity)
+        self.assertEqual(self.lecture.capacity, 0)
+        self.assertEqual(self.lecture.users.count(), self.capacity)
+
+
+class SeatReservationTest(LectureFixtureMixin, TestCase):
+    """
+    Checks that releasing a seat gives it back exactly once.
+    """
+    students_count = 1
+
+    def test_release_returns_the_seat(self):
+        student = self.students[0]
+        reservation = SeatReservation(student, self.lecture)
+        self.assertTrue(reservation.reserve())
+        self.assertTrue(reservation.reserve())
+        self.assertTrue(reservation.release())
+        self.assertFalse(reservation.release())
+
+        self.lecture.refresh_from_db()
+        self.assertEqual(self.lecture.capacity, self.capacity)
+        self.assertFalse(self.lecture.users.exists())
+
+    def test_full_lecture_is_not_oversubscribed(self):
+        Lecture.objects.filter(pk=self.lecture.pk).update(capacity=0)
+        # The in-memory capacity is stale, the UPDATE decides
+        self.assertEqual(self.lecture.capacity, self.capacity)
+        self.assertFalse(
+            SeatReservation(self.students[0], self.lecture).reserve()
+        )
+        self.lecture.refresh_from_db()
+        self.assertEqual(self.lecture.capacity, 0)
+        self.assertFalse(self.lecture.users.exists())
+
+    def test_unlimited_lecture(self):
+        Lecture.objects.filter(pk=self.lecture.pk).update(capacity=None)
+        self.assertTrue(
+            SeatReservation(self.students[0], self.lecture).reserve()
+        )
+        self.lecture.refresh_from_db()
+        self.assertIsNone(self.lecture.capacity)
+        self.assertTrue(self.lecture.users.exists())
+
+    def test_membership_is_checked_under_the_lock(self):
+        with CaptureQueriesContext(connection) as queries:
+            SeatReservation(self.students[0], self.lecture).reserve()
+        selects = [
+            query["sql"] for query in queries.captured_queries
+            if query["sql"].startswith("SELECT")
+        ]
+        self.assertIn('FROM "user_user" ', selects[0])
+        self.assertIn('FROM "user_user_lectures"', selects[1])
+
+
+class RegisterLectureQueryBudgetTest(LectureFixtureMixin, TestCase):
+    """
+    Pins the number of queries of the lecture registration path.
+    """
+    students_count = 1
+    # Eligibility (2) + savepoint (2) + seat reservation (5)
+    register_budget = 9
+    # Eligibility (2) + savepoint (2) + seat release (3)
+    unregister_budget = 7
+
+    def setUp(self):
+        super().setUp()
+        today = datetime.date.today()
+        semester = Semester.objects.create(
+            year=f"{today.year}-{today.year + 1}",
+            semester=1,
+            start_date=today,
+            end_date=today + datetime.timedelta(weeks=16),
+            midterm_start=today + datetime.timedelta(weeks=8),
+            final_start=today + datetime.timedelta(weeks=15)
+        )
+        self.lecture.semester = semester
+        self.lecture.day = today.isoweekday()
+        self.lecture.start_time = datetime.time(10, 0)
+        self.lecture.end_time = datetime.time(12, 0)
+        self.lecture.save()
+        self.student = self.students[0]
+        self.student.courses.add(self.lecture.course)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+        self.url = reverse(
+            "course:lecture-register-lecture",
+            kwargs={"pk": self.lecture.pk}
+        )
+        # The current semester is memoized per process
+        get_semester()
+
+    def test_register_query_budget(self):
+        with self.assertNumQueries(self.register_budget):
+            response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(self.lecture.users.filter(pk=self.student.pk).exists())
+
+    def test_unregister_query_budget(self):
+        self.client.post(self.url)
+        with self.assertNumQueries(self.unregister_budget):
+            response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(self.lecture.users.exists())
+
+
+class LectureWaitlistTest(LectureFixtureMixin, TestCase):
+    """
+    Checks that the waitlist is served in FIFO order,
+    skips ineligible students and can be left.
+    """
+    capacity = 0
+    students_count = 4
+
+    def setUp(self):
+        super().setUp()
+        today = datetime.date.today()
+        semester = Semester.objects.create(
+            year=f"{today.year}-{today.year + 1}",
+            semester=1,
+            start_date=today,
+            end_date=today + datetime.timedelta(weeks=16),
+            midterm_start=today + datetime.timedelta(weeks=8),
+            final_start=today + datetime.timedelta(weeks=15)
+        )
+        self.lecture.semester = semester
+        self.lecture.day = 1
+        self.lecture.start_time = datetime.time(10, 0)
+        self.lecture.end_time = datetime.time(12, 0)
+        self.lecture.save()
+        for student in self.students:
+            student.courses.add(self.lecture.course)
+        self.entries = [
+            LectureWaitlistEntry.objects.create(
+                student=student,
+                lecture=self.lecture
+            ) for student in self.students
+        ]
+        get_semester()
+
+    def _open_seats(self, seats):
+        Lecture.objects.filter(pk=self.lecture.pk).update(capacity=seats)
+
+    def _statuses(self):
+        return [
+            LectureWaitlistEntry.objects.get(pk=entry.pk).status
+            for entry in self.entries
+        ]
+
+    def test_promotion_follows_the_queue(self):
+        self._open_seats(2)
+        self.assertEqual(process_lecture_waitlist(self.lecture.pk), 2)
+        self.assertEqual(self._statuses(), [2, 2, 1, 1])
+        self.assertEqual(
+            set(self.lecture.users.values_list("pk", flat=True)),
+            {self.students[0].pk, self.students[1].pk}
+        )
+        self.lecture.refresh_from_db()
+        self.assertEqual(self.lecture.capacity, 0)
+
+    def test_ineligible_students_are_skipped(self):
+        User.objects.filter(pk=self.students[0].pk).update(loan=100)
+        other = Lecture.objects.create(
+            name="Optics I",
+            course=Course.objects.create(
+                name="Optics",
+                code="PHY1020",
+                department=self.lecture.course.department
+            ),
+            semester=self.lecture.semester,
+            uni_year=1,
+            day=1,
+            start_time=datetime.time(11, 0),
+            end_time=datetime.time(13, 0)
+        )
+        self.students[1].lectures.add(other)
+        self._open_seats(1)
+
+        self.assertEqual(process_lecture_waitlist(self.lecture.pk), 1)
+        # The skipped students keep their place in the queue
+        self.assertEqual(self._statuses(), [1, 1, 2, 1])
+        self.assertEqual(
+            list(self.lecture.users.values_list("pk", flat=True)),
+            [self.students[2].pk]
+        )
+
+    def test_leaving_the_waitlist(self):
+        client = APIClient()
+        client.force_authenticate(self.students[0])
+        url = reverse(
+            "course:lecture-leave-waitlist",
+            kwargs={"pk": self.lecture.pk}
+        )
+        self.assertEqual(client.post(url).status_code, 200)
+        self.assertEqual(client.post(url).status_code, 404)
+        self.assertEqual(self._statuses(), [3, 1, 1, 1])
+
+        self._open_seats(1)
+        process_lecture_waitlist(self.lecture.pk)
+        self.assertEqual(self._statuses(), [3, 2, 1, 1])
+
+    def test_switching_lectures_frees_the_old_seat(self):
+        self._open_seats(1)
+        second = Lecture.objects.create(
+            name="Mechanics II",
+            course=self.lecture.course,
+            semester=self.lecture.semester,
+            uni_year=1,
+            capacity=1
+        )
+        student = User.objects.create_user(
+            "Switcher",
+            "Switcher",
+            "switcher@example.com",
+            "pass123!",
+            username="switcher",
+            role=1
+        )
+        self.assertTrue(SeatReservation(student, self.lecture).reserve())
+        with mock.patch(
+                "course.tasks.process_lecture_waitlist.delay"
+        ) as delay, self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(SeatReservation(student, second).reserve())
+        delay.assert_called_once_with(self.lecture.pk)
+        self.lecture.refresh_from_db()
+        self.assertEqual(self.lecture.capacity, 1)
+
+
+class GradeRecordDispatchTest(LectureFixtureMixin, TestCase):
+    """
+    Checks that grade record recalculations are coalesced
+    into one batched task.
+    """
+    students_count = 3
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        final_exam = Assignment.objects.create(
+            name="Final Exam",
+            lecture=self.lecture,
+            max_points=40,
+            due_date=datetime.datetime(2025, 1, 1, tzinfo=datetime.UTC)
+        )
+        midterm = Assignment.objects.create(
+            name="Midterm",
+            lecture=self.lecture,
+            max_points=60,
+            due_date=datetime.datetime(2025, 1, 1, tzinfo=datetime.UTC)
+        )
+        for i, student in enumerate(self.students):
+            Grade.objects.create(
+                student=student,
+                assignment=final_exam,
+                grade=10 + i * 10
+            )
+            Grade.objects.create(student=student, assignment=midterm, grade=45)
+        self.pairs = [[student.pk, self.lecture.pk] for student in self.students]
+
+    @mock.patch("user.tasks.add_grade_records.apply_async")
+    def test_pairs_are_coalesced_per_batch(self, apply_async):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic(), GradeRecordDispatcher.batch():
+                for student in self.students * 2:
+                    GradeRecordDispatcher.schedule(student.pk, self.lecture.pk)
+        apply_async.assert_called_once_with(args=[self.pairs], countdown=5)
+
+        # The pair is still waiting in the queue
+        with self.captureOnCommitCallbacks(execute=True):
+            GradeRecordDispatcher.schedule(self.students[0].pk, self.lecture.pk)
+        self.assertEqual(apply_async.call_count, 1)
+
+        # The task releases the pairs, so a new edit is enqueued
+        add_grade_records(self.pairs[:1])
+        with self.captureOnCommitCallbacks(execute=True):
+            GradeRecordDispatcher.schedule(self.students[0].pk, self.lecture.pk)
+            GradeRecordDispatcher.schedule(self.students[1].pk, self.lecture.pk)
+        self.assertEqual(apply_async.call_count, 2)
+        apply_async.assert_called_with(args=[self.pairs[:1]], countdown=5)
+
+    @mock.patch("user.tasks.add_grade_records.apply_async")
+    def test_rolled_back_and_lost_pairs(self, apply_async):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic(), GradeRecordDispatcher.batch():
+                    GradeRecordDispatcher.schedule(
+                        self.students[0].pk,
+                        self.lecture.pk
+                    )
+                    raise RuntimeError
+        apply_async.assert_not_called()
+        self.assertFalse(PendingGradeRecord.objects.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            GradeRecordDispatcher.schedule(self.students[0].pk, self.lecture.pk)
+        # The queued task was lost
+        PendingGradeRecord.objects.update(
+            created_at=timezone.now() - datetime.timedelta(hours=1)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            GradeRecordDispatcher.schedule(self.students[0].pk, self.lecture.pk)
+        self.assertEqual(apply_async.call_count, 2)
+
+    def test_batched_task_creates_and_updates_records(self):
+        self.assertEqual(
+            add_grade_records(self.pairs),
+            {"created": 3, "updated": 0}
+        )
+        self.assertTrue(
+            GradeRecord.objects.get(student=self.students[0]).failed
+        )
+        Grade.objects.filter(
+            student=self.students[0],
+            assignment__name="Final Exam"
+        ).update(grade=30)
+        self.assertEqual(
+            add_grade_records(self.pairs),
+            {"created": 0, "updated": 3}
+        )
+        self.assertFalse(
+            GradeRecord.objects.get(student=self.students[0]).failed
+        )
+
+
+class BulkGradeTest(LectureFixtureMixin, TestCase):
+    """
+    Checks that a cohort is graded in one request with
+    a number of queries that doesn't depend on its size.
+    """
+    students_count = 20
+
+    def setUp(self):
+        super().setUp()
+        self.professor = User.objects.create_user(
+            "Professor",
+            "Professor",
+            "professor@example.com",
+            "pass123!",
+            username="professor",
+            role=2
+        )
+        self.lecture.professor = self.professor
+        self.lecture.save()
+        self.lecture.users.add(*self.students)
+        self.assignment = Assignment.objects.create(
+            name="Midterm",
+            lecture=self.lecture,
+            max_points=40,
+            due_date=datetime.datetime(2025, 1, 1, tzinfo=datetime.UTC)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.professor)
+        self.url = reverse("course:grade-bulk")
+
+    def _grade(self, students):
+        return self.client.post(
+            self.url,
+            {
+                "assignment": self.assignment.pk,
+                "grades": [
+                    {"student": student.pk, "grade": 30}
+                    for student in students
+                ]
+            },
+            format="json"
+        )
+
+    def test_query_count_is_constant(self):
+        with CaptureQueriesContext(connection) as small:
+            self._grade(self.students[:2])
+        with CaptureQueriesContext(connection) as large:
+            response = self._grade(self.students[2:])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 18)
+        self.assertEqual(len(small), len(large))
+
+    def test_invalid_rows_are_reported(self):
+        outsider = User.objects.create_user(
+            "Outsider",
+            "Outsider",
+            "outsider@example.com",
+            "pass123!",
+            username="outsider",
+            role=1
+        )
+        self._grade(self.students[:1])
+        response = self.client.post(
+            self.url,
+            {
+                "assignment": self.assignment.pk,
+                "grades": [
+                    {"student": self.students[0].pk, "grade": 10},
+                    {"student": outsider.pk, "grade": 10},
+                    {"student": self.students[1].pk, "grade": 50},
+                    {"student": self.students[2].pk, "grade": 10},
+                ]
+            },
+            format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(
+            [error["row"] for error in response.data["errors"]],
+            [1, 2, 3]
+        )
+        self.assertEqual(
+            Grade.objects.filter(assignment=self.assignment).count(),
+            2
+        )
+
+
+class LectureCompactProfileTest(TestCase):
+    """
+    Compares rendering a list of lectures with the nested
+    LectureDisplaySerializer and with the compact profile.
+    The timings are measured by the benchmark_lecture_profiles command.
+    """
+    lectures_count = 200
+
+    def setUp(self):
+        department = Department.objects.create(name="Physics", code="PHY")
+        self.professor = User.objects.create_user(
+            "Professor",
+            "Professor",
+            "professor@example.com",
+            "pass123!",
+            username="professor",
+            role=2
+        )
+        courses = []
+        for i in range(20):
+            course = Course.objects.create(
+                name=f"Course {i}",
+                code=f"PHY{i:04}",
+                department=department
+            )
+            if courses:
+                course.prerequisites.add(courses[-1])
+            courses.append(course)
+        Lecture.objects.bulk_create([
+            Lecture(
+                name=f"Lecture {i}",
+                course=courses[i % len(courses)],
+                professor=self.professor,
+                uni_year=1,
+                capacity=10
+            ) for i in range(self.lectures_count)
+        ])
+        self.queryset = Lecture.objects.prefetch_related(
+            "resources",
+            "professor",
+            "professor__department",
+            "course",
+            "course__department",
+            "course__prerequisites",
+            "course__prerequisites__prerequisites",
+        )
+
+    def test_compact_profile_uses_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            full = LectureDisplaySerializer(
+                self.queryset.all(),
+                many=True
+            ).data
+        # The lectures and every prefetched relation
+        self.assertEqual(len(queries), 7)
+        with self.assertNumQueries(1):
+            compact = list(LectureCompactProfile.values(self.queryset.all()))
+        self.assertEqual(len(compact), len(full))
+        self.assertEqual(
+            [lecture["id"] for lecture in compact],
+            sorted(lecture["id"] for lecture in full)
+        )
+
+    def test_compact_list_response(self):
+        client = APIClient()
+        client.force_authenticate(self.professor)
+        response_cache.versions(["lecture"])
+        # The version stamp, the count and one page of values
+        with self.assertNumQueries(3):
+            response = client.get(
+                reverse("course:lecture-list"),
+                {"view": "compact"}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], self.lectures_count)
+        lecture = response.data["results"][0]
+        self.assertEqual(lecture["course_name"], "Course 0")
+        self.assertEqual(lecture["professor_name"], "Professor Professor")
+        self.assertIsInstance(lecture["course"], int)
+
+
+class ResponseCacheTest(LectureFixtureMixin, TestCase):
+    """
+    Checks that the lecture list is shared by the users of one scope
+    and invalidated by the model signals.
+    """
+    students_count = 2
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        faculty = Faculty.objects.create(
+            name="Physics",
+            code="PHY",
+            department=self.lecture.course.department
+        )
+        User.objects.filter(
+            pk__in=[student.pk for student in self.students]
+        ).update(faculty=faculty)
+        for student in self.students:
+            student.refresh_from_db()
+        self.professor = User.objects.create_user(
+            "Professor",
+            "Professor",
+            "professor@example.com",
+            "pass123!",
+            username="professor",
+            role=2
+        )
+        self.url = reverse("course:lecture-list")
+
+    def _get(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get(self.url)
+
+    def test_scope_shares_one_entry(self):
+        first = self._get(self.students[0])
+        # Only the student's faculty and the version stamps are fetched
+        with self.assertNumQueries(2):
+            second = self._get(self.students[1])
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(second.data["count"], 1)
+        # Professors see only their own lectures
+        self.assertEqual(self._get(self.professor).data["count"], 0)
+
+    def test_signals_invalidate_entries(self):
+        self._get(self.students[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lecture.name = "Mechanics II"
+            self.lecture.save()
+        response = self._get(self.students[1])
+        self.assertEqual(response.data["results"][0]["name"], "Mechanics II")
+
+    def test_bump_of_another_process_is_seen(self):
+        self._get(self.students[0])
+        # Another process replaces the stamp in the database,
+        # its cache isn't involved
+        ResponseCacheVersion.objects.filter(namespace="lecture").update(
+            stamp="bumped-elsewhere"
+        )
+        Lecture.objects.filter(pk=self.lecture.pk).update(
+            name="Mechanics II"
+        )
+        response = self._get(self.students[1])
+        self.assertEqual(response.data["results"][0]["name"], "Mechanics II")
+
+    def test_registration_bumps_only_its_namespaces(self):
+        namespaces = ["lecture", "course", "user"]
+        before = response_cache.versions(namespaces)
+        with self.captureOnCommitCallbacks(execute=True):
+            SeatReservation(self.students[0], self.lecture).reserve()
+        after = response_cache.versions(namespaces)
+        self.assertNotEqual(after[0], before[0])
+        self.assertEqual(after[1], before[1])
+        self.assertNotEqual(after[2], before[2])
+
+
+class KeysetPaginationTest(LectureFixtureMixin, TestCase):
+    """
+    Walks the grade list with keyset pages, including
+    rows that share the same created_at.
+    """
+    students_count = 1
+    grades_count = 25
+
+    def setUp(self):
+        super().setUp()
+        assignment = Assignment.objects.create(
+            name="Midterm",
+            lecture=self.lecture,
+            max_points=40,
+            due_date=datetime.datetime(2025, 1, 1, tzinfo=datetime.UTC)
+        )
+        grades = Grade.objects.bulk_create([
+            Grade(student=self.students[0], assignment=assignment, grade=i)
+            for i in range(self.grades_count)
+        ])
+        # Every five grades share one created_at
+        for grade in grades:
+            Grade.objects.filter(pk=grade.pk).update(
+                created_at=datetime.datetime(
+                    2025, 1, 1 + grade.grade // 5, tzinfo=datetime.UTC
+                )
+            )
+        self.admin = User.objects.create_user(
+            "Admin",
+            "Admin",
+            "admin@example.com",
+            "pass123!",
+            username="admin",
+            role=3
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.expected = list(
+            Grade.objects.order_by(
+                "-created_at",
+                "-id"
+            ).values_list("id", flat=True)
+        )
+
+    def test_pages_cover_every_row_once(self):
+        url = reverse("course:grade-list") + "?pagination=keyset&count=false"
+        seen = []
+        pages = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            self.assertFalse(
+                any("COUNT(" in query["sql"] for query in queries)
+            )
+            pages.append(response.data)
+            seen += [grade["id"] for grade in response.data["results"]]
+            url = response.data["next"]
+        self.assertEqual(seen, self.expected)
+
+        previous = self.client.get(pages[2]["previous"])
+        self.assertEqual(previous.data["results"], pages[1]["results"])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(
+            reverse("course:grade-list"),
+            {"cursor": "not-a-cursor"}
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class GradeExportTest(LectureFixtureMixin, TestCase):
+    """
+    Checks that the grade export streams the role scoped rows.
+    """
+    students_count = 2
+
+    def setUp(self):
+        super().setUp()
+        assignment = Assignment.objects.create(
+            name="Midterm",
+            lecture=self.lecture,
+            max_points=40,
+            due_date=datetime.datetime(2025, 1, 1, tzinfo=datetime.UTC)
+        )
+        for student in self.students:
+            Grade.objects.create(
+                student=student,
+                assignment=assignment,
+                grade=30
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.students[0])
+        self.url = reverse("course:grade-export")
+
+    def test_csv_export(self):
+        response = self.client.get(self.url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            lines[0],
+            "id,student,lecture,assignment,grade,created_at"
+        )
+        # Students export only their own grades
+        self.assertEqual(len(lines), 2)
+        self.assertIn("student0,Mechanics I,Midterm,30.00", lines[1])
+
+    def test_ndjson_export(self):
+        response = self.client.get(self.url, {"output": "ndjson"})
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["student"], "student0")
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class SyllabusJobTest(TestCase):
+    """
+    Checks that syllabus renders are queued once per content
+    and that generated syllabi are served without a new render.
+    """
+    def setUp(self):
+        cache.clear()
+        with open(settings.BASE_DIR / "test_syllabus.json") as file:
+            self.data = json.load(file)
+        self.professor = User.objects.create_user(
+            "Professor",
+            "Professor",
+            "professor@example.com",
+            "pass123!",
+            username="professor",
+            role=2
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.professor)
+        self.url = reverse("course:syllabus")
+
+    @staticmethod
+    def _render(generator, output_path=None):
+        with open(output_path, "wb") as file:
+            file.write(b"%PDF")
+        return output_path
+
+    @mock.patch("course.tasks.generate_syllabus.delay")
+    def test_identical_requests_share_one_job(self, delay):
+        first = self.client.post(self.url, self.data, format="json")
+        second = self.client.post(self.url, self.data, format="json")
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(first.data["job_id"], second.data["job_id"])
+        delay.assert_called_once()
+
+        with mock.patch(
+                "course.tasks.SyllabusGenerator.generate_syllabus",
+                self._render
+        ):
+            generate_syllabus(*delay.call_args.args)
+
+        status_response = self.client.get(first.data["status_url"])
+        self.assertEqual(status_response.data["status"], "ready")
+        third = self.client.post(self.url, self.data, format="json")
+        self.assertEqual(third.status_code, 200)
+        self.assertTrue(third.data["download_url"].endswith(".pdf"))
+        delay.assert_called_once()
+
+    @mock.patch("course.tasks.generate_syllabus.delay")
+    def test_failed_and_expired_jobs_are_retried(self, delay):
+        first = self.client.post(self.url, self.data, format="json")
+        with mock.patch(
+                "course.tasks.SyllabusGenerator.generate_syllabus",
+                return_value={"error": "wkhtmltopdf failed"}
+        ):
+            generate_syllabus(*delay.call_args.args)
+        status_response = self.client.get(first.data["status_url"])
+        self.assertEqual(status_response.data["status"], "failed")
+        self.assertEqual(status_response.data["error"], "wkhtmltopdf failed")
+
+        second = self.client.post(self.url, self.data, format="json")
+        self.assertEqual(second.data["status"], "pending")
+        self.assertEqual(delay.call_count, 2)
+
+        # The queued render was lost
+        SyllabusJobState.objects.update(
+            updated_at=timezone.now() - datetime.timedelta(hours=2)
+        )
+        self.client.post(self.url, self.data, format="json")
+        self.client.post(self.url, self.data, format="json")
+        self.assertEqual(delay.call_count, 3)
+        self.assertEqual(SyllabusJobState.objects.get().status, 1)
+
+    def test_unknown_job(self):
+        response = self.client.get(
+            reverse("course:syllabus-status", args=["0" * 64])
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class RendererPoolTest(TestCase):
+    """
+    Checks that the pool reuses its renderers and never holds
+    more than its size.
+    """
+    class CountingRenderer:
+        instances = 0
+
+        def __init__(self):
+            type(self).instances += 1
+
+        def render(self, html, output_path):
+            time.sleep(0.01)
+
+    def test_renderers_are_reused(self):
+        pool = RendererPool(self.CountingRenderer, size=2)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(
+                lambda i: pool.render("<p></p>", f"{i}.pdf"),
+                range(20)
+            ))
+        self.assertLessEqual(self.CountingRenderer.instances, 2)
+
+    def test_failed_creation_frees_the_slot(self):
+        class FailingRenderer:
+            def __init__(self):
+                raise OSError("No wkhtmltopdf executable found")
+
+        pool = RendererPool(FailingRenderer, size=2)
+        for i in range(4):
+            with self.assertRaises(OSError):
+                pool.render("<p></p>", f"{i}.pdf")
+        self.assertEqual(pool._created, 0)
+
+        # Renderers can still be created once the backend works
+        pool.renderer_class = FakeRenderer
+        pool.render("<p></p>", os.devnull)
+        self.assertEqual(pool._created, 1)
+
+
+class FakeRenderer:
+    def render(self, html, output_path):
+        with open(output_path, "wb") as file:
+            file.write(b"%PDF")
+
+
+@mock.patch(
+    "course.utils.syllabus_generator.get_renderer",
+    lambda backend=None: FakeRenderer()
+)
+class SyllabusBatchTest(TestCase):
+    """
+    Checks that a batch packs the rendered syllabi into one zip
+    and reports the invalid items instead of failing.
+    """
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root.name
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        with open(settings.BASE_DIR / "test_syllabus.json") as file:
+            self.data = json.load(file)
+        self.manager = User.objects.create_user(
+            "Manager",
+            "Manager",
+            "manager@example.com",
+            "pass123!",
+            username="manager",
+            role=4
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+        self.url = reverse("course:syllabus-batch")
+
+    def _generate(self, data):
+        """
+        Enqueues the batch, runs its tasks eagerly
+        and reads its status.
+        """
+        current_app.conf.task_always_eager = True
+        self.addCleanup(
+            setattr,
+            current_app.conf,
+            "task_always_eager",
+            False
+        )
+        with mock.patch(
+            "course.tasks.SyllabusGenerator.generate_syllabus",
+            autospec=True,
+            side_effect=SyllabusGenerator.generate_syllabus
+        ) as render, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, data, format="json")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["status"], "pending")
+        self.renders = render.call_count
+        return self.client.get(response.data["status_url"])
+
+    def _archive(self, response):
+        name = response.data["download_url"].split(settings.MEDIA_URL)[-1]
+        with zipfile.ZipFile(f"{self.media_root.name}/{name}") as archive:
+            return (
+                sorted(archive.namelist()),
+                json.loads(archive.read("errors.json"))
+            )
+
+    def test_payloads_with_invalid_item(self):
+        response = self._generate({
+            "syllabi": [self.data, {"course_code": "BAD"}, self.data]
+        })
+        self.assertEqual(response.data["status"], "ready")
+        self.assertEqual(response.data["rendered"], 2)
+        names, errors = self._archive(response)
+        self.assertEqual(len(names), 3)
+        self.assertEqual([error["index"] for error in errors], [1])
+        self.assertEqual(errors[0]["course_code"], "BAD")
+        # The identical syllabi share one render
+        self.assertEqual(self.renders, 1)
+
+    def test_unknown_and_crashed_batches(self):
+        response = self.client.get(
+            reverse("course:syllabus-batch-status", args=["other-task"])
+        )
+        self.assertEqual(response.status_code, 404)
+
+        SyllabusBatchJob.objects.create(batch_id="crashed")
+        fail_syllabus_batch(None, RuntimeError("worker lost"), None, "crashed")
+        response = self.client.get(
+            reverse("course:syllabus-batch-status", args=["crashed"])
+        )
+        self.assertEqual(response.data["status"], "failed")
+        self.assertEqual(response.data["error"], "worker lost")
+
+    def test_department_lectures(self):
+        today = datetime.date.today()
+        semester = Semester.objects.create(
+            year=f"{today.year}-{today.year + 1}",
+            semester=1,
+            start_date=today,
+            end_date=today + datetime.timedelta(weeks=16),
+            midterm_start=today + datetime.timedelta(weeks=8),
+            final_start=today + datetime.timedelta(weeks=15)
+        )
+        department = Department.objects.create(name="Physics", code="PHY")
+        course = Course.objects.create(
+            name="Mechanics",
+            code="PHY1010",
+            department=department
+        )
+        lecture = Lecture.objects.create(
+            name="Mechanics I",
+            course=course,
+            uni_year=1,
+            professor=self.manager,
+            semester=semester
+        )
+        for name in ["Quiz", "Quiz", "Final"]:
+            Assignment.objects.create(
+                name=name,
+                lecture=lecture,
+                max_points=10,
+                due_date=datetime.datetime(2025, 1, 1, tzinfo=datetime.UTC)
+            )
+        response = self._generate({"department": department.pk})
+        self.assertEqual(response.data["status"], "ready")
+        self.assertEqual(response.data["rendered"], 1)
+        names, errors = self._archive(response)
+        self.assertEqual(names, ["001-PHY1010.pdf", "errors.json"])
+        self.assertEqual(errors, [])
+
+
+class LectureScheduleTest(LectureFixtureMixin, TestCase):
+    """
+    Checks that lectures can't take a reserved auditorium or a busy
+    professor, one at a time or imported at once.
+    """
+    students_count = 0
+
+    def setUp(self):
+        super().setUp()
+        self.semester = Semester.objects.create(
+            year="2025-2026",
+            semester=1,
+            start_date=datetime.date(2025, 9, 15),
+            end_date=datetime.date(2026, 1, 20),
+            midterm_start=datetime.date(2025, 11, 3),
+            final_start=datetime.date(2026, 1, 5)
+        )
+        self.auditoriums = [
+            Auditorium.objects.create(name=f"10{i}", capacity=50)
+            for i in range(3)
+        ]
+        self.professors = [
+            User.objects.create_user(
+                f"Professor{i}",
+                f"Professor{i}",
+                f"professor{i}@example.com",
+                "pass123!",
+                username=f"professor{i}",
+                role=2
+            ) for i in range(3)
+        ]
+        self.lecture.semester = self.semester
+        self.lecture.day = 1
+        self.lecture.start_time = datetime.time(10)
+        self.lecture.end_time = datetime.time(12)
+        self.lecture.location = self.auditoriums[0]
+        self.lecture.professor = self.professors[0]
+        self.lecture.save()
+        self.admin = User.objects.create_user(
+            "Admin",
+            "Admin",
+            "admin@example.com",
+            "pass123!",
+            username="admin",
+            role=3
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def _row(self, start, end, auditorium=0, professor=0, day=1):
+        return {
+            "name": "Mechanics II",
+            "course": self.lecture.course_id,
+            "uni_year": 1,
+            "capacity": 30,
+            "day": day,
+            "start_time": start,
+            "end_time": end,
+            "location": self.auditoriums[auditorium].pk,
+            "professor": self.professors[professor].pk,
+        }
+
+    def test_update_is_validated(self):
+        lecture = Lecture.objects.create(
+            name="Mechanics II",
+            course=self.lecture.course,
+            uni_year=1,
+            day=1,
+            start_time=datetime.time(12),
+            end_time=datetime.time(14),
+            location=self.auditoriums[0],
+            semester=self.semester
+        )
+        url = reverse("course:lecture-detail", args=[lecture.pk])
+        response = self.client.patch(url, {"start_time": "11:00"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(
+            "This auditorium is already reserved.",
+            response.data["non_field_errors"]
+        )
+        response = self.client.patch(url, {"name": "Mechanics III"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_bulk_import(self):
+        rows = [
+            # Free slot
+            self._row("08:00", "10:00"),
+            # Same professor and auditorium as the existing lecture
+            self._row("11:00", "13:00"),
+            # Another auditorium, but the professor is busy
+            self._row("09:00", "11:00", auditorium=1),
+            # Free, another day
+            self._row("10:00", "12:00", day=2),
+            # Overlaps the first imported lecture
+            self._row("09:30", "10:00", auditorium=2),
+            self._row("12:00", "14:00", auditorium=1, professor=1),
+        ]
+        url = reverse("course:lecture-bulk")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                url,
+                {"semester": self.semester.pk, "lectures": rows},
+                format="json"
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 3)
+        self.assertEqual(
+            [error["row"] for error in response.data["errors"]],
+            [2, 3, 5]
+        )
+        # The copies conflict with the first rows, so the same
+        # lectures are imported with the same number of queries
+        self.lecture.semester = Semester.objects.create(
+            year="2026-2027",
+            semester=1,
+            start_date=datetime.date(2026, 9, 15),
+            end_date=datetime.date(2027, 1, 20),
+            midterm_start=datetime.date(2026, 11, 3),
+            final_start=datetime.date(2027, 1, 5)
+        )
+        self.lecture.save()
+        with CaptureQueriesContext(connection) as more_queries:
+            response = self.client.post(
+                url,
+                {"semester": self.lecture.semester_id, "lectures": rows * 5},
+                format="json"
+            )
+        self.assertEqual(response.data["created"], 3)
+        self.assertEqual(len(more_queries), len(queries))
+
+
+class TimetableSolverTest(LectureFixtureMixin, TestCase):
+    """
+    Checks that the scheduled lectures respect the auditoriums,
+    the professors and the existing lectures, and that courses
+    sharing students are taught at different times.
+    """
+    students_count = 3
+
+    def test_solver_constraints(self):
+        lectures = [
+            {"course": 1, "professor": 1, "capacity": 30},
+            {"course": 2, "professor": 2, "capacity": 30},
+            {"course": 3, "professor": 1, "capacity": 30,
+             "needs_computers": True},
+            {"course": 4, "professor": 3, "capacity": 100},
+        ]
+        solver = TimetableSolver(
+            lectures,
+            [(1, 50, False), (2, 50, True)],
+            cohorts={1: {10, 11}, 2: {11, 12}, 3: set()},
+            days=[1],
+            slots=[
+                (datetime.time(9), datetime.time(11)),
+                (datetime.time(11), datetime.time(13)),
+            ]
+        )
+        result = solver.solve()
+        schedule = {lecture["course"]: lecture for lecture in result["schedule"]}
+        self.assertEqual(result["unscheduled"], [3])
+        self.assertEqual(result["clashes"], 0)
+        self.assertNotEqual(
+            schedule[1]["start_time"],
+            schedule[2]["start_time"]
+        )
+        # Same professor
+        self.assertNotEqual(
+            schedule[1]["start_time"],
+            schedule[3]["start_time"]
+        )
+        self.assertEqual(schedule[3]["location"], 2)
+
+    def test_schedule_is_created(self):
+        semester = Semester.objects.create(
+            year="2025-2026",
+            semester=1,
+            start_date=datetime.date(2025, 9, 15),
+            end_date=datetime.date(2026, 1, 20),
+            midterm_start=datetime.date(2025, 11, 3),
+            final_start=datetime.date(2026, 1, 5)
+        )
+        auditorium = Auditorium.objects.create(name="101", capacity=50)
+        professor = User.objects.create_user(
+            "Professor",
+            "Professor",
+            "professor@example.com",
+            "pass123!",
+            username="professor",
+            role=2
+        )
+        self.lecture.semester = semester
+        self.lecture.day = 1
+        self.lecture.start_time = datetime.time(9)
+        self.lecture.end_time = datetime.time(10, 50)
+        self.lecture.location = auditorium
+        self.lecture.save()
+        optics = Course.objects.create(
+            name="Optics",
+            code="PHY1020",
+            department=self.lecture.course.department
+        )
+        for student in self.students:
+            student.courses.add(self.lecture.course, optics)
+        admin = User.objects.create_user(
+            "Admin",
+            "Admin",
+            "admin@example.com",
+            "pass123!",
+            username="admin",
+            role=3
+        )
+        client = APIClient()
+        client.force_authenticate(admin)
+        lectures = [
+            {"name": "Mechanics II", "course": self.lecture.course_id,
+             "professor": professor.pk, "uni_year": 1},
+            {"name": "Optics I", "course": optics.pk, "uni_year": 1},
+        ]
+        response = client.post(
+            reverse("course:lecture-schedule"),
+            {"semester": semester.pk, "lectures": lectures},
+            format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(response.data["clashes"], 0)
+        slots = set(
+            Lecture.objects.rewrite(False).filter(
+                semester=semester
+            ).values_list("day", "start_time", "location")
+        )
+        self.assertEqual(len(slots), 3)
+
+
+class ScheduleRecommenderTest(LectureFixtureMixin, TestCase):
+    """
+    Checks that the recommended combinations don't overlap,
+    skip the full lectures and are ranked by the covered courses.
+    """
+    students_count = 1
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.semester = Semester.objects.create(
+            year="2025-2026",
+            semester=1,
+            start_date=datetime.date(2025, 9, 15),
+            end_date=datetime.date(2026, 1, 20),
+            midterm_start=datetime.date(2025, 11, 3),
+            final_start=datetime.date(2026, 1, 5)
+        )
+        self.student = self.students[0]
+        department = self.lecture.course.department
+        self.courses = [self.lecture.course] + [
+            Course.objects.create(
+                name=name,
+                code=code,
+                department=department
+            ) for name, code in [("Optics", "PHY1020"), ("Waves", "PHY1030")]
+        ]
+        self.student.courses.add(*self.courses)
+
+    def _lecture(self, course, day, start, end, capacity=30):
+        return Lecture.objects.create(
+            name=f"{self.courses[course].name} {day}-{start}",
+            course=self.courses[course],
+            uni_year=1,
+            capacity=capacity,
+            day=day,
+            start_time=datetime.time(start),
+            end_time=datetime.time(end),
+            semester=self.semester
+        )
+
+    @mock.patch("course.utils.schedule_recommender.get_semester")
+    def test_recommendations(self, get_semester):
+        get_semester.return_value = self.semester
+        first = self._lecture(0, 1, 9, 11)
+        second = self._lecture(0, 2, 9, 11)
+        optics = self._lecture(1, 1, 10, 12)
+        self._lecture(1, 1, 12, 14, capacity=0)
+        waves = self._lecture(2, 1, 13, 15)
+        client = APIClient()
+        client.force_authenticate(self.student)
+        url = reverse("course:lecture-recommendations")
+        with self.assertNumQueries(2):
+            response = client.get(url, {"limit": 3})
+        self.assertEqual(response.status_code, 200)
+        combinations = response.data["combinations"]
+        self.assertEqual(len(combinations), 3)
+        self.assertEqual(
+            [lecture["id"] for lecture in combinations[0]["lectures"]],
+            [optics.pk, waves.pk, second.pk]
+        )
+        self.assertEqual(combinations[0]["days"], 2)
+        self.assertEqual(combinations[0]["idle_minutes"], 60)
+        # One day with an hour between the lectures
+        self.assertEqual(combinations[1]["missing_courses"], [
+            self.courses[0].pk
+        ])
+        self.assertEqual(
+            [lecture["id"] for lecture in combinations[1]["lectures"]],
+            [optics.pk, waves.pk]
+        )
+        self.assertEqual(
+            [lecture["id"] for lecture in combinations[2]["lectures"]],
+            [first.pk, waves.pk]
+        )
+        self.assertTrue(response.data["complete"])
+
+        professor = User.objects.create_user(
+            "Professor",
+            "Professor",
+            "professor@example.com",
+            "pass123!",
+            username="professor",
+            role=2
+        )
+        client.force_authenticate(professor)
+        self.assertEqual(client.get(url).status_code, 403)
+
+
+class PrerequisiteTest(TestCase):
+    """
+    Checks the direct and transitive prerequisite checks
+    and the maintenance of the prerequisite closure.
+    """
+    def setUp(self):
+        department = Department.objects.create(name="Math", code="MAT")
+        self.algebra, self.calculus, self.analysis, self.topology = [
+            Course.objects.create(
+                name=name,
+                code=f"MAT10{i}0",
+                department=department
+            ) for i, name in enumerate(
+                ["Algebra", "Calculus", "Analysis", "Topology"]
+            )
+        ]
+        # Algebra <- Calculus <- Analysis
+        self.calculus.prerequisites.add(self.algebra)
+        self.analysis.prerequisites.add(self.calculus)
+        self.student = User.objects.create_user(
+            "Student",
+            "Student",
+            "student@example.com",
+            "pass123!",
+            username="student",
+            role=1
+        )
+
+    def _closure(self, course):
+        return dict(
+            PrerequisiteClosure.objects.filter(
+                course=course
+            ).values_list("prerequisite__name", "depth")
+        )
+
+    def _grade(self, course, failed):
+        lecture = Lecture.objects.create(
+            name=f"{course.name} I",
+            course=course,
+            uni_year=1
+        )
+        return GradeRecord.objects.create(
+            student=self.student,
+            lecture=lecture,
+            grade=30 if failed else 80,
+            failed=failed
+        )
+
+    def _unmet(self, course):
+        return Course.objects.find_unmet_prerequisites(course, self.student)
+
+    def test_direct_and_transitive_prerequisites(self):
+        self.assertEqual(self._closure(self.calculus), {"Algebra": 1})
+        self.assertEqual(
+            self._closure(self.analysis),
+            {"Calculus": 1, "Algebra": 2}
+        )
+        missing, failed = self._unmet(self.analysis)
+        self.assertEqual(sorted(missing), ["Algebra", "Calculus"])
+        self.assertEqual(failed, [])
+
+        self._grade(self.algebra, failed=True)
+        self._grade(self.calculus, failed=False)
+        self.assertEqual(self._unmet(self.analysis), ([], ["Algebra"]))
+
+        # A passed retake meets the prerequisite
+        self._grade(self.algebra, failed=False)
+        self.assertEqual(self._unmet(self.analysis), ([], []))
+
+    def test_deleted_grade_record_unmeets_the_prerequisite(self):
+        record = self._grade(self.algebra, failed=False)
+        self.assertEqual(self._unmet(self.calculus), ([], []))
+        record.delete()
+        self.assertFalse(CourseCompletion.objects.exists())
+        self.assertEqual(self._unmet(self.calculus), (["Algebra"], []))
+
+    def test_adding_and_removing_edges(self):
+        self.algebra.prerequisites.add(self.topology)
+        self.assertEqual(
+            self._closure(self.analysis),
+            {"Calculus": 1, "Algebra": 2, "Topology": 3}
+        )
+        # The reverse side of the relation is handled too
+        self.calculus.course_set.remove(self.analysis)
+        self.assertEqual(self._closure(self.analysis), {})
+        self.assertEqual(
+            self._closure(self.calculus),
+            {"Algebra": 1, "Topology": 2}
+        )
+
+        self.algebra.delete()
+        self.assertEqual(self._closure(self.calculus), {})
+
+    def test_backfill_matches_the_signals(self):
+        self.algebra.prerequisites.add(self.topology)
+        self._grade(self.algebra, failed=True)
+        self._grade(self.calculus, failed=False)
+        closure = list(PrerequisiteClosure.objects.values_list(
+            "course", "prerequisite", "depth"
+        ).order_by("course", "prerequisite"))
+        completions = list(CourseCompletion.objects.values_list(
+            "student", "course", "passed"
+        ).order_by("course"))
+        PrerequisiteClosure.objects.all().delete()
+        CourseCompletion.objects.all().delete()
+
+        migration = importlib.import_module(
+            "course.migrations.0052_prerequisiteclosure_coursecompletion"
+        )
+        migration.populate_closure_and_completions(apps, None)
+        self.assertEqual(
+            list(PrerequisiteClosure.objects.values_list(
+                "course", "prerequisite", "depth"
+            ).order_by("course", "prerequisite")),
+            closure
+        )
+        self.assertEqual(
+            list(CourseCompletion.objects.values_list(
+                "student", "course", "passed"
+            ).order_by("course")),
+            completions
+        )
+
+
+class AcademicSummaryTest(LectureFixtureMixin, TestCase):
+    """
+    Checks that the denormalized course totals and GPAs match
+    the ones aggregated from scratch after every kind of change.
+    """
+    students_count = 2
+
+    def setUp(self):
+        super().setUp()
+        self.other_course = Course.objects.create(
+            name="Optics",
+            code="PHY1020",
+            department=self.lecture.course.department,
+            credits=6
+        )
+        self.other_lecture = Lecture.objects.create(
+            name="Optics I",
+            course=self.other_course,
+            uni_year=1
+        )
+        self.assignments = [
+            Assignment.objects.create(
+                name=f"Midterm {lecture.pk}",
+                lecture=lecture,
+                max_points=100,
+                due_date=datetime.datetime(2025, 1, 1, tzinfo=datetime.UTC)
+            ) for lecture in [self.lecture, self.other_lecture]
+        ]
+        for student in self.students:
+            student.courses.add(self.lecture.course, self.other_course)
+        self.grades = [
+            Grade.objects.create(
+                student=student,
+                assignment=assignment,
+                grade=55 + i * 10 + j * 20
+            )
+            for i, student in enumerate(self.students)
+            for j, assignment in enumerate(self.assignments)
+        ]
+
+    def assertConsistent(self):
+        expected = {
+            (item["student"], item["assignment__lecture__course"]):
+                item["total_grade"]
+            for item in Grade.objects.values(
+                "student",
+                "assignment__lecture__course"
+            ).annotate(total_grade=Sum("grade"))
+        }
+        self.assertEqual(
+            dict(
+                ((student_id, course_id), total_grade)
+                for student_id, course_id, total_grade
+                in CourseGradeTotal.objects.values_list(
+                    "student", "course", "total_grade"
+                )
+            ),
+            expected
+        )
+        for student in self.students:
+            summary = AcademicSummary.objects.get(student=student)
+            self.assertAlmostEqual(
+                float(summary.gpa),
+                round(GradeCalculator(student).calculate_gpa(), 2)
+            )
+
+    def test_grade_create_update_and_delete(self):
+        self.assertConsistent()
+
+        grade = self.grades[0]
+        grade.grade = 95
+        grade.save()
+        self.assertConsistent()
+
+        grade.student = self.students[1]
+        grade.assignment = self.assignments[1]
+        grade.save()
+        self.assertConsistent()
+
+        grade.delete()
+        self.assertConsistent()
+        self.grades[1].delete()
+        self.assertConsistent()
+
+    def test_lecture_and_assignment_reassignment(self):
+        self.other_lecture.course = self.lecture.course
+        self.other_lecture.save()
+        self.assertConsistent()
+        self.assertFalse(
+            CourseGradeTotal.objects.filter(course=self.other_course).exists()
+        )
+
+        self.assignments[0].lecture = Lecture.objects.create(
+            name="Optics II",
+            course=self.other_course,
+            uni_year=1
+        )
+        self.assignments[0].save()
+        self.assertConsistent()
+
+
+class SemesterResolverTest(TestCase):
+    """
+    Checks that the memoized current semester is dropped
+    when a semester is saved or deleted.
+    """
+    def setUp(self):
+        today = datetime.date.today()
+        self.semester = Semester.objects.create(
+            year=f"{today.year}-{today.year + 1}",
+            semester=1,
+            start_date=today,
+            end_date=today + datetime.timedelta(weeks=16),
+            midterm_start=today + datetime.timedelta(weeks=8),
+            final_start=today + datetime.timedelta(weeks=15)
+        )
+
+    def _resolve(self):
+        misses = semester_resolver.stats()["misses"]
+        semester = get_semester()
+        return semester, semester_resolver.stats()["misses"] - misses
+
+    def test_memo_is_invalidated_on_save_and_delete(self):
+        self.assertEqual(self._resolve(), (self.semester, 1))
+        self.assertEqual(self._resolve(), (self.semester, 0))
+
+        self.semester.semester = 2
+        self.semester.save()
+        semester, misses = self._resolve()
+        self.assertEqual(misses, 1)
+        self.assertEqual(semester.semester, 2)
+        self.assertEqual(self._resolve()[1], 0)
+
+        self.semester.delete()
+        self.assertEqual(self._resolve(), (None, 1))
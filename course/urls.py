@@ -1,7 +1,7 @@
 from django.urls import path
 from rest_framework.routers import DefaultRouter
 from course.views import LectureViewSet, CourseViewSet, FacultyViewSet, DepartmentViewSet, GradeViewSet, \
-    AssignmentViewSet, AuditoriumViewSet, CreateSyllabusView, SemesterViewSet, ResourceViewSet, GradeRecordViewSet, \
+    AssignmentViewSet, AuditoriumViewSet, CreateSyllabusView, SyllabusStatusView, SyllabusBatchView, SyllabusBatchStatusView, SemesterViewSet, ResourceViewSet, GradeRecordViewSet, \
     AssignmentSubmissionViewSet
 
 app_name = "course"
@@ -22,4 +22,19 @@ router.register(r"assignment-submission", AssignmentSubmissionViewSet, basename=
 urlpatterns = router.urls
 urlpatterns += [
     path("syllabus/", CreateSyllabusView.as_view(), name="syllabus"),
+    path(
+        "syllabus/batch/",
+        SyllabusBatchView.as_view(),
+        name="syllabus-batch"
+    ),
+    path(
+        "syllabus/batch/<str:batch_id>/",
+        SyllabusBatchStatusView.as_view(),
+        name="syllabus-batch-status"
+    ),
+    path(
+        "syllabus/<str:job_id>/",
+        SyllabusStatusView.as_view(),
+        name="syllabus-status"
+    ),
 ]
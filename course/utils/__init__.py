@@ -1,2 +1,4 @@
 from .grade_calculator import GradeCalculator
-from .syllabus_generator import SyllabusGenerator
\ No newline at end of file
+from .syllabus_generator import SyllabusGenerator
+from .seat_reservation import SeatReservation
+from .registration_eligibility import RegistrationEligibility
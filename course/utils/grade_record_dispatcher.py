@@ -0,0 +1,119 @@
+import contextlib
+import datetime
+import threading
+from django.db import transaction
+from django.utils import timezone
+
+_batches = threading.local()
+
+
+class GradeRecordDispatcher:
+    """
+    This class coalesces the grade record recalculations.
+
+    Pairs scheduled inside batch() are collected and enqueued
+    as one add_grade_records task after the transaction commits.
+    Pairs that are already waiting in the queue are not enqueued
+    again, since the queued task will read the latest grades anyway.
+    The waiting pairs are marked with PendingGradeRecord rows,
+    which the task deletes before it reads the grades.
+    """
+    # Pairs are kept pending for at most this many seconds,
+    # in case the queued task is lost
+    pending_timeout = 60 * 10
+    # The task waits a little, so that quick successive edits
+    # of the same pairs are served by one recalculation
+    countdown = 5
+
+    @classmethod
+    @contextlib.contextmanager
+    def batch(cls):
+        """
+        This method collects the pairs scheduled in the block.
+        They are flushed after the surrounding transaction commits,
+        and dropped if the block raises or the transaction is rolled back.
+        Nested batches are collected by the outermost one.
+        """
+        if getattr(_batches, "pairs", None) is not None:
+            yield
+            return
+        _batches.pairs = pairs = set()
+        try:
+            yield
+        finally:
+            _batches.pairs = None
+        if pairs:
+            transaction.on_commit(lambda: cls.flush(pairs))
+
+    @classmethod
+    def schedule(cls, student_id, lecture_id):
+        """
+        This method schedules the recalculation of the pair.
+        :param student_id: User id
+        :param lecture_id: Lecture id
+        """
+        pairs = getattr(_batches, "pairs", None)
+        if pairs is not None:
+            pairs.add((student_id, lecture_id))
+        else:
+            transaction.on_commit(
+                lambda: cls.flush({(student_id, lecture_id)})
+            )
+
+    @staticmethod
+    def _pending(pairs):
+        from course.models import PendingGradeRecord
+        return PendingGradeRecord.objects.filter(
+            student_id__in={student_id for student_id, _ in pairs},
+            lecture_id__in={lecture_id for _, lecture_id in pairs}
+        )
+
+    @classmethod
+    def flush(cls, pairs):
+        """
+        This method enqueues one task for the pairs that
+        are not already waiting in the queue.
+        :param pairs: Set of (student id, lecture id) pairs
+        """
+        from course.models import PendingGradeRecord
+        from user.tasks import add_grade_records
+        pairs = {tuple(pair) for pair in pairs}
+        pending = cls._pending(pairs)
+        # The marks of lost tasks don't hold the pairs back for good
+        pending.filter(
+            created_at__lt=timezone.now() -
+            datetime.timedelta(seconds=cls.pending_timeout)
+        ).delete()
+        waiting = set(pending.values_list("student_id", "lecture_id"))
+        pairs = sorted(pairs - waiting)
+        if not pairs:
+            return
+        # Two processes flushing the same pair at once may both
+        # enqueue it, which only recalculates it twice
+        PendingGradeRecord.objects.bulk_create(
+            [
+                PendingGradeRecord(student_id=student_id, lecture_id=lecture_id)
+                for student_id, lecture_id in pairs
+            ],
+            ignore_conflicts=True
+        )
+        add_grade_records.apply_async(
+            args=[[list(pair) for pair in pairs]],
+            countdown=cls.countdown
+        )
+
+    @classmethod
+    def release(cls, pairs):
+        """
+        This method marks the pairs as no longer pending.
+        It is called by the task before it reads the grades,
+        so edits made during the recalculation are enqueued again.
+        :param pairs: List of (student id, lecture id) pairs
+        """
+        pairs = {tuple(pair) for pair in pairs}
+        pending = cls._pending(pairs)
+        pending.filter(pk__in=[
+            pk for pk, student_id, lecture_id
+            in pending.values_list("pk", "student_id", "lecture_id")
+            if (student_id, lecture_id) in pairs
+        ]).delete()
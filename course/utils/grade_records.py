@@ -0,0 +1,134 @@
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+from course.choices import FINAL_EXAM_NAMES, THESIS_NAMES
+from course.models import Grade, GradeRecord, Lecture, CourseCompletion
+
+
+class GradeRecordBuilder:
+    """
+    This class is responsible for recalculating the grade records
+    of many (student, lecture) pairs at once with grouped queries.
+
+    A record is failed if the total grade is below 51, or, for
+    lectures other than theses, if the final exam grade is below 18.
+    """
+    def __init__(self, pairs):
+        """
+        This function initializes the GradeRecordBuilder class.
+        :param pairs: Iterable of (student id, lecture id) pairs
+        """
+        self.pairs = {
+            (int(student_id), int(lecture_id))
+            for student_id, lecture_id in pairs
+        }
+        self.student_ids = {student_id for student_id, _ in self.pairs}
+        self.lecture_ids = {lecture_id for _, lecture_id in self.pairs}
+
+    def _totals(self):
+        """
+        This method sums the total and final exam grades per pair.
+        :return: Dictionary of pair to total and final exam grade
+        """
+        grades = Grade.objects.filter(
+            student_id__in=self.student_ids,
+            assignment__lecture_id__in=self.lecture_ids
+        ).values(
+            "student_id",
+            "assignment__lecture_id"
+        ).annotate(
+            total_grade=Sum("grade"),
+            final_exam=Sum(
+                "grade",
+                filter=Q(assignment__name__in=FINAL_EXAM_NAMES)
+            )
+        )
+        return {
+            (item["student_id"], item["assignment__lecture_id"]): item
+            for item in grades
+        }
+
+    def _existing_records(self):
+        """
+        This method fetches the existing grade records per pair.
+        :return: Dictionary of pair to list of GradeRecord objects
+        """
+        records = defaultdict(list)
+        for record in GradeRecord.objects.filter(
+                student_id__in=self.student_ids,
+                lecture_id__in=self.lecture_ids
+        ):
+            records[(record.student_id, record.lecture_id)].append(record)
+        return records
+
+    @staticmethod
+    def is_failed(is_thesis, total_grade, final_exam_grade):
+        """
+        This method decides whether the record is failed.
+        :param is_thesis: Whether the lecture is a thesis
+        :param total_grade: Total grade of the lecture
+        :param final_exam_grade: Final exam grade, or None
+        :return: bool
+        """
+        if total_grade < 51:
+            return True
+        return not is_thesis and (final_exam_grade or 0) < 18
+
+    def build(self):
+        """
+        This method creates or updates the grade records of the pairs.
+        :return: Dictionary with created and updated counts
+        """
+        if not self.pairs:
+            return {"created": 0, "updated": 0}
+        lectures = {
+            pk: (course_id, name in THESIS_NAMES)
+            for pk, course_id, name in Lecture.objects.filter(
+                pk__in=self.lecture_ids
+            ).values_list("pk", "course_id", "name")
+        }
+        totals = self._totals()
+        existing = self._existing_records()
+        now = timezone.now()
+        created = []
+        updated = []
+        for pair in self.pairs:
+            if pair[1] not in lectures:
+                continue
+            item = totals.get(pair, {})
+            total_grade = item.get("total_grade") or 0
+            failed = self.is_failed(
+                lectures[pair[1]][1],
+                total_grade,
+                item.get("final_exam")
+            )
+            if pair not in existing:
+                created.append(
+                    GradeRecord(
+                        student_id=pair[0],
+                        lecture_id=pair[1],
+                        grade=total_grade,
+                        failed=failed
+                    )
+                )
+                continue
+            for record in existing[pair]:
+                record.grade = total_grade
+                record.failed = failed
+                record.updated_at = now
+                updated.append(record)
+
+        with transaction.atomic():
+            GradeRecord.objects.bulk_create(created)
+            GradeRecord.objects.bulk_update(
+                updated,
+                ["grade", "failed", "updated_at"]
+            )
+            # Bulk writes don't send signals, so refresh the index here
+            CourseCompletion.objects.refresh_many(
+                (student_id, lectures[lecture_id][0])
+                for student_id, lecture_id in self.pairs
+                if lecture_id in lectures
+            )
+        return {"created": len(created), "updated": len(updated)}
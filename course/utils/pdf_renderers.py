@@ -0,0 +1,163 @@
+import os
+import queue
+import threading
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+
+class PdfkitRenderer:
+    """
+    This renderer converts HTML to PDF with wkhtmltopdf through pdfkit.
+    The wkhtmltopdf configuration is resolved once per renderer
+    instead of once per document.
+    """
+    def __init__(self):
+        """
+        This function initializes the PdfkitRenderer class.
+        """
+        import pdfkit
+        self.pdfkit = pdfkit
+        self.configuration = pdfkit.configuration(
+            wkhtmltopdf=os.getenv("WKHTMLTOPDF_PATH")
+        )
+
+    def render(self, html, output_path):
+        """
+        This method writes the PDF of the HTML to the output path.
+        :param html: Rendered HTML
+        :param output_path: Path of the PDF
+        """
+        self.pdfkit.from_string(
+            html,
+            output_path,
+            configuration=self.configuration
+        )
+
+
+class XHTML2PDFRenderer:
+    """
+    This renderer converts HTML to PDF in process with xhtml2pdf,
+    so no external process is started per document.
+    xhtml2pdf is an optional dependency: pip install xhtml2pdf
+    """
+    def __init__(self):
+        """
+        This function initializes the XHTML2PDFRenderer class.
+        """
+        try:
+            from xhtml2pdf import pisa
+        except ImportError:
+            raise ImproperlyConfigured(
+                "The xhtml2pdf renderer requires the xhtml2pdf package."
+            )
+        self.pisa = pisa
+
+    def render(self, html, output_path):
+        """
+        This method writes the PDF of the HTML to the output path.
+        :param html: Rendered HTML
+        :param output_path: Path of the PDF
+        """
+        with open(output_path, "wb") as file:
+            result = self.pisa.CreatePDF(html, dest=file, encoding="utf-8")
+        if result.err:
+            raise RuntimeError(f"xhtml2pdf failed with {result.err} errors")
+
+
+RENDERERS = {
+    "pdfkit": PdfkitRenderer,
+    "xhtml2pdf": XHTML2PDFRenderer,
+}
+
+
+class RendererPool:
+    """
+    This class keeps a fixed number of long-lived renderers of one
+    backend. Each render borrows a renderer and gives it back, so the
+    backend setup is paid once per renderer and at most `size`
+    documents are rendered at the same time in the process.
+    """
+    def __init__(self, renderer_class, size):
+        """
+        This function initializes the RendererPool class.
+        :param renderer_class: Renderer class
+        :param size: Number of renderers
+        """
+        self.renderer_class = renderer_class
+        self.size = size
+        self._idle = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        # Renderers are created lazily, up to the pool size
+        while True:
+            with self._lock:
+                create = self._idle.empty() and self._created < self.size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    return self.renderer_class()
+                except Exception:
+                    # The slot is given back, so a failing backend
+                    # doesn't leave the pool without renderers
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            try:
+                # Waiting with a timeout, since a slot given back
+                # by a failed creation doesn't put a renderer
+                return self._idle.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+    def render(self, html, output_path):
+        """
+        This method renders the HTML with one of the pool's renderers.
+        :param html: Rendered HTML
+        :param output_path: Path of the PDF
+        """
+        renderer = self._acquire()
+        try:
+            renderer.render(html, output_path)
+        finally:
+            self._idle.put(renderer)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_renderer_class(backend):
+    """
+    This function resolves a backend name or a dotted path
+    to the renderer class.
+    :param backend: "pdfkit", "xhtml2pdf" or a dotted path
+    :return: Renderer class
+    """
+    if backend in RENDERERS:
+        return RENDERERS[backend]
+    try:
+        return import_string(backend)
+    except ImportError:
+        raise ImproperlyConfigured(f"Unknown PDF renderer: {backend}")
+
+
+def get_renderer(backend=None):
+    """
+    This function returns the process wide renderer pool of the backend.
+    The backend and pool size come from the SYLLABUS_PDF_RENDERER and
+    SYLLABUS_PDF_RENDERER_POOL_SIZE settings.
+    :param backend: Backend name, the configured one by default
+    :return: RendererPool object
+    """
+    backend = backend or settings.SYLLABUS_PDF_RENDERER
+    with _pools_lock:
+        if backend not in _pools:
+            _pools[backend] = RendererPool(
+                get_renderer_class(backend),
+                settings.SYLLABUS_PDF_RENDERER_POOL_SIZE
+            )
+        return _pools[backend]
@@ -0,0 +1,115 @@
+from django.db.models import Exists, OuterRef
+from course.models import Lecture, LectureWaitlistEntry
+from user.models import User
+
+
+class EligibilityVerdict:
+    """
+    This class holds every predicate needed to decide whether
+    the student can register/unregister the lecture, so that
+    validation and registration don't have to query them again.
+    """
+    def __init__(self, lecture, is_student, has_loan, overlapping_lectures):
+        """
+        This function initializes the EligibilityVerdict class.
+        :param lecture: Lecture object annotated by RegistrationEligibility
+        :param is_student: Whether the user is a student
+        :param has_loan: Whether the user has not paid the fee
+        :param overlapping_lectures: Names of overlapping lectures
+        """
+        self.lecture = lecture
+        self.is_student = is_student
+        self.has_loan = has_loan
+        self.is_registered = lecture.is_registered
+        self.is_course_registered = lecture.is_course_registered
+        self.is_waitlisted = lecture.is_waitlisted
+        self.has_waitlist = lecture.has_waitlist
+        self.is_full = lecture.capacity == 0 and not lecture.is_registered
+        self.overlapping_lectures = overlapping_lectures
+
+    @property
+    def is_eligible(self):
+        """
+        Whether the student may register the lecture,
+        if it has a free seat.
+        """
+        return (
+            self.is_student and
+            not self.has_loan and
+            self.is_course_registered and
+            not self.overlapping_lectures
+        )
+
+
+class RegistrationEligibility:
+    """
+    This class is responsible for evaluating the lecture
+    registration predicates for the given student
+    in two queries: one for the lecture and its membership flags
+    and one for the overlapping lectures.
+    """
+    def __init__(self, student):
+        """
+        This function initializes the RegistrationEligibility class.
+        :param student: User object
+        """
+        self.student = student
+
+    def _annotated_lecture(self, lecture_id):
+        """
+        This method fetches the lecture with the student's
+        membership flags annotated.
+        :param lecture_id: Lecture id
+        :return: Lecture object or None
+        """
+        return Lecture.objects.select_related(
+            "course"
+        ).annotate(
+            is_registered=Exists(
+                User.lectures.through.objects.filter(
+                    lecture=OuterRef("pk"),
+                    user=self.student
+                )
+            ),
+            is_course_registered=Exists(
+                User.courses.through.objects.filter(
+                    course=OuterRef("course_id"),
+                    user=self.student
+                )
+            ),
+            is_waitlisted=Exists(
+                LectureWaitlistEntry.objects.filter(
+                    lecture=OuterRef("pk"),
+                    student=self.student,
+                    status=1
+                )
+            ),
+            has_waitlist=Exists(
+                LectureWaitlistEntry.objects.filter(
+                    lecture=OuterRef("pk"),
+                    status=1
+                )
+            ),
+        ).filter(pk=lecture_id).first()
+
+    def evaluate(self, lecture_id):
+        """
+        This method evaluates the registration predicates.
+        :param lecture_id: Lecture id
+        :return: EligibilityVerdict object or None if lecture doesn't exist
+        """
+        lecture = self._annotated_lecture(lecture_id)
+        if lecture is None:
+            return None
+        overlapping_lectures = list(
+            Lecture.objects.get_overlapping_lectures(
+                lecture,
+                self.student
+            ).values_list("name", flat=True)
+        )
+        return EligibilityVerdict(
+            lecture,
+            is_student=self.student.role == 1,
+            has_loan=self.student.loan > 0,
+            overlapping_lectures=overlapping_lectures
+        )
@@ -0,0 +1,170 @@
+import bisect
+from collections import defaultdict
+from course.models import Lecture
+
+AUDITORIUM_CONFLICT = "This auditorium is already reserved."
+PROFESSOR_CONFLICT = "This professor already has a lecture."
+
+
+def _minutes(time):
+    return time.hour * 60 + time.minute
+
+
+def _pk(value):
+    return getattr(value, "pk", value)
+
+
+class IntervalIndex:
+    """
+    This class keeps the [start, end) intervals of one day of
+    an auditorium or a professor sorted by their start.
+    An interval overlapping [start, end) has to start before end and
+    after start minus the longest interval, so the candidates are
+    found with two bisections instead of a scan.
+    """
+    def __init__(self):
+        self.starts = []
+        self.intervals = []
+        self.longest = 0
+
+    def add(self, start, end, item):
+        """
+        This method adds the interval.
+        :param start: Start minute
+        :param end: End minute
+        :param item: Value returned by overlapping()
+        """
+        index = bisect.bisect_right(self.starts, start)
+        self.starts.insert(index, start)
+        self.intervals.insert(index, (start, end, item))
+        self.longest = max(self.longest, end - start)
+
+    def overlapping(self, start, end):
+        """
+        This method finds the intervals overlapping [start, end).
+        :param start: Start minute
+        :param end: End minute
+        :return: List of items
+        """
+        low = bisect.bisect_right(self.starts, start - self.longest)
+        high = bisect.bisect_left(self.starts, end)
+        return [
+            item for interval_start, interval_end, item
+            in self.intervals[low:high] if interval_end > start
+        ]
+
+
+class ScheduleConflicts:
+    """
+    This class is responsible for finding the auditorium and professor
+    conflicts of a semester's lectures.
+
+    One lecture is checked with range queries on the
+    (semester, day, location/professor, start_time) indexes.
+    For importing many lectures, preload() reads the semester's
+    timetable once into interval indexes, and the lectures
+    added with add() are checked against each other as well.
+    """
+    def __init__(self, semester):
+        """
+        This function initializes the ScheduleConflicts class.
+        :param semester: Semester object or id
+        """
+        self.semester = semester
+        self.auditoriums = None
+        self.professors = None
+
+    @staticmethod
+    def queryset():
+        # The day is a translated field, the lookups use its own
+        # column, which always has the last saved day
+        return Lecture.objects.rewrite(False)
+
+    def preload(self):
+        """
+        This method loads the semester's timetable into interval indexes.
+        :return: self
+        """
+        self.auditoriums = defaultdict(IntervalIndex)
+        self.professors = defaultdict(IntervalIndex)
+        lectures = self.queryset().filter(
+            semester=self.semester,
+            start_time__isnull=False,
+            end_time__isnull=False
+        ).values_list(
+            "pk", "day", "location_id", "professor_id",
+            "start_time", "end_time"
+        )
+        for pk, day, location, professor, start_time, end_time in lectures:
+            self._add(pk, day, location, professor, start_time, end_time)
+        return self
+
+    def _add(self, pk, day, location, professor, start_time, end_time):
+        start, end = _minutes(start_time), _minutes(end_time)
+        if location is not None:
+            self.auditoriums[day, location].add(start, end, pk)
+        if professor is not None:
+            self.professors[day, professor].add(start, end, pk)
+
+    def add(self, lecture, pk=None):
+        """
+        This method adds a validated lecture to the preloaded indexes.
+        :param lecture: Dictionary of the lecture fields
+        :param pk: Lecture id, if it is already saved
+        """
+        self._add(
+            pk,
+            lecture["day"],
+            _pk(lecture.get("location")),
+            _pk(lecture.get("professor")),
+            lecture["start_time"],
+            lecture["end_time"]
+        )
+
+    def _overlaps(self, index, key, start, end, exclude):
+        if key[1] is None or key not in index:
+            return False
+        return any(
+            pk is None or pk != exclude
+            for pk in index[key].overlapping(start, end)
+        )
+
+    def check(self, lecture, exclude=None):
+        """
+        This method finds the conflicts of the lecture.
+        :param lecture: Dictionary with day, start_time, end_time,
+        location and professor
+        :param exclude: id of the lecture being updated
+        :return: List of error messages
+        """
+        day = lecture["day"]
+        start_time = lecture["start_time"]
+        end_time = lecture["end_time"]
+        location = _pk(lecture.get("location"))
+        professor = _pk(lecture.get("professor"))
+        errors = []
+        if self.auditoriums is not None:
+            start, end = _minutes(start_time), _minutes(end_time)
+            if self._overlaps(self.auditoriums, (day, location),
+                              start, end, exclude):
+                errors.append(AUDITORIUM_CONFLICT)
+            if self._overlaps(self.professors, (day, professor),
+                              start, end, exclude):
+                errors.append(PROFESSOR_CONFLICT)
+            return errors
+
+        overlapping = self.queryset().filter(
+            semester=self.semester,
+            day=day,
+            start_time__lt=end_time,
+            end_time__gt=start_time
+        )
+        if exclude is not None:
+            overlapping = overlapping.exclude(pk=exclude)
+        if location is not None and \
+                overlapping.filter(location=location).exists():
+            errors.append(AUDITORIUM_CONFLICT)
+        if professor is not None and \
+                overlapping.filter(professor=professor).exists():
+            errors.append(PROFESSOR_CONFLICT)
+        return errors
@@ -0,0 +1,216 @@
+import datetime
+from django.db.models import Exists, OuterRef
+from course.models import Lecture
+from user.models import User
+from utils.helpers import get_semester
+
+MINUTES_PER_BIT = 5
+BITS_PER_DAY = 24 * 60 // MINUTES_PER_BIT
+DAY_MASK = (1 << BITS_PER_DAY) - 1
+DAY_MASKS = [DAY_MASK << (day * BITS_PER_DAY) for day in range(7)]
+
+
+def time_mask(day, start_time, end_time):
+    """
+    Encode the [start_time, end_time) interval of the day as bits
+    of the week, one bit per 5 minutes, so two lectures overlap
+    exactly when their masks have a common bit.
+    :return: int, 0 if the lecture has no time
+    """
+    if day is None or start_time is None or end_time is None:
+        return 0
+    start = (start_time.hour * 60 + start_time.minute) // MINUTES_PER_BIT
+    end = -(-(end_time.hour * 60 + end_time.minute) // MINUTES_PER_BIT)
+    if end <= start:
+        return 0
+    return ((1 << (end - start)) - 1) << ((day - 1) * BITS_PER_DAY + start)
+
+
+class ScheduleRecommender:
+    """
+    This class is responsible for finding the combinations of lectures
+    of the student's registered courses that don't overlap.
+
+    Every lecture is a bitset of its time in the week, so choosing
+    a lecture is a bitwise AND with the lectures chosen so far.
+    The courses with the fewest lectures are chosen first, and once
+    there are enough combinations, the branches that can't beat
+    the worst of them are cut. Full lectures are left out unless the
+    student is registered to them.
+
+    The combinations are ranked by the covered courses,
+    the kept registrations, the days at the university
+    and the idle time between the lectures.
+    """
+    def __init__(self, student, semester=None, limit=10, max_nodes=100000):
+        """
+        This function initializes the ScheduleRecommender class.
+        :param student: User object
+        :param semester: Semester object, the current one by default
+        :param limit: Number of combinations to return
+        :param max_nodes: Number of search steps after which the best
+        combinations found so far are returned
+        """
+        self.student = student
+        self.semester = semester or get_semester()
+        self.limit = limit
+        self.max_nodes = max_nodes
+
+    def lectures(self):
+        """
+        This method fetches the semester's lectures
+        of the student's registered courses.
+        :return: List of dictionaries
+        """
+        # The day is a translated field, its own column
+        # always has the last saved day
+        return list(Lecture.objects.rewrite(False).filter(
+            semester=self.semester,
+            course__in=User.courses.through.objects.filter(
+                user=self.student
+            ).values("course_id")
+        ).annotate(
+            is_registered=Exists(
+                User.lectures.through.objects.filter(
+                    lecture=OuterRef("pk"),
+                    user=self.student
+                )
+            )
+        ).order_by("pk").values(
+            "id", "name", "course", "day", "start_time", "end_time",
+            "location", "professor", "capacity", "is_registered"
+        ))
+
+    @staticmethod
+    def _days(used):
+        """
+        This method counts the days of the combination.
+        """
+        return sum(1 for day_mask in DAY_MASKS if used & day_mask)
+
+    @staticmethod
+    def _idle(used):
+        """
+        This method counts the idle minutes of the combination
+        between the first and the last lecture of every day.
+        """
+        idle = 0
+        while used:
+            day = used & DAY_MASK
+            if day:
+                span = day.bit_length() - (day & -day).bit_length() + 1
+                idle += span - day.bit_count()
+            used >>= BITS_PER_DAY
+        return idle * MINUTES_PER_BIT
+
+    def recommend(self):
+        """
+        This method finds the best combinations.
+        :return: Dictionary with the combinations, the courses
+        without an available lecture and whether the search finished
+        """
+        courses = list(
+            self.student.courses.order_by("pk").values_list("pk", flat=True)
+        )
+        options = {course: [] for course in courses}
+        for lecture in self.lectures():
+            if lecture["capacity"] == 0 and not lecture["is_registered"]:
+                continue
+            mask = time_mask(
+                lecture["day"],
+                lecture["start_time"],
+                lecture["end_time"]
+            )
+            options[lecture["course"]].append((mask, lecture))
+        for course_options in options.values():
+            course_options.sort(key=lambda option: (
+                not option[1]["is_registered"],
+                -(option[1]["capacity"] or 0)
+            ))
+        order = sorted(
+            (course for course in courses if options[course]),
+            key=lambda course: (len(options[course]), course)
+        )
+
+        # The courses from every position on that have a registered lecture
+        registrable = [0] * (len(order) + 1)
+        for position in reversed(range(len(order))):
+            registrable[position] = registrable[position + 1] + any(
+                lecture["is_registered"]
+                for _, lecture in options[order[position]]
+            )
+
+        found = []
+        chosen = []
+        nodes = 0
+        # The key of the worst kept combination
+        worst = None
+
+        def keep(used, registered):
+            nonlocal worst
+            days = self._days(used)
+            # The idle time is only counted if the combination can be kept
+            if worst is not None and \
+                    (-len(chosen), -registered, days) > worst[:3]:
+                return
+            key = (
+                -len(chosen), -registered, days, self._idle(used),
+                sorted(lecture["id"] for lecture in chosen)
+            )
+            found.append((key, list(chosen)))
+            if len(found) >= self.limit * 4:
+                found.sort(key=lambda combination: combination[0])
+                del found[self.limit:]
+                worst = found[-1][0]
+
+        def search(position, used, registered):
+            nonlocal nodes
+            nodes += 1
+            if nodes > self.max_nodes:
+                return
+            if worst is not None:
+                # The best key the branch can still reach
+                if (
+                    -len(chosen) - len(order) + position,
+                    -registered - registrable[position],
+                    self._days(used)
+                ) > worst[:3]:
+                    return
+            if position == len(order):
+                if chosen:
+                    keep(used, registered)
+                return
+            for mask, lecture in options[order[position]]:
+                if not used & mask:
+                    chosen.append(lecture)
+                    search(
+                        position + 1,
+                        used | mask,
+                        registered + lecture["is_registered"]
+                    )
+                    chosen.pop()
+            search(position + 1, used, registered)
+
+        search(0, 0, 0)
+        found.sort(key=lambda combination: combination[0])
+        combinations = []
+        for key, lectures in found[:self.limit]:
+            covered = {lecture["course"] for lecture in lectures}
+            combinations.append({
+                "lectures": sorted(lectures, key=lambda lecture: (
+                    lecture["day"] or 0,
+                    lecture["start_time"] or datetime.time.min
+                )),
+                "days": key[2],
+                "idle_minutes": key[3],
+                "missing_courses": [
+                    course for course in order if course not in covered
+                ],
+            })
+        return {
+            "combinations": combinations,
+            "unavailable_courses": [
+                course for course in courses if not options[course]
+            ],
+            "complete": nodes <= self.max_nodes,
+        }
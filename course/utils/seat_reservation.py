@@ -0,0 +1,185 @@
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.signals import m2m_changed
+from course.models import Lecture, GradeRecord, LectureWaitlistEntry
+from user.models import User
+
+
+class SeatReservation:
+    """
+    This class is responsible for reserving and releasing
+    a lecture seat for the given student.
+    The capacity check and the decrement are done in one
+    conditional UPDATE, so concurrent registrations can't
+    oversubscribe the lecture or overwrite each other's changes.
+    """
+    def __init__(self, student, lecture):
+        """
+        This function initializes the SeatReservation class.
+        :param student: User object
+        :param lecture: Lecture object
+        """
+        self.student = student
+        self.lecture = lecture
+        self.memberships = User.lectures.through.objects
+
+    def is_registered(self):
+        """
+        This method checks if the student holds a seat in the lecture.
+        :return: bool
+        """
+        return self.memberships.filter(
+            user=self.student,
+            lecture=self.lecture
+        ).exists()
+
+    def _lock_student(self):
+        """
+        This method locks the student's row until the end of the
+        transaction, so the same student's concurrent registrations
+        check the membership one at a time.
+        """
+        list(
+            User.objects.select_for_update().filter(
+                pk=self.student.pk
+            ).values_list("pk", flat=True)
+        )
+
+    def _take_seat(self):
+        """
+        This method decrements the capacity if there is a free seat.
+        Lectures without capacity are treated as unlimited.
+        :return: bool, whether a seat was taken
+        """
+        return Lecture.objects.filter(
+            Q(capacity__gt=0) | Q(capacity__isnull=True),
+            pk=self.lecture.pk,
+        ).update(capacity=F("capacity") - 1) == 1
+
+    def _give_seat(self):
+        """
+        This method increments the capacity of the lecture.
+        """
+        Lecture.objects.filter(
+            pk=self.lecture.pk
+        ).update(capacity=F("capacity") + 1)
+
+    def give_back_seat(self):
+        """
+        This method returns the seat to the lecture and, after commit,
+        hands it to the lecture's waitlist if anyone is waiting.
+        """
+        from course.tasks import process_lecture_waitlist
+        self._give_seat()
+        lecture_id = self.lecture.pk
+        if LectureWaitlistEntry.objects.filter(
+                lecture_id=lecture_id,
+                status=1
+        ).exists():
+            transaction.on_commit(
+                lambda: process_lecture_waitlist.delay(lecture_id)
+            )
+
+    def _membership_changed(self, action):
+        """
+        This method sends the m2m_changed signal that add()/remove()
+        would send, since the membership is written directly.
+        :param action: "post_add" or "post_remove"
+        """
+        m2m_changed.send(
+            sender=User.lectures.through,
+            instance=self.student,
+            action=action,
+            reverse=False,
+            model=Lecture,
+            pk_set={self.lecture.pk},
+            using=self.memberships.db
+        )
+
+    def reserve(self):
+        """
+        This method registers the student for the lecture.
+        If the student has an older lecture of the same course,
+        it is dropped and its grade record is deactivated.
+        A dropped lecture of the same semester gets its seat back.
+        :return: bool, False if the lecture is full
+        """
+        with transaction.atomic():
+            # The membership is checked under the lock, otherwise two
+            # requests of the student could both take a seat
+            self._lock_student()
+            if self.is_registered():
+                return True
+            if not self._take_seat():
+                return False
+            duplicate_lecture = self.student.lectures.filter(
+                course=self.lecture.course_id
+            ).order_by("-created_at").first()
+            if duplicate_lecture is not None:
+                # If the user has already registered
+                # for the course in the past
+                self.student.lectures.remove(duplicate_lecture)
+                if duplicate_lecture.semester_id == self.lecture.semester_id:
+                    # The student switched lectures in this semester,
+                    # so the seat goes back to the other lecture
+                    SeatReservation(
+                        self.student,
+                        duplicate_lecture
+                    ).give_back_seat()
+                GradeRecord.objects.filter(
+                    student=self.student,
+                    lecture__course=self.lecture.course_id,
+                    is_active=True
+                ).update(is_active=False)
+            # The student is known not to be registered here,
+            # so the membership is inserted without add()'s lookup
+            self.memberships.bulk_create(
+                [self.memberships.model(
+                    user=self.student,
+                    lecture=self.lecture
+                )],
+                ignore_conflicts=True
+            )
+            self._membership_changed("post_add")
+        return True
+
+    def release(self):
+        """
+        This method unregisters the student from the lecture.
+        If the student has an older grade record for the same course,
+        its lecture is restored and the record is activated again.
+        A lecture of the same semester needs a free seat to be restored.
+        :return: bool, False if the student was not registered
+        """
+        with transaction.atomic():
+            deleted, _ = self.memberships.filter(
+                user=self.student,
+                lecture=self.lecture
+            ).delete()
+            if not deleted:
+                return False
+            self._membership_changed("post_remove")
+            self._give_seat()
+            grade_record = GradeRecord.objects.select_related(
+                "lecture"
+            ).filter(
+                student=self.student,
+                lecture__course=self.lecture.course_id,
+                is_active=False
+            ).order_by("-created_at").first()
+            if grade_record is not None and (
+                    grade_record.lecture.semester_id !=
+                    self.lecture.semester_id or
+                    SeatReservation(
+                        self.student,
+                        grade_record.lecture
+                    )._take_seat()
+            ):
+                # If the user has already registered for
+                # the course in the past. A lecture of this
+                # semester is restored only if it still has a seat
+                self.student.lectures.add(grade_record.lecture_id)
+                GradeRecord.objects.filter(
+                    pk=grade_record.pk
+                ).update(is_active=True)
+        return True
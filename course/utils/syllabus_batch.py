@@ -0,0 +1,329 @@
+import json
+import os
+import tempfile
+import uuid
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from celery import chord
+from django.conf import settings
+from django.db import transaction
+from course.models import Lecture, SyllabusBatchJob
+from course.serilalizers import SyllabusSerializer
+from course.utils.syllabus_jobs import SyllabusJob
+from course.utils.syllabus_generator import SyllabusGenerator
+from utils.helpers import get_semester
+
+
+def _prepare_worker():
+    """
+    Compile the syllabus template once per worker process.
+    """
+    import django
+    django.setup()
+    SyllabusGenerator.template()
+
+
+def _render(index, payload, directory):
+    """
+    Render one syllabus of the batch in a worker process.
+    :return: (index, path, error)
+    """
+    name = f"{index + 1:03}-{payload.get('course_code') or 'syllabus'}.pdf"
+    try:
+        result = SyllabusGenerator(payload).generate_syllabus(
+            os.path.join(directory, name)
+        )
+    except Exception as e:
+        return index, None, str(e)
+    if isinstance(result, dict):
+        return index, None, result["error"]
+    return index, result, None
+
+
+class SyllabusBatch:
+    """
+    This class is responsible for generating many syllabi at once.
+
+    The syllabi are rendered in parallel and packed into one zip
+    with an errors.json report of the failed items. run() renders them
+    in a process pool, start() sends one generate_syllabus task per
+    syllabus to the "syllabus" queue and packs them in a chord callback.
+    """
+    directory = "generated_syllabus/batches"
+
+    def __init__(self, payloads, workers=None, errors=None):
+        """
+        This function initializes the SyllabusBatch class.
+        :param payloads: List of syllabus data
+        :param workers: Number of processes, the number of CPUs by default,
+        0 renders in this process
+        :param errors: Errors of the items rejected before rendering
+        """
+        self.payloads = payloads
+        self.workers = workers
+        self.errors = errors or []
+
+    @classmethod
+    def from_payloads(cls, payloads, workers=None):
+        """
+        This method validates the given syllabus data one by one.
+        The invalid items are reported instead of failing the batch.
+        :param payloads: List of syllabus data
+        :param workers: Number of processes
+        :return: SyllabusBatch object
+        """
+        valid = []
+        errors = []
+        for index, payload in enumerate(payloads):
+            serializer = SyllabusSerializer(data=payload)
+            if serializer.is_valid():
+                valid.append(SyllabusJob.normalize(serializer.validated_data))
+                continue
+            errors.append({
+                "index": index,
+                "course_code": payload.get("course_code")
+                if isinstance(payload, dict) else None,
+                "error": serializer.errors,
+            })
+            # Keep the place of the item, so indexes match the input
+            valid.append(None)
+        return cls(valid, workers, errors)
+
+    @classmethod
+    def from_department(cls, department, semester=None, workers=None):
+        """
+        This method builds the syllabus data of the department's lectures
+        from the course, lecture, assignment and professor data.
+        :param department: Department object
+        :param semester: Semester object, the current one by default
+        :param workers: Number of processes
+        :return: SyllabusBatch object
+        """
+        semester = semester or get_semester()
+        lectures = Lecture.objects.filter(
+            course__department=department,
+            professor__isnull=False
+        ).select_related(
+            "course",
+            "professor",
+            "semester"
+        ).prefetch_related(
+            "assignment_set"
+        ).order_by("course__code", "pk")
+        if semester is not None:
+            lectures = lectures.filter(semester=semester)
+        return cls([cls.lecture_payload(lecture) for lecture in lectures],
+                   workers)
+
+    @staticmethod
+    def lecture_payload(lecture):
+        """
+        This method builds the syllabus data of one lecture.
+        The fields the database doesn't have are left empty.
+        :param lecture: Lecture object
+        :return: dict
+        """
+        assignments = defaultdict(list)
+        for assignment in lecture.assignment_set.all():
+            assignments[assignment.name].append(assignment.max_points)
+        professor = lecture.professor
+        return {
+            "course_name": lecture.course.name,
+            "course_code": lecture.course.code,
+            "ECTS": lecture.course.credits,
+            "semester": lecture.semester.semester if lecture.semester else "",
+            "lecturer": professor.get_full_name,
+            "lecturer_eng": professor.get_full_name,
+            "lecturer_email": professor.email,
+            "assignments": [
+                {
+                    "info": name,
+                    "amount": str(len(points)),
+                    "grade": str(points[0]),
+                    "total": str(sum(points)),
+                } for name, points in assignments.items()
+            ],
+            "lecture_plans": [],
+        }
+
+    def _render_all(self, directory):
+        """
+        This method renders the valid items into the directory.
+        With workers=0 they are rendered one by one in this process.
+        :return: Iterator of (index, path, error)
+        """
+        items = [
+            (index, payload) for index, payload in enumerate(self.payloads)
+            if payload is not None
+        ]
+        if self.workers == 0:
+            SyllabusGenerator.template()
+            for index, payload in items:
+                yield _render(index, payload, directory)
+            return
+        with ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_prepare_worker
+        ) as executor:
+            futures = [
+                executor.submit(_render, index, payload, directory)
+                for index, payload in items
+            ]
+            for future in futures:
+                yield future.result()
+
+    def run(self, output_path=None):
+        """
+        This method renders the syllabi and writes the zip.
+        :param output_path: Path of the zip, a new file under the
+        media root by default
+        :return: Dictionary with the zip path, and the rendered and
+        failed counts and errors
+        """
+        if output_path is None:
+            output_path = os.path.join(
+                settings.MEDIA_ROOT,
+                self.directory,
+                f"{uuid.uuid4().hex}.zip"
+            )
+        errors = list(self.errors)
+        rendered = []
+        with tempfile.TemporaryDirectory() as directory:
+            for index, path, error in self._render_all(directory):
+                if error is None:
+                    rendered.append(path)
+                else:
+                    errors.append({
+                        "index": index,
+                        "course_code":
+                            self.payloads[index].get("course_code"),
+                        "error": error,
+                    })
+            self._write_zip(
+                output_path,
+                [(os.path.basename(path), path) for path in rendered],
+                errors
+            )
+        return {
+            "path": output_path,
+            "url": self.url(output_path),
+            "rendered": len(rendered),
+            "failed": len(errors),
+            "errors": errors,
+        }
+
+    @staticmethod
+    def _write_zip(output_path, files, errors):
+        """
+        This method writes the rendered syllabi and the errors report.
+        :param output_path: Path of the zip
+        :param files: List of (name in the zip, path) tuples
+        :param errors: List of error dictionaries
+        """
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        errors.sort(key=lambda error: error["index"])
+        with zipfile.ZipFile(
+                output_path,
+                "w",
+                compression=zipfile.ZIP_DEFLATED
+        ) as archive:
+            for name, path in files:
+                archive.write(path, name)
+            archive.writestr(
+                "errors.json",
+                json.dumps(errors, ensure_ascii=False, indent=2)
+            )
+
+    def start(self):
+        """
+        This method records the batch and enqueues one generate_syllabus
+        task per syllabus that isn't generated yet. Identical syllabi
+        share one task. The zip is packed by pack_syllabus_batch once
+        every task has finished.
+        :return: SyllabusBatchJob object
+        """
+        from course.tasks import generate_syllabus, pack_syllabus_batch, \
+            fail_syllabus_batch
+        items = []
+        renders = {}
+        for index, payload in enumerate(self.payloads):
+            if payload is None:
+                continue
+            job = SyllabusJob.for_data(payload)
+            items.append({
+                "index": index,
+                "job_id": job.job_id,
+                "course_code": payload.get("course_code"),
+            })
+            if job.job_id not in renders and not os.path.exists(job.path):
+                renders[job.job_id] = generate_syllabus.si(
+                    job.job_id,
+                    payload
+                )
+        batch = SyllabusBatchJob.objects.create(
+            batch_id=uuid.uuid4().hex,
+            items=items,
+            errors=self.errors
+        )
+        callback = pack_syllabus_batch.si(batch.batch_id)
+        if renders:
+            callback = callback.on_error(
+                fail_syllabus_batch.s(batch.batch_id)
+            )
+            transaction.on_commit(
+                lambda: chord(list(renders.values()))(callback)
+            )
+        else:
+            transaction.on_commit(callback.delay)
+        return batch
+
+    @classmethod
+    def pack(cls, batch):
+        """
+        This method packs the syllabi rendered for the batch into a zip.
+        The syllabi that weren't rendered are reported with
+        the error of their job.
+        :param batch: SyllabusBatchJob object
+        :return: Dictionary with the media url of the zip, and the
+        rendered and failed counts and errors
+        """
+        errors = list(batch.errors)
+        files = []
+        for item in batch.items:
+            job = SyllabusJob(item["job_id"])
+            if os.path.exists(job.path):
+                name = f"{item['index'] + 1:03}-" \
+                       f"{item['course_code'] or 'syllabus'}.pdf"
+                files.append((name, job.path))
+                continue
+            state = job.status() or {}
+            errors.append({
+                "index": item["index"],
+                "course_code": item["course_code"],
+                "error": state.get("error") or "The syllabus wasn't generated",
+            })
+        output_path = os.path.join(
+            settings.MEDIA_ROOT,
+            cls.directory,
+            f"{batch.batch_id}.zip"
+        )
+        cls._write_zip(output_path, files, errors)
+        return {
+            "url": cls.url(output_path),
+            "rendered": len(files),
+            "failed": len(errors),
+            "errors": errors,
+        }
+
+    @staticmethod
+    def url(path):
+        """
+        This method returns the media url of a zip under the media root.
+        :param path: Path of the zip
+        :return: str or None if the zip is outside the media root
+        """
+        relative = os.path.relpath(path, settings.MEDIA_ROOT)
+        if relative.startswith(os.pardir):
+            return None
+        return f"{settings.MEDIA_URL}{relative.replace(os.sep, '/')}"
@@ -1,13 +1,16 @@
 import datetime
-import os
-import pdfkit
 from django.template.loader import get_template
 from dotenv import load_dotenv
+from course.utils.pdf_renderers import get_renderer
 
 load_dotenv()
 
 
 class SyllabusGenerator:
+    template_name = "syllabus_template.html"
+    # Compiled once per process, see template()
+    _template = None
+
     def __init__(self, data):
         """
         This class is responsible for generating the syllabus of the course.
@@ -51,27 +54,38 @@ class SyllabusGenerator:
         }
         return context
 
-    def generate_syllabus(self):
+    @classmethod
+    def template(cls):
+        """
+        This method returns the compiled syllabus template.
+        :return: Template
+        """
+        if cls._template is None:
+            cls._template = get_template(cls.template_name)
+        return cls._template
+
+    def generate_syllabus(self, output_path=None, backend=None):
         """
         This method generates the syllabus.
+        :param output_path: Where to write the PDF, by default
+        a name made of the course code and the lecturer
+        :param backend: PDF renderer, SYLLABUS_PDF_RENDERER by default
         :return: output_path: The path of the generated syllabus.
         """
-        template = get_template("syllabus_template.html")
-        output_text = template.render(self.context)
-
-        config_path = os.getenv("WKHTMLTOPDF_PATH")
-        config = pdfkit.configuration(wkhtmltopdf=config_path)
+        output_text = self.template().render(self.context)
 
-        course_code = self.data.get("course_code", "")
-        lecturer_first_name = self.data.get("lecturer_eng", "").split(" ")[0]
-        lecturer_last_name = self.data.get("lecturer_eng", "").split(" ")[1]
-        cur_year = datetime.datetime.now().year
-        output_path = (f"media/generated_syllabus/syllabus"
-                       f"-{course_code}-{lecturer_first_name}"
-                       f"-{lecturer_last_name}-{cur_year}.pdf")
+        if output_path is None:
+            course_code = self.data.get("course_code", "")
+            lecturer_eng = self.data.get("lecturer_eng", "").split(" ")
+            lecturer_first_name = lecturer_eng[0]
+            lecturer_last_name = lecturer_eng[1]
+            cur_year = datetime.datetime.now().year
+            output_path = (f"media/generated_syllabus/syllabus"
+                           f"-{course_code}-{lecturer_first_name}"
+                           f"-{lecturer_last_name}-{cur_year}.pdf")
 
         try:
-            pdfkit.from_string(output_text, output_path, configuration=config)
+            get_renderer(backend).render(output_text, output_path)
         except Exception as e:
             return {"error": str(e)}
         return output_path
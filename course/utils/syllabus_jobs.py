@@ -0,0 +1,132 @@
+import datetime
+import hashlib
+import json
+import os
+import re
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from course.models import SyllabusJobState
+
+
+class SyllabusJob:
+    """
+    This class is responsible for tracking a syllabus render.
+
+    The job id is the hash of the syllabus data, so identical
+    requests share one job and one generated file. A job is ready
+    once its file exists; pending and failed jobs are tracked
+    with SyllabusJobState rows.
+    """
+    directory = "generated_syllabus"
+    # Pending/failed states are kept for this many seconds
+    status_timeout = 60 * 60
+
+    def __init__(self, job_id):
+        """
+        This function initializes the SyllabusJob class.
+        :param job_id: Hash of the syllabus data
+        """
+        self.job_id = job_id
+
+    @staticmethod
+    def normalize(data):
+        """
+        This method turns the validated data into plain JSON types,
+        so it can be hashed and sent to the task.
+        :param data: Validated SyllabusSerializer data
+        :return: dict
+        """
+        return json.loads(json.dumps(data, default=str))
+
+    @classmethod
+    def for_data(cls, data):
+        """
+        This method returns the job of the syllabus data.
+        :param data: Normalized syllabus data
+        :return: SyllabusJob object
+        """
+        payload = json.dumps(data, sort_keys=True, ensure_ascii=False)
+        return cls(hashlib.sha256(payload.encode()).hexdigest())
+
+    @staticmethod
+    def is_valid_id(job_id):
+        return re.fullmatch(r"[0-9a-f]{64}", job_id) is not None
+
+    @property
+    def relative_path(self):
+        return f"{self.directory}/{self.job_id}.pdf"
+
+    @property
+    def path(self):
+        return os.path.join(settings.MEDIA_ROOT, self.relative_path)
+
+    @property
+    def url(self):
+        return f"{settings.MEDIA_URL}{self.relative_path}"
+
+    def _expiry(self):
+        return timezone.now() - datetime.timedelta(
+            seconds=self.status_timeout
+        )
+
+    def _state(self):
+        """
+        This method returns the job's state row, unless it has expired.
+        """
+        return SyllabusJobState.objects.filter(
+            job_id=self.job_id,
+            updated_at__gte=self._expiry()
+        ).first()
+
+    def status(self):
+        """
+        This method returns the state of the job.
+        :return: Dictionary with status (and error), or None if unknown
+        """
+        if os.path.exists(self.path):
+            return {"status": "ready"}
+        state = self._state()
+        if state is None:
+            return None
+        if state.status == 2:
+            return {"status": "failed", "error": state.error}
+        return {"status": "pending"}
+
+    def start(self, data):
+        """
+        This method enqueues the render unless the file already exists
+        or the same job is already pending. Failed and expired jobs
+        are retried.
+        :param data: Normalized syllabus data
+        :return: Status dictionary
+        """
+        from course.tasks import generate_syllabus
+        state = self.status()
+        if state and state["status"] in ["ready", "pending"]:
+            return state
+        pending = {"status": "pending"}
+        row, created = SyllabusJobState.objects.get_or_create(
+            job_id=self.job_id
+        )
+        if not created:
+            # Only the request that moves a failed or expired job
+            # back to pending enqueues it
+            retried = SyllabusJobState.objects.filter(
+                Q(status=2) | Q(updated_at__lt=self._expiry()),
+                pk=row.pk,
+                updated_at=row.updated_at
+            ).update(status=1, error="", updated_at=timezone.now())
+            if not retried:
+                return self.status() or pending
+        generate_syllabus.delay(self.job_id, data)
+        return pending
+
+    def finish(self):
+        SyllabusJobState.objects.filter(job_id=self.job_id).delete()
+
+    def fail(self, error):
+        SyllabusJobState.objects.update_or_create(
+            job_id=self.job_id,
+            defaults={"status": 2, "error": error}
+        )
@@ -0,0 +1,298 @@
+import datetime
+import itertools
+from collections import Counter, defaultdict
+from course.models import Auditorium
+from user.models import User
+from course.utils.schedule_conflicts import ScheduleConflicts
+
+DEFAULT_DAYS = [1, 2, 3, 4, 5]
+DEFAULT_SLOTS = [
+    (datetime.time(9, 0), datetime.time(10, 50)),
+    (datetime.time(11, 0), datetime.time(12, 50)),
+    (datetime.time(13, 0), datetime.time(14, 50)),
+    (datetime.time(15, 0), datetime.time(16, 50)),
+    (datetime.time(17, 0), datetime.time(18, 50)),
+    (datetime.time(19, 0), datetime.time(20, 50)),
+]
+
+
+class TimetableSolver:
+    """
+    This class is responsible for assigning a day, a time slot and
+    an auditorium to every lecture of a semester.
+
+    Hard constraints: a professor and an auditorium have one lecture
+    per slot, the auditorium fits the lecture's capacity and has
+    computers when the lecture needs them. The soft constraint is
+    the number of students whose courses are taught at the same time.
+
+    The lectures are placed greedily, most constrained first, at the
+    slot with the fewest clashing students and in the smallest
+    auditorium that fits. Then a local search moves the clashing
+    lectures to better slots until no move helps.
+    """
+    def __init__(self, lectures, auditoriums, cohorts=None, busy=None,
+                 days=None, slots=None, iterations=10):
+        """
+        This function initializes the TimetableSolver class.
+        :param lectures: List of dictionaries with course, professor,
+        capacity and needs_computers
+        :param auditoriums: List of (id, capacity, has_computers) tuples
+        :param cohorts: Dictionary of course id to the set of its students
+        :param busy: Callable (day, start_time, end_time, location,
+        professor) -> bool, for the slots taken by existing lectures
+        :param days: Days of the week to use
+        :param slots: List of (start_time, end_time) tuples
+        :param iterations: Maximum number of local search passes
+        """
+        self.lectures = lectures
+        self.auditoriums = sorted(auditoriums, key=lambda room: room[1])
+        self.days = days or DEFAULT_DAYS
+        self.slots = slots or DEFAULT_SLOTS
+        self.periods = list(itertools.product(
+            range(len(self.days)),
+            range(len(self.slots))
+        ))
+        self.busy = busy
+        self.iterations = iterations
+        self.weights = self._weights(cohorts or {})
+
+    @classmethod
+    def for_semester(cls, semester, lectures, **kwargs):
+        """
+        This method creates the solver with the auditoriums,
+        the students of the lectures' courses and the existing
+        lectures of the semester.
+        :param semester: Semester object
+        :param lectures: List of lecture dictionaries
+        :return: TimetableSolver object
+        """
+        course_ids = {lecture["course"] for lecture in lectures}
+        cohorts = defaultdict(set)
+        for user_id, course_id in User.courses.through.objects.filter(
+                course_id__in=course_ids,
+                user__role=1
+        ).values_list("user_id", "course_id"):
+            cohorts[course_id].add(user_id)
+        conflicts = ScheduleConflicts(semester).preload()
+
+        def busy(day, start_time, end_time, location, professor):
+            return bool(conflicts.check({
+                "day": day,
+                "start_time": start_time,
+                "end_time": end_time,
+                "location": location,
+                "professor": professor,
+            }))
+
+        return cls(
+            lectures,
+            list(Auditorium.objects.values_list(
+                "pk", "capacity", "has_computers"
+            )),
+            cohorts=cohorts,
+            busy=busy,
+            **kwargs
+        )
+
+    @staticmethod
+    def _weights(cohorts):
+        """
+        This method counts the shared students of every pair of courses.
+        :param cohorts: Dictionary of course id to the set of its students
+        :return: Dictionary of course id to {course id: shared students}
+        """
+        courses_of_student = defaultdict(list)
+        for course_id, students in cohorts.items():
+            for student in students:
+                courses_of_student[student].append(course_id)
+        weights = defaultdict(Counter)
+        for courses in courses_of_student.values():
+            for first, second in itertools.combinations(courses, 2):
+                weights[first][second] += 1
+                weights[second][first] += 1
+        return weights
+
+    def _clashes(self, course, period):
+        """
+        This method counts the students of the course that have
+        another course at the period.
+        """
+        weights = self.weights.get(course)
+        if not weights:
+            return 0
+        courses = self.courses_at[period]
+        if len(weights) < len(courses):
+            return sum(
+                weight * courses[other]
+                for other, weight in weights.items() if other in courses
+            )
+        return sum(
+            weights[other] * count
+            for other, count in courses.items() if other in weights
+        )
+
+    def _free_rooms(self, index, period):
+        lecture = self.lectures[index]
+        day, slot = self.days[period[0]], self.slots[period[1]]
+        for room, capacity, has_computers in self.auditoriums:
+            if capacity < lecture["capacity"] or \
+                    lecture.get("needs_computers") and not has_computers:
+                continue
+            if (period, room) in self.rooms_taken:
+                continue
+            if self.busy and self.busy(day, *slot, room, None):
+                continue
+            yield room
+
+    def _professor_free(self, index, period):
+        professor = self.lectures[index].get("professor")
+        if professor is None:
+            return True
+        if (period, professor) in self.professors_taken:
+            return False
+        day, slot = self.days[period[0]], self.slots[period[1]]
+        return not (self.busy and self.busy(day, *slot, None, professor))
+
+    def _best_option(self, index):
+        """
+        This method finds the period and auditorium with
+        the fewest clashes, and the fewest lectures on ties.
+        :return: (clashes, period, room) or None if nothing fits
+        """
+        course = self.lectures[index]["course"]
+        best = None
+        for period in self.periods:
+            if not self._professor_free(index, period):
+                continue
+            clashes = self._clashes(course, period)
+            key = (clashes, self.load[period])
+            if best is not None and key >= best[0]:
+                continue
+            room = next(self._free_rooms(index, period), None)
+            if room is not None:
+                best = (key, period, room)
+        if best is None:
+            return None
+        return best[0][0], best[1], best[2]
+
+    def _place(self, index, period, room):
+        lecture = self.lectures[index]
+        self.assignment[index] = (period, room)
+        self.rooms_taken.add((period, room))
+        if lecture.get("professor") is not None:
+            self.professors_taken.add((period, lecture["professor"]))
+        self.courses_at[period][lecture["course"]] += 1
+        self.load[period] += 1
+
+    def _remove(self, index):
+        lecture = self.lectures[index]
+        period, room = self.assignment.pop(index)
+        self.rooms_taken.discard((period, room))
+        if lecture.get("professor") is not None:
+            self.professors_taken.discard((period, lecture["professor"]))
+        self.courses_at[period][lecture["course"]] -= 1
+        if not self.courses_at[period][lecture["course"]]:
+            del self.courses_at[period][lecture["course"]]
+        self.load[period] -= 1
+        return period, room
+
+    def _order(self):
+        """
+        This method orders the lectures most constrained first: the ones
+        needing computers, fitting the fewest auditoriums and sharing
+        the most students with other courses.
+        """
+        def key(index):
+            lecture = self.lectures[index]
+            rooms = sum(
+                1 for _, capacity, has_computers in self.auditoriums
+                if capacity >= lecture["capacity"] and
+                (has_computers or not lecture.get("needs_computers"))
+            )
+            degree = sum(self.weights.get(lecture["course"], {}).values())
+            return rooms, -degree, -lecture["capacity"]
+        return sorted(range(len(self.lectures)), key=key)
+
+    def _improve(self):
+        """
+        This method moves the clashing lectures to the slots
+        with fewer clashes, until a pass doesn't improve anything.
+        :return: Number of moves
+        """
+        moves = 0
+        for _ in range(self.iterations):
+            improved = False
+            for index in list(self.assignment):
+                course = self.lectures[index]["course"]
+                period, room = self.assignment[index]
+                self.courses_at[period][course] -= 1
+                current = self._clashes(course, period)
+                self.courses_at[period][course] += 1
+                if not current:
+                    continue
+                self._remove(index)
+                option = self._best_option(index)
+                if option is not None and option[0] < current:
+                    self._place(index, option[1], option[2])
+                    moves += 1
+                    improved = True
+                else:
+                    self._place(index, period, room)
+            if not improved:
+                break
+        return moves
+
+    def total_clashes(self):
+        """
+        This method counts the clashing students of the assignment,
+        once per pair of lectures taught at the same time.
+        """
+        total = 0
+        for courses in self.courses_at.values():
+            for first, second in itertools.combinations(courses, 2):
+                total += (
+                    self.weights.get(first, {}).get(second, 0) *
+                    courses[first] * courses[second]
+                )
+        return total
+
+    def solve(self):
+        """
+        This method assigns the lectures.
+        :return: Dictionary with the scheduled lectures (the given
+        dictionaries with day, start_time, end_time and location),
+        the indexes of the lectures that couldn't be placed,
+        the clashing students and the number of local search moves
+        """
+        self.assignment = {}
+        self.rooms_taken = set()
+        self.professors_taken = set()
+        self.courses_at = defaultdict(Counter)
+        self.load = Counter()
+        unscheduled = []
+        for index in self._order():
+            option = self._best_option(index)
+            if option is None:
+                unscheduled.append(index)
+            else:
+                self._place(index, option[1], option[2])
+        moves = self._improve()
+
+        schedule = []
+        for index in sorted(self.assignment):
+            period, room = self.assignment[index]
+            start_time, end_time = self.slots[period[1]]
+            schedule.append({
+                **self.lectures[index],
+                "day": self.days[period[0]],
+                "start_time": start_time,
+                "end_time": end_time,
+                "location": room,
+            })
+        return {
+            "schedule": schedule,
+            "unscheduled": sorted(unscheduled),
+            "clashes": self.total_clashes(),
+            "moves": moves,
+        }
@@ -1,7 +1,7 @@
 from django.core.cache import cache
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
-from django.views.decorators.vary import vary_on_cookie
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status
 from rest_framework.decorators import action
@@ -15,7 +15,12 @@ from .permissions import *
 from .serilalizers import *
 from .models import *
 from .utils.grade_calculator import GradeCalculator
-from .utils.syllabus_generator import SyllabusGenerator
+from .utils.schedule_recommender import ScheduleRecommender
+from .utils.syllabus_batch import SyllabusBatch
+from .utils.syllabus_jobs import SyllabusJob
+from utils.exports import ExportMixin
+from utils.pagination import KeysetPagination
+from utils.response_cache import cache_response
 
 
 class LectureViewSet(ModelViewSet):
@@ -45,13 +50,26 @@ class LectureViewSet(ModelViewSet):
                         "semester"]
     permission_classes = [IsAuthenticated]
 
-    @method_decorator(cache_page(60 * 10))
-    @method_decorator(vary_on_cookie)
+    @cache_response("lecture")
     def list(self, request, *args, **kwargs):
+        """
+        With ?view=compact the lectures are returned with flat ids
+        and a few names, see LectureCompactProfile.
+        """
+        if request.query_params.get("view") == "compact":
+            return self.compact_list(request)
         return super().list(request, *args, **kwargs)
 
-    @method_decorator(cache_page(60 * 10))
-    @method_decorator(vary_on_cookie)
+    def compact_list(self, request):
+        queryset = LectureCompactProfile.values(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(list(queryset))
+
+    @cache_response("lecture")
     def retrieve(self, request, *args, **kwargs):
         return super().retrieve(request, *args, **kwargs)
 
@@ -79,11 +97,28 @@ class LectureViewSet(ModelViewSet):
         """
         lecture_id = pk
         serializer = RegisterLectureSerializer(
-            data={"lecture_id": lecture_id},
+            data={
+                "lecture_id": lecture_id,
+                "waitlist": request.data.get("waitlist", False)
+            },
             context={"request": request}
         )
         if serializer.is_valid():
-            serializer.save()
+            result = serializer.save()
+            if result.get("waitlist_entry"):
+                return Response(
+                    {
+                        "message": "The lecture is full, "
+                                   "you were added to the waitlist",
+                        "status_url": request.build_absolute_uri(
+                            reverse(
+                                "course:lecture-waitlist-status",
+                                kwargs={"pk": lecture_id}
+                            )
+                        )
+                    },
+                    status=status.HTTP_202_ACCEPTED
+                )
             return Response(
                 "You registered/unregistered the subject successfully",
                 status=status.HTTP_200_OK
@@ -93,6 +128,81 @@ class LectureViewSet(ModelViewSet):
             status=status.HTTP_400_BAD_REQUEST
         )
 
+    @action(detail=True,
+            methods=["get"],
+            url_path="waitlist-status",
+            url_name="waitlist-status")
+    def waitlist_status(self, request, pk=None):
+        """
+        This action returns the status of the user's latest waitlist
+        entry for the lecture and its position in the queue.
+        """
+        entry = LectureWaitlistEntry.objects.filter(
+            lecture_id=pk,
+            student=request.user
+        ).order_by("-created_at").first()
+        if entry is None:
+            return Response(
+                "You are not in the waitlist of this lecture",
+                status=status.HTTP_404_NOT_FOUND
+            )
+        response = {
+            "status": entry.get_status_display(),
+            "position": None
+        }
+        if entry.status == 1:
+            response["position"] = LectureWaitlistEntry.objects.filter(
+                Q(created_at__lt=entry.created_at) |
+                Q(created_at=entry.created_at, id__lt=entry.id),
+                lecture_id=pk,
+                status=1
+            ).count() + 1
+        return Response(response, status=status.HTTP_200_OK)
+
+    @action(detail=True,
+            methods=["post"],
+            url_path="leave-waitlist",
+            url_name="leave-waitlist")
+    def leave_waitlist(self, request, pk=None):
+        """
+        This action removes the user from the waitlist of the lecture.
+        """
+        cancelled = LectureWaitlistEntry.objects.filter(
+            lecture_id=pk,
+            student=request.user,
+            status=1
+        ).update(status=3, updated_at=timezone.now())
+        if not cancelled:
+            return Response(
+                "You are not in the waitlist of this lecture",
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(
+            "You left the waitlist successfully",
+            status=status.HTTP_200_OK
+        )
+
+    @action(detail=False,
+            methods=["get"],
+            permission_classes=[IsStudent])
+    def recommendations(self, request):
+        """
+        This action returns the best combinations of the lectures
+        of the student's registered courses that don't overlap
+        and still have free seats.
+        With ?limit= the number of combinations is set (at most 50).
+        """
+        try:
+            limit = min(max(int(request.query_params.get("limit", 10)), 1),
+                        50)
+        except ValueError:
+            return Response(
+                "The limit must be a number",
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        result = ScheduleRecommender(request.user, limit=limit).recommend()
+        return Response(result, status=status.HTTP_200_OK)
+
     def get_queryset(self):
         user = self.request.user
         queryset = Lecture.objects.all()
@@ -162,11 +272,49 @@ class LectureViewSet(ModelViewSet):
                 "create",
                 "update",
                 "partial_update",
-                "destroy"
+                "destroy",
+                "bulk",
+                "schedule"
             ]:
                 return [IsManagement()]
         return super().get_permissions()
 
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """
+        This action imports many lectures of a semester at once.
+        The valid lectures are saved and the invalid ones are returned
+        with their errors.
+        """
+        serializer = BulkLectureSerializer(
+            data=request.data,
+            context={"request": request}
+        )
+        serializer.is_valid(raise_exception=True)
+        result = serializer.save()
+        if not result["created"]:
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=["post"])
+    def schedule(self, request):
+        """
+        This action assigns a day, a time slot and an auditorium to
+        the given lectures of a semester and creates them.
+        With dry_run the schedule is only returned.
+        """
+        serializer = TimetableSerializer(
+            data=request.data,
+            context={"request": request}
+        )
+        serializer.is_valid(raise_exception=True)
+        result = serializer.save()
+        if serializer.validated_data["dry_run"]:
+            return Response(result, status=status.HTTP_200_OK)
+        if not result["created"]:
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_201_CREATED)
+
 
 class CourseViewSet(ModelViewSet):
     """
@@ -190,13 +338,11 @@ class CourseViewSet(ModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ["department", "users__username", "lecture__semester"]
 
-    @method_decorator(cache_page(60 * 10))
-    @method_decorator(vary_on_cookie)
+    @cache_response("course")
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
-    @method_decorator(cache_page(60 * 10))
-    @method_decorator(vary_on_cookie)
+    @cache_response("course")
     def retrieve(self, request, *args, **kwargs):
         return super().retrieve(request, *args, **kwargs)
 
@@ -289,7 +435,7 @@ class DepartmentViewSet(ModelViewSet):
     permission_classes = [IsAdminUser]
 
 
-class GradeViewSet(ModelViewSet):
+class GradeViewSet(ExportMixin, ModelViewSet):
     """
     This ViewSet class is responsible for handling the grade operations.
 
@@ -307,6 +453,15 @@ class GradeViewSet(ModelViewSet):
     If the user is a student, they can see their grades.
     """
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    export_fields = [
+        ("id", "id"),
+        ("student", "student__username"),
+        ("lecture", "assignment__lecture__name"),
+        ("assignment", "assignment__name"),
+        ("grade", "grade"),
+        ("created_at", "created_at"),
+    ]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = [
         "student__username",
@@ -317,12 +472,14 @@ class GradeViewSet(ModelViewSet):
     def get_serializer_class(self):
         if self.action in ["create", "update", "partial_update"]:
             return GradeModificationSerializer
+        if self.action == "bulk":
+            return BulkGradeSerializer
         return GradeDisplaySerializer
 
     def get_permissions(self):
         user = self.request.user
         if user.is_authenticated and isinstance(user, User):
-            if self.action == "create":
+            if self.action in ["create", "bulk"]:
                 return [IsProfessorOrManagement()]
             if self.action in ["update", "partial_update", "destroy"]:
                 return [IsCreatorOfGradeOrManagement()]
@@ -357,6 +514,23 @@ class GradeViewSet(ModelViewSet):
             "assignment__lecture__course__prerequisites__prerequisites"
         )
 
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """
+        This action grades many students for one assignment at once.
+        The valid rows are saved and the invalid ones are returned
+        with their errors.
+        """
+        serializer = BulkGradeSerializer(
+            data=request.data,
+            context={"request": request}
+        )
+        serializer.is_valid(raise_exception=True)
+        result = serializer.save()
+        if not result["created"]:
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_201_CREATED)
+
 
 class AssignmentViewSet(ModelViewSet):
     """
@@ -440,6 +614,10 @@ class CreateSyllabusView(APIView):
     create the syllabus.
 
     Use test_syllabus.json file for testing this APIView.
+
+    The syllabus is rendered by a Celery task. The response has
+    the job id and the status url. If the same syllabus was
+    already generated, its download url is returned right away.
     """
     serializer_class = SyllabusSerializer
     permission_classes = [IsProfessorOrManagement]
@@ -450,24 +628,114 @@ class CreateSyllabusView(APIView):
         """
         serializer = SyllabusSerializer(data=request.data)
         if serializer.is_valid():
-            try:
-                syllabus_generator = (
-                    SyllabusGenerator(serializer.validated_data)
+            data = SyllabusJob.normalize(serializer.validated_data)
+            job = SyllabusJob.for_data(data)
+            response = {"job_id": job.job_id, **job.start(data)}
+            if response["status"] == "ready":
+                response["download_url"] = request.build_absolute_uri(
+                    job.url
                 )
-                output_path = syllabus_generator.generate_syllabus()
-                download_url = (f"{request.scheme}://"
-                                f"{request.get_host()}/"
-                                f"{output_path}")
-                return Response(
-                    {"download_url": download_url},
-                    status=status.HTTP_200_OK
-                )
-            except Exception as e:
+                return Response(response, status=status.HTTP_200_OK)
+            response["status_url"] = request.build_absolute_uri(
+                reverse("course:syllabus-status", args=[job.job_id])
+            )
+            return Response(response, status=status.HTTP_202_ACCEPTED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class SyllabusStatusView(APIView):
+    """
+    This APIView class returns the status of a syllabus job,
+    and the download url once the syllabus is generated.
+    """
+    permission_classes = [IsProfessorOrManagement]
+
+    def get(self, request, job_id):
+        job = SyllabusJob(job_id)
+        state = job.status() if SyllabusJob.is_valid_id(job_id) else None
+        if state is None:
+            return Response(
+                {"error": "Syllabus job not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        response = {"job_id": job_id, **state}
+        if state["status"] == "ready":
+            response["download_url"] = request.build_absolute_uri(job.url)
+        return Response(response, status=status.HTTP_200_OK)
+
+
+class SyllabusBatchView(APIView):
+    """
+    This APIView class is responsible for generating many syllabi at once.
+    If the user is manager/admin, he is allowed to generate them.
+
+    The request has either the department id, whose current semester
+    lectures are turned into syllabi, or a list of syllabus data.
+    The syllabi are rendered in parallel by the Celery workers, the
+    response has the status url, which returns the download url of
+    the zip and the items that couldn't be generated once it is packed.
+    """
+    permission_classes = [IsManagement]
+
+    def post(self, request):
+        """
+        This method enqueues the generation of the syllabi.
+        """
+        department_id = request.data.get("department")
+        syllabi = request.data.get("syllabi")
+        if department_id is not None:
+            department = Department.objects.filter(pk=department_id).first()
+            if department is None:
                 return Response(
-                    {"error": str(e)},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                    {"error": "Department not found"},
+                    status=status.HTTP_404_NOT_FOUND
                 )
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            batch = SyllabusBatch.from_department(department)
+        elif isinstance(syllabi, list) and syllabi:
+            batch = SyllabusBatch.from_payloads(syllabi)
+        else:
+            return Response(
+                {"error": "Either department or syllabi is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        job = batch.start()
+        return Response({
+            "batch_id": job.batch_id,
+            "status": "pending",
+            "status_url": request.build_absolute_uri(
+                reverse("course:syllabus-batch-status", args=[job.batch_id])
+            ),
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class SyllabusBatchStatusView(APIView):
+    """
+    This APIView class returns the status of a syllabus batch,
+    and the download url of the zip once it is generated.
+    Only the batches recorded by SyllabusBatchView are reported.
+    """
+    permission_classes = [IsManagement]
+
+    def get(self, request, batch_id):
+        batch = SyllabusBatchJob.objects.filter(batch_id=batch_id).first()
+        if batch is None:
+            return Response(
+                {"error": "Syllabus batch not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        response = {"batch_id": batch_id}
+        if batch.status == 3:
+            response.update(batch.result)
+            response["status"] = "ready"
+            response["download_url"] = request.build_absolute_uri(
+                response.pop("url")
+            )
+        elif batch.status == 2:
+            response["status"] = "failed"
+            response["error"] = batch.error
+        else:
+            response["status"] = "pending"
+        return Response(response, status=status.HTTP_200_OK)
 
 
 class SemesterViewSet(ModelViewSet):
@@ -526,7 +794,7 @@ class ResourceViewSet(ModelViewSet):
         return super().get_permissions()
 
 
-class GradeRecordViewSet(ListModelMixin, GenericViewSet):
+class GradeRecordViewSet(ExportMixin, ListModelMixin, GenericViewSet):
     """
     This ViewSet class is responsible for handling the grade record operations.
 
@@ -539,6 +807,16 @@ class GradeRecordViewSet(ListModelMixin, GenericViewSet):
     """
     serializer_class = GradeRecordSerializer
     permission_classes = [IsStudentOrManagement]
+    pagination_class = KeysetPagination
+    export_fields = [
+        ("id", "id"),
+        ("student", "student__username"),
+        ("lecture", "lecture__name"),
+        ("grade", "grade"),
+        ("failed", "failed"),
+        ("is_active", "is_active"),
+        ("created_at", "created_at"),
+    ]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ["student__username"]
 
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from payment.models import Payment
+from payment.models import Payment, PaymentCapture
 
 
 @admin.register(Payment)
@@ -9,3 +9,13 @@ class Payment(admin.ModelAdmin):
                     "created_at",
                     "user",
                     "semester"]
+
+
+@admin.register(PaymentCapture)
+class PaymentCapture(admin.ModelAdmin):
+    list_display = ["order_id",
+                    "user",
+                    "status",
+                    "payment",
+                    "updated_at"]
+    list_filter = ["status"]
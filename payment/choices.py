@@ -0,0 +1,7 @@
+from django.utils.translation import gettext_lazy as _
+
+CAPTURE_STATUSES = [
+    (1, _("მოლოდინში")),
+    (2, _("დასრულდა")),
+    (3, _("ვერ შესრულდა")),
+]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.4 on 2026-10-17 20:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0054_grade_grade_keyset_idx_and_more'),
+        ('payment', '0006_alter_payment_amount_alter_payment_created_at_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['created_at', 'id'], name='payment_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.4 on 2026-10-17 21:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course', '0054_grade_grade_keyset_idx_and_more'),
+        ('payment', '0007_payment_payment_keyset_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentCapture',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.CharField(max_length=255, unique=True, verbose_name='გადახდის კოდი')),
+                ('status', models.PositiveSmallIntegerField(choices=[(1, 'მოლოდინში'), (2, 'დასრულდა'), (3, 'ვერ შესრულდა')], default=1, verbose_name='სტატუსი')),
+                ('error', models.TextField(blank=True, verbose_name='შეცდომა')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='შექმნილია')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='განახლდა')),
+                ('payment', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='capture', to='payment.payment', verbose_name='გადახდა')),
+                ('semester', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payment_captures', to='course.semester', verbose_name='სემესტრი')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payment_captures', to=settings.AUTH_USER_MODEL, verbose_name='მომხმარებელი')),
+            ],
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
+from payment.choices import CAPTURE_STATUSES
 
 class Payment(models.Model):
     """
@@ -9,4 +10,29 @@ class Payment(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name=_("თანხა"))
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("შექმნილია"))
     user = models.ForeignKey("user.User", on_delete=models.CASCADE, related_name="payments", verbose_name=_("მომხმარებელი"))
-    semester = models.ForeignKey("course.Semester", on_delete=models.CASCADE, related_name="payments", verbose_name=_("სემესტრი"))
\ No newline at end of file
+    semester = models.ForeignKey("course.Semester", on_delete=models.CASCADE, related_name="payments", verbose_name=_("სემესტრი"))
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the payment list
+            models.Index(fields=["created_at", "id"], name="payment_keyset_idx"),
+        ]
+
+
+class PaymentCapture(models.Model):
+    """
+    PaymentCapture model to store the capture intent of a PayPal order.
+    The order id is unique, so an order is captured and credited once
+    no matter how many times the capture is requested.
+    """
+    order_id = models.CharField(max_length=255, unique=True, verbose_name=_("გადახდის კოდი"))
+    user = models.ForeignKey("user.User", on_delete=models.CASCADE, related_name="payment_captures", verbose_name=_("მომხმარებელი"))
+    semester = models.ForeignKey("course.Semester", on_delete=models.SET_NULL, null=True, blank=True, related_name="payment_captures", verbose_name=_("სემესტრი"))
+    status = models.PositiveSmallIntegerField(choices=CAPTURE_STATUSES, default=1, verbose_name=_("სტატუსი"))
+    payment = models.OneToOneField(Payment, on_delete=models.SET_NULL, null=True, blank=True, related_name="capture", verbose_name=_("გადახდა"))
+    error = models.TextField(blank=True, verbose_name=_("შეცდომა"))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("შექმნილია"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("განახლდა"))
+
+    def __str__(self):
+        return f"{self.order_id} - {self.status}"
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from payment.models import Payment
+from payment.models import Payment, PaymentCapture
 
 
 class PaymentSerializer(serializers.ModelSerializer):
@@ -8,4 +8,22 @@ class PaymentSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = Payment
-        fields = "__all__"
\ No newline at end of file
+        fields = "__all__"
+
+
+class PaymentCaptureSerializer(serializers.ModelSerializer):
+    """
+    PaymentCapture Serializer to serialize the capture status:
+    1 pending, 2 completed, 3 failed
+    """
+    amount = serializers.DecimalField(
+        source="payment.amount",
+        max_digits=10,
+        decimal_places=2,
+        default=None
+    )
+
+    class Meta:
+        model = PaymentCapture
+        fields = ["order_id", "status", "amount", "error", "payment",
+                  "created_at", "updated_at"]
@@ -0,0 +1,22 @@
+from celery import shared_task
+from payment.utils.capture_reconciler import CaptureReconciler
+
+
+@shared_task(bind=True, max_retries=5)
+def capture_payment(self, order_id):
+    """
+    Capture the PayPal order and credit the payment.
+    Unknown outcomes (connection errors, PayPal errors) are retried
+    with backoff; the capture is idempotent on PayPal's side, and the
+    payment is credited once, see CaptureReconciler.
+    :param: order_id - PayPal order id
+    :return: capture status
+    """
+    reconciler = CaptureReconciler(order_id)
+    status, error = reconciler.capture()
+    if status is None:
+        if self.request.retries >= self.max_retries:
+            reconciler.fail(error)
+            return 3
+        raise self.retry(countdown=2 ** self.request.retries * 10)
+    return status
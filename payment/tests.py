@@ -1,3 +1,366 @@
-from django.test import TestCase
+import datetime
+import json
+import threading
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from course.models import Semester, Department, Course, Lecture
+from payment.models import Payment, PaymentCapture
+from payment.tasks import capture_payment
+from payment.utils.loan_reconciler import LoanReconciler
+from payment.utils.payment_calculator import PaymentCalculator
+from payment.utils.paypal_operations import PayPalOperationsManager
+from user.models import User
+from utils.response_cache import response_cache
 
-# Create your tests here.
+
+class StubPayPalHandler(BaseHTTPRequestHandler):
+    """
+    Answers the PayPal calls used by PayPalOperationsManager
+    and records them on the server.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body):
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        server.requests.append((self.path, dict(self.headers)))
+        server.connections.add(self.client_address)
+        if self.path == "/v1/oauth2/token":
+            if server.token_refused:
+                self._reply(401, {
+                    "error": "invalid_client",
+                    "error_description": "Client Authentication failed",
+                })
+                return
+            server.tokens += 1
+            self._reply(200, {
+                "access_token": f"token-{server.tokens}",
+                "expires_in": 32400,
+            })
+        elif self.headers["Authorization"] in server.revoked:
+            self._reply(401, {"error": "invalid_token"})
+        elif server.failures:
+            server.failures -= 1
+            self._reply(503, {"error": "unavailable"})
+        elif server.html_failures:
+            server.html_failures -= 1
+            content = b"<html><body>Internal Server Error</body></html>"
+            self.send_response(500)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+        elif self.path.endswith("/verify-webhook-signature"):
+            self._reply(200, {"verification_status": "SUCCESS"})
+        elif self.path.endswith("/capture"):
+            self._reply(201, {
+                "id": self.path.split("/")[-2],
+                "status": "COMPLETED",
+                "purchase_units": [{"payments": {"captures": [{
+                    "status": "COMPLETED",
+                    "amount": {"currency_code": "USD", "value": "40.00"},
+                }]}}],
+            })
+        else:
+            self._reply(201, {"id": "ORDER1", "status": "CREATED"})
+
+
+class StubPayPalMixin:
+    """
+    Points PayPalOperationsManager to a local stub PayPal server.
+    """
+    def setUp(self):
+        cache.clear()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubPayPalHandler)
+        self.server.requests = []
+        self.server.connections = set()
+        self.server.tokens = 0
+        self.server.failures = 0
+        self.server.html_failures = 0
+        self.server.token_refused = False
+        self.server.revoked = set()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        settings_override = override_settings(
+            PAYPAL_API_BASE_URL=f"http://127.0.0.1:{self.server.server_port}",
+            PAYPAL_CLIENT_ID="client",
+            PAYPAL_CLIENT_SECRET="secret",
+            PAYPAL_WEBHOOK_ID="webhook"
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class PayPalOperationsTest(StubPayPalMixin, SimpleTestCase):
+    """
+    Checks the PayPal calls against a local stub server: the token is
+    requested once, the connection is reused and failures are retried.
+    """
+    def test_token_is_cached_and_connection_reused(self):
+        for _ in range(3):
+            order = PayPalOperationsManager().create_paypal_order(10)
+            capture = PayPalOperationsManager().capture_paypal_order(
+                order["id"]
+            )
+            self.assertEqual(capture["status"], "COMPLETED")
+        self.assertEqual(self.server.tokens, 1)
+        self.assertEqual(len(self.server.requests), 7)
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_failures_are_retried_with_the_same_request_id(self):
+        self.server.failures = 2
+        capture = PayPalOperationsManager().capture_paypal_order("ORDER1")
+        self.assertEqual(capture["status"], "COMPLETED")
+        request_ids = {
+            headers["PayPal-Request-Id"]
+            for path, headers in self.server.requests
+            if path.endswith("/capture")
+        }
+        self.assertEqual(request_ids, {"capture-ORDER1"})
+        self.assertEqual(len(self.server.requests), 4)
+
+    @mock.patch("urllib3.util.retry.Retry.sleep")
+    def test_html_error_page_is_an_error(self, sleep):
+        # More failures than the session retries
+        self.server.html_failures = 10
+        capture = PayPalOperationsManager().capture_paypal_order("ORDER1")
+        self.assertIsInstance(capture, str)
+
+    def test_refused_token_is_not_sent(self):
+        self.server.token_refused = True
+        capture = PayPalOperationsManager().capture_paypal_order("ORDER1")
+        self.assertEqual(capture, "Client Authentication failed")
+        self.assertEqual(
+            [path for path, _ in self.server.requests],
+            ["/v1/oauth2/token"]
+        )
+
+    def test_revoked_token_is_refreshed(self):
+        PayPalOperationsManager().capture_paypal_order("ORDER1")
+        self.server.revoked.add("Bearer token-1")
+        capture = PayPalOperationsManager().capture_paypal_order("ORDER1")
+        self.assertEqual(capture["status"], "COMPLETED")
+        self.assertEqual(self.server.tokens, 2)
+
+
+class PaymentCaptureTest(StubPayPalMixin, TestCase):
+    """
+    Checks that an order is captured in the background
+    and credited once, however often it is reported.
+    """
+    def setUp(self):
+        super().setUp()
+        today = datetime.date.today()
+        Semester.objects.create(
+            year=f"{today.year}-{today.year + 1}",
+            semester=1,
+            start_date=today,
+            end_date=today + datetime.timedelta(weeks=16),
+            midterm_start=today + datetime.timedelta(weeks=8),
+            final_start=today + datetime.timedelta(weeks=15)
+        )
+        self.student = User.objects.create_user(
+            "Student",
+            "Student",
+            "student@example.com",
+            "pass123!",
+            username="student",
+            role=1,
+            loan=Decimal("100")
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+        self.url = reverse("payment:paypal-capture-order")
+
+    @mock.patch("payment.views.capture_payment.delay")
+    def test_repeated_requests_share_one_capture(self, delay):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.client.post(self.url, {"order_id": "ORDER1"})
+            second = self.client.post(self.url, {"order_id": "ORDER1"})
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(second.status_code, 202)
+        self.assertEqual(PaymentCapture.objects.count(), 1)
+        delay.assert_called_once_with("ORDER1")
+
+        capture_payment("ORDER1")
+        status_response = self.client.get(first.data["status_url"])
+        self.assertEqual(status_response.data["status"], 2)
+        self.assertEqual(status_response.data["amount"], "40.00")
+        third = self.client.post(self.url, {"order_id": "ORDER1"})
+        self.assertEqual(third.status_code, 200)
+        delay.assert_called_once()
+
+    @mock.patch("urllib3.util.retry.Retry.sleep")
+    def test_error_page_is_retried_then_failed(self, sleep):
+        PaymentCapture.objects.create(order_id="ORDER1", user=self.student)
+        self.server.html_failures = 100
+        with mock.patch.object(
+                capture_payment,
+                "retry",
+                side_effect=RuntimeError("retry")
+        ) as retry, self.assertRaisesMessage(RuntimeError, "retry"):
+            capture_payment("ORDER1")
+        retry.assert_called_once()
+        self.assertEqual(PaymentCapture.objects.get().status, 1)
+
+        status = capture_payment.apply(
+            args=["ORDER1"],
+            retries=capture_payment.max_retries
+        ).get()
+        self.assertEqual(status, 3)
+        capture = PaymentCapture.objects.get()
+        self.assertEqual(capture.status, 3)
+        self.assertTrue(capture.error)
+
+    def test_task_and_webhook_credit_once(self):
+        PaymentCapture.objects.create(order_id="ORDER1", user=self.student)
+        event = {
+            "event_type": "PAYMENT.CAPTURE.COMPLETED",
+            "resource": {
+                "amount": {"currency_code": "USD", "value": "40.00"},
+                "supplementary_data": {
+                    "related_ids": {"order_id": "ORDER1"}
+                },
+            },
+        }
+        webhook = APIClient()
+        for _ in range(2):
+            response = webhook.post(
+                reverse("payment:paypal-webhook"),
+                event,
+                format="json"
+            )
+            self.assertEqual(response.status_code, 200)
+        capture_payment("ORDER1")
+
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.loan, Decimal("60"))
+        self.assertEqual(Payment.objects.filter(order_id="ORDER1").count(), 1)
+        self.assertEqual(PaymentCapture.objects.get().status, 2)
+
+
+class LoanReconcilerTest(TestCase):
+    """
+    Checks that the bulk loan reconciliation gives the same loans
+    as PaymentCalculator and reports what it processed.
+    """
+    def setUp(self):
+        today = datetime.date.today()
+        self.semester = Semester.objects.create(
+            year=f"{today.year}-{today.year + 1}",
+            semester=1,
+            start_date=today,
+            end_date=today + datetime.timedelta(weeks=16),
+            midterm_start=today + datetime.timedelta(weeks=8),
+            final_start=today + datetime.timedelta(weeks=15)
+        )
+        previous_semester = Semester.objects.create(
+            year=f"{today.year - 1}-{today.year}",
+            semester=2,
+            start_date=today - datetime.timedelta(weeks=30),
+            end_date=today - datetime.timedelta(weeks=14),
+            midterm_start=today - datetime.timedelta(weeks=22),
+            final_start=today - datetime.timedelta(weeks=15)
+        )
+        department = Department.objects.create(name="Physics", code="PHY")
+        self.courses = []
+        for code, credits, semester in [
+            ("PHY1010", 6, self.semester),
+            ("PHY1020", 4, self.semester),
+            ("PHY1030", 5, previous_semester),
+        ]:
+            course = Course.objects.create(
+                name=code,
+                code=code,
+                department=department,
+                credits=credits
+            )
+            Lecture.objects.create(
+                name=code,
+                course=course,
+                semester=semester,
+                uni_year=1
+            )
+            self.courses.append(course)
+
+        self.partly_paid = self._student("partly", loan=0)
+        self.fully_paid = self._student("fully", loan=Decimal("999"))
+        self.paid_before = self._student("before", loan=0)
+        self.without_payments = self._student("none", loan=Decimal("50"))
+        self.inactive = self._student("inactive", loan=0, is_active=False)
+        # 6 + 4 credits this semester, the old course doesn't count
+        # 10 * 37.5 = 375
+        self._pay(self.partly_paid, "100")
+        self._pay(self.partly_paid, "25")
+        self._pay(self.fully_paid, "375")
+        self._pay(self.paid_before, "375", previous_semester)
+        self._pay(self.inactive, "100")
+
+    def _student(self, name, loan, is_active=True):
+        student = User.objects.create_user(
+            name,
+            name,
+            f"{name}@example.com",
+            "pass123!",
+            username=name,
+            role=1,
+            loan=loan,
+            is_active=is_active
+        )
+        student.courses.add(*self.courses)
+        return student
+
+    def _pay(self, student, amount, semester=None):
+        Payment.objects.create(
+            order_id=f"{student.username}-{amount}",
+            amount=Decimal(amount),
+            user=student,
+            semester=semester or self.semester
+        )
+
+    def _loan(self, student):
+        student.refresh_from_db()
+        return student.loan
+
+    def test_loans_after_a_run(self):
+        metrics = LoanReconciler(chunk_size=2).reconcile()
+
+        self.assertEqual(metrics["processed"], 3)
+        self.assertEqual(metrics["updated"], 2)
+        self.assertGreaterEqual(metrics["seconds"], 0)
+        self.assertGreater(metrics["students_per_second"], 0)
+        self.assertEqual(self._loan(self.partly_paid), Decimal("250"))
+        self.assertEqual(self._loan(self.fully_paid), Decimal("999"))
+        self.assertEqual(self._loan(self.paid_before), Decimal("375"))
+        self.assertEqual(self._loan(self.without_payments), Decimal("50"))
+        self.assertEqual(self._loan(self.inactive), Decimal("0"))
+
+    def test_user_responses_are_invalidated(self):
+        before = response_cache.versions(["user"])
+        with self.captureOnCommitCallbacks(execute=True):
+            LoanReconciler().reconcile()
+        self.assertNotEqual(response_cache.versions(["user"]), before)
+
+    def test_same_loans_as_the_payment_calculator(self):
+        LoanReconciler().reconcile()
+        for student in [self.partly_paid, self.paid_before]:
+            loan = self._loan(student)
+            PaymentCalculator(student).student_payment(student.payments.all())
+            self.assertEqual(self._loan(student), loan)
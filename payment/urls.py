@@ -12,4 +12,6 @@ urlpatterns += [
     path("payment_failed/", views.payment_failed.as_view(), name="payment_failed"),
     path("paypal/create-order/", views.PayPalCreateOrderView.as_view(), name="paypal-create-order"),
     path("paypal/capture-order/", views.PayPalCaptureOrderView.as_view(), name="paypal-capture-order"),
+    path("paypal/capture-order/<str:order_id>/", views.PayPalCaptureStatusView.as_view(), name="paypal-capture-status"),
+    path("paypal/webhook/", views.PayPalWebhookView.as_view(), name="paypal-webhook"),
 ]
\ No newline at end of file
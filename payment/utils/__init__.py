@@ -1,2 +1,4 @@
 from .paypal_operations import *
-from .payment_calculator import *
\ No newline at end of file
+from .payment_calculator import *
+from .loan_reconciler import LoanReconciler
+from .capture_reconciler import CaptureReconciler
\ No newline at end of file
@@ -0,0 +1,117 @@
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from payment.models import Payment, PaymentCapture
+from payment.utils.paypal_operations import PayPalOperationsManager
+from user.models import User
+from utils.helpers import get_semester
+from utils.response_cache import response_cache
+
+# PayPal errors after which the order will never be captured
+FINAL_CAPTURE_ISSUES = {
+    "INSTRUMENT_DECLINED",
+    "PAYER_ACTION_REQUIRED",
+    "ORDER_NOT_APPROVED",
+    "ORDER_EXPIRED",
+    "INVALID_RESOURCE_ID",
+}
+
+
+class CaptureReconciler:
+    """
+    This class is responsible for settling a PayPal capture intent.
+
+    The capture is applied under a row lock on the intent, so the task
+    and the webhook can both report it and the payment is still
+    created, and the loan decremented, exactly once.
+    """
+    def __init__(self, order_id):
+        """
+        This function initializes the CaptureReconciler class.
+        :param order_id: PayPal order id
+        """
+        self.order_id = order_id
+
+    @staticmethod
+    def parse(response):
+        """
+        This method reads the outcome of a PayPal capture response.
+        :param response: Response from PayPal API, or the connection error
+        :return: (status, amount, error), status is None when
+        the outcome is not known yet
+        """
+        if not isinstance(response, dict):
+            return None, None, str(response)
+        if response.get("status") == "COMPLETED":
+            payments = response["purchase_units"][0]["payments"]
+            capture = payments["captures"][0]
+            if capture.get("status", "COMPLETED") == "COMPLETED":
+                return 2, Decimal(capture["amount"]["value"]), None
+            # Pending captures are completed by the webhook
+            return 1, None, None
+        issues = {
+            detail.get("issue") for detail in response.get("details", [])
+        }
+        if issues & FINAL_CAPTURE_ISSUES:
+            return 3, None, ", ".join(sorted(issues))
+        if "ORDER_ALREADY_CAPTURED" in issues:
+            return 1, None, None
+        return None, None, response.get("message") or str(response)
+
+    def capture(self):
+        """
+        This method captures the order on PayPal and applies the outcome.
+        :return: (status, error), status is None when
+        the capture should be retried
+        """
+        response = PayPalOperationsManager().capture_paypal_order(
+            self.order_id
+        )
+        status, amount, error = self.parse(response)
+        if status == 2:
+            self.complete(amount)
+        elif status == 3:
+            self.fail(error)
+        return status, error
+
+    def complete(self, amount):
+        """
+        This method creates the payment and decrements the loan,
+        unless the capture was already applied.
+        :param amount: Captured amount
+        :return: bool, whether the capture was applied now
+        """
+        with transaction.atomic():
+            capture = PaymentCapture.objects.select_for_update().filter(
+                order_id=self.order_id
+            ).first()
+            if capture is None or capture.status == 2:
+                return False
+            capture.payment = Payment.objects.create(
+                order_id=self.order_id,
+                amount=amount,
+                user_id=capture.user_id,
+                semester=capture.semester or get_semester(),
+            )
+            User.objects.filter(
+                pk=capture.user_id
+            ).update(loan=F("loan") - amount)
+            capture.status = 2
+            capture.error = ""
+            capture.save(update_fields=["payment", "status", "error",
+                                        "updated_at"])
+        # The loan was updated without sending the User signals
+        response_cache.bump("user")
+        return True
+
+    def fail(self, error):
+        """
+        This method marks the capture as failed, unless it was completed.
+        :param error: Reason of the failure
+        :return: bool, whether the capture was marked now
+        """
+        return PaymentCapture.objects.filter(
+            order_id=self.order_id,
+            status=1
+        ).update(status=3, error=error, updated_at=timezone.now()) == 1
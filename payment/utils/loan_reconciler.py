@@ -0,0 +1,144 @@
+import logging
+import time
+from collections import defaultdict
+from decimal import Decimal
+from django.db.models.aggregates import Sum
+from course.models import Course
+from payment.models import Payment
+from payment.utils.payment_calculator import PaymentCalculator
+from user.models import User
+from utils.helpers import get_semester
+from utils.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+
+class LoanReconciler:
+    """
+    This class recalculates the current semester loan of the active
+    students in bulk. It gives the same result as calling
+    PaymentCalculator.student_payment for every student that has
+    payments, but with a few grouped queries per chunk of students.
+    """
+    def __init__(self, chunk_size=1000):
+        """
+        :param chunk_size: number of students processed at once
+        """
+        self.chunk_size = chunk_size
+        self.semester = get_semester()
+
+    def _semester_credits(self, student_ids, course_ids):
+        """
+        Sum the credits of the current semester courses per student.
+        :param student_ids: User ids
+        :param course_ids: ids of the courses with lectures this semester
+        :return: dictionary of student id to credits
+        """
+        return dict(
+            User.courses.through.objects.filter(
+                user_id__in=student_ids,
+                course_id__in=course_ids
+            ).values("user_id").annotate(
+                credits=Sum("course__credits")
+            ).values_list("user_id", "credits")
+        )
+
+    def _semester_payments(self, student_ids):
+        """
+        Collect the current semester payment amounts per student.
+        :param student_ids: User ids
+        :return: dictionary of student id to list of amounts
+        """
+        payments = defaultdict(list)
+        for user_id, amount in Payment.objects.filter(
+                user_id__in=student_ids,
+                semester=self.semester
+        ).values_list("user_id", "amount"):
+            payments[user_id].append(amount)
+        return payments
+
+    @staticmethod
+    def _loan(fee, amounts):
+        """
+        Calculate the loan like PaymentCalculator.student_payment does.
+        :param fee: semester fee
+        :param amounts: current semester payment amounts
+        :return: loan, or None if the fee was paid in one payment
+        """
+        fee = Decimal(str(fee)).quantize(Decimal("0.01"))
+        if fee in amounts:
+            return None
+        return fee - sum(
+            (amount for amount in amounts if amount < fee),
+            Decimal(0)
+        )
+
+    def _reconcile_chunk(self, students, course_ids):
+        """
+        Recalculate and save the loans of one chunk of students.
+        :param students: list of (id, government_scholarship) tuples
+        :param course_ids: ids of the courses with lectures this semester
+        :return: number of updated students
+        """
+        student_ids = [student_id for student_id, _ in students]
+        credits = self._semester_credits(student_ids, course_ids)
+        payments = self._semester_payments(student_ids)
+        updated = []
+        for student_id, government_scholarship in students:
+            fee = PaymentCalculator.semester_fee(
+                credits.get(student_id),
+                government_scholarship
+            )
+            loan = self._loan(fee, payments[student_id])
+            if loan is not None:
+                updated.append(User(pk=student_id, loan=loan))
+        User.objects.bulk_update(updated, ["loan"], batch_size=self.chunk_size)
+        return len(updated)
+
+    def reconcile(self):
+        """
+        Recalculate the loans of the active students that have payments.
+        :return: dictionary with throughput metrics
+        """
+        started = time.monotonic()
+        course_ids = list(
+            Course.objects.filter(
+                lecture__semester=self.semester
+            ).distinct().values_list("id", flat=True)
+        )
+        students = User.objects.filter(
+            is_active=True,
+            role=1,
+            payments__isnull=False
+        ).distinct().order_by("pk").values_list(
+            "pk",
+            "government_scholarship"
+        )
+
+        processed = 0
+        updated = 0
+        chunk = []
+        for student in students.iterator(chunk_size=self.chunk_size):
+            chunk.append(student)
+            if len(chunk) == self.chunk_size:
+                updated += self._reconcile_chunk(chunk, course_ids)
+                processed += len(chunk)
+                chunk = []
+        if chunk:
+            updated += self._reconcile_chunk(chunk, course_ids)
+            processed += len(chunk)
+
+        if updated:
+            # The loans were updated without sending the User signals
+            response_cache.bump("user")
+
+        seconds = time.monotonic() - started
+        metrics = {
+            "processed": processed,
+            "updated": updated,
+            "seconds": round(seconds, 3),
+            "students_per_second": round(processed / seconds, 1)
+            if seconds else processed,
+        }
+        logger.info("Loan reconciliation finished: %s", metrics)
+        return metrics
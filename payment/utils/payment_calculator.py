@@ -7,6 +7,22 @@ class PaymentCalculator:
     def __init__(self, student):
         self.student = student
 
+    @staticmethod
+    def semester_fee(credit, government_scholarship):
+        """
+        Calculate semester fee from the credits and scholarship percentage
+        :param credit: sum of the semester course credits
+        :param government_scholarship: scholarship percentage
+        :return: semester fee
+        """
+        fee = 0
+        if credit:
+            fee = float(credit * 37.5)
+            if government_scholarship:
+                government_part = float(2250 * government_scholarship / 100)
+                fee -= float(government_part / 2)
+        return fee
+
     def calculate_fee(self):
         """
         Calculate semester fee
@@ -19,12 +35,7 @@ class PaymentCalculator:
             lecture__semester=semester
         ).distinct()
         credit = courses.aggregate(credits_sum=Sum("credits"))["credits_sum"]
-        fee = 0
-        if credit:
-            fee = float(credit * 37.5)
-            if government_scholarship:
-                government_part = float(2250 * government_scholarship / 100)
-                fee -= float(government_part / 2)
+        fee = self.semester_fee(credit, government_scholarship)
 
         payment_dict = {
             "semester_fee": fee,
@@ -1,19 +1,71 @@
+import hashlib
+import threading
 import uuid
 import requests
 from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_paypal_session():
+    """
+    Return the process-wide PayPal session, so the connections
+    (and their TLS handshakes) are kept alive and reused between calls.
+    Failed connections and 429/5xx responses are retried with backoff;
+    the POSTs are safe to retry because they carry a PayPal-Request-Id.
+    :return: requests.Session
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=settings.PAYPAL_MAX_RETRIES,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=None,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=settings.PAYPAL_POOL_SIZE,
+                max_retries=retry
+            )
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
 
 
 class PayPalOperationsManager:
+    # Refresh the token this many seconds before PayPal expires it
+    token_expiry_margin = 60
+
     def __init__(self):
         self.BASE_URL = settings.PAYPAL_API_BASE_URL
         self.client_id = settings.PAYPAL_CLIENT_ID
         self.client_secret = settings.PAYPAL_CLIENT_SECRET
+        self.session = get_paypal_session()
+        self.timeout = settings.PAYPAL_TIMEOUT
+
+    def _token_cache_key(self):
+        client = f"{self.BASE_URL}:{self.client_id}".encode()
+        return f"paypal_access_token_{hashlib.md5(client).hexdigest()}"
 
     def _get_paypal_access_token(self):
         """
-        Get access token for PayPal API
-        :return: access token
+        Get access token for PayPal API.
+        The token is cached until shortly before it expires,
+        so the workers share it instead of requesting a new one per call.
+        :return: (access token, error), the token is None on errors
         """
+        token = cache.get(self._token_cache_key())
+        if token is not None:
+            return token, None
         url = f"{self.BASE_URL}/v1/oauth2/token"
         data = {"grant_type": "client_credentials"}
         auth = (self.client_id, self.client_secret)
@@ -22,16 +74,63 @@ class PayPalOperationsManager:
             "Accept-Language": "en_US",
         }
         try:
-            response = requests.post(
+            response = self.session.post(
                 url,
                 headers=headers,
                 data=data,
-                auth=auth
+                auth=auth,
+                timeout=self.timeout
+            ).json()
+        except requests.exceptions.RequestException as e:
+            return None, str(e)
+        if not isinstance(response, dict):
+            return None, str(response)
+        token = response.get("access_token")
+        if token is None:
+            return None, (
+                response.get("error_description") or
+                response.get("error") or
+                str(response)
             )
-            response = response.json().get("access_token")
-        except requests.exceptions.ConnectionError as e:
-            response = str(e)
-        return response
+        timeout = response.get("expires_in", 0) - self.token_expiry_margin
+        if timeout > 0:
+            cache.set(self._token_cache_key(), token, timeout)
+        return token, None
+
+    def _post(self, url, request_id=None, **kwargs):
+        """
+        Send an authorized POST to PayPal API.
+        If the cached token was revoked, it is dropped and
+        the request is sent once more with a new token.
+        :param url: url
+        :param request_id: PayPal-Request-Id, makes the retries idempotent
+        :return: response from PayPal API, or the error string when
+        no token was issued, the request failed or the body isn't JSON
+        (e.g. the HTML page of a 5xx left after the retries)
+        """
+        for attempt in range(2):
+            token, error = self._get_paypal_access_token()
+            if token is None:
+                return error
+            headers = {
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {token}",
+            }
+            if request_id is not None:
+                headers["PayPal-Request-Id"] = request_id
+            try:
+                response = self.session.post(
+                    url,
+                    headers=headers,
+                    timeout=self.timeout,
+                    **kwargs
+                )
+                if response.status_code != 401 or attempt:
+                    # requests' JSONDecodeError is a RequestException
+                    return response.json()
+            except requests.exceptions.RequestException as e:
+                return str(e)
+            cache.delete(self._token_cache_key())
 
     def create_paypal_order(self,
                             amount,
@@ -46,13 +145,7 @@ class PayPalOperationsManager:
         :param cancel_url: cancel url
         :return: response from PayPal API
         """
-        token = self._get_paypal_access_token()
         url = f"{self.BASE_URL}/v2/checkout/orders"
-
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {token}",
-        }
         reference_id = str(uuid.uuid4())
 
         payload = {
@@ -81,12 +174,7 @@ class PayPalOperationsManager:
                 }
             }
         }
-        try:
-            response = requests.post(url, headers=headers, json=payload)
-            response = response.json()
-        except requests.exceptions.ConnectionError as e:
-            response = str(e)
-        return response
+        return self._post(url, f"order-{reference_id}", json=payload)
 
     def capture_paypal_order(self, order_id):
         """
@@ -94,17 +182,32 @@ class PayPalOperationsManager:
         :param order_id: Order id.
         :return: Response from PayPal API.
         """
-        token = self._get_paypal_access_token()
         url = (f"{self.BASE_URL}/"
                f"v2/checkout/orders/{order_id}/capture")
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {token}",
+        return self._post(url, f"capture-{order_id}")
+
+    def verify_webhook_signature(self, headers, event):
+        """
+        Verify that the webhook event was sent by PayPal.
+        :param headers: Request headers
+        :param event: Webhook event
+        :return: bool
+        """
+        webhook_id = settings.PAYPAL_WEBHOOK_ID
+        if not webhook_id:
+            return False
+        url = f"{self.BASE_URL}/v1/notifications/verify-webhook-signature"
+        payload = {
+            "auth_algo": headers.get("PAYPAL-AUTH-ALGO"),
+            "cert_url": headers.get("PAYPAL-CERT-URL"),
+            "transmission_id": headers.get("PAYPAL-TRANSMISSION-ID"),
+            "transmission_sig": headers.get("PAYPAL-TRANSMISSION-SIG"),
+            "transmission_time": headers.get("PAYPAL-TRANSMISSION-TIME"),
+            "webhook_id": webhook_id,
+            "webhook_event": event,
         }
-        try:
-            response = requests.post(url, headers=headers)
-            print(response)
-            response = response.json()
-        except requests.exceptions.ConnectionError as e:
-            response = str(e)
-        return response
+        response = self._post(url, json=payload)
+        return (
+            isinstance(response, dict) and
+            response.get("verification_status") == "SUCCESS"
+        )
@@ -1,25 +1,42 @@
 from decimal import Decimal
+from django.db import transaction
 from rest_framework import viewsets, mixins
 from rest_framework.decorators import action
+from rest_framework.permissions import AllowAny
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from payment.utils.payment_calculator import PaymentCalculator
-from payment.models import Payment
+from payment.models import Payment, PaymentCapture
 from payment.permissions import IsStudentOrManagement
-from payment.serializers import PaymentSerializer
+from payment.serializers import PaymentSerializer, PaymentCaptureSerializer
+from payment.tasks import capture_payment
 from django.urls import reverse
+from payment.utils.capture_reconciler import CaptureReconciler
 from payment.utils.paypal_operations import PayPalOperationsManager
 from user.models import User
 from utils.helpers import get_semester
+from utils.exports import ExportMixin
+from utils.pagination import KeysetPagination
 
 
-class PaymentViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+class PaymentViewSet(ExportMixin, mixins.ListModelMixin,
+                     viewsets.GenericViewSet):
     """
     API endpoint that allows payments to be viewed.
     Student can view only his payments and staff can view all payments.
     """
     serializer_class = PaymentSerializer
     permission_classes = [IsStudentOrManagement]
+    pagination_class = KeysetPagination
+    export_fields = [
+        ("id", "id"),
+        ("order_id", "order_id"),
+        ("user", "user__username"),
+        ("amount", "amount"),
+        ("semester", "semester__year"),
+        ("semester_number", "semester__semester"),
+        ("created_at", "created_at"),
+    ]
 
     def get_queryset(self):
         user = self.request.user
@@ -102,32 +119,91 @@ class PayPalCreateOrderView(APIView):
 class PayPalCaptureOrderView(APIView):
     """
     API endpoint that allows to capture a PayPal order.
+    The capture runs in a Celery task, the response has the
+    status url of the capture. Capturing the same order again
+    returns the same capture, so the payment is credited once.
     """
     permission_classes = [IsStudentOrManagement]
 
     def post(self, request):
         order_id = request.data.get("order_id")
+        if not order_id:
+            return Response({"error": "order_id is required"}, status=400)
+        capture, created = PaymentCapture.objects.get_or_create(
+            order_id=order_id,
+            defaults={"user": request.user, "semester": get_semester()}
+        )
+        if capture.user_id != request.user.pk:
+            return Response({"error": "Capture not found"}, status=404)
+        # A failed capture is tried again, e.g. after the payer
+        # approved the order with another funding source
+        retried = not created and PaymentCapture.objects.filter(
+            pk=capture.pk,
+            status=3
+        ).update(status=1, error="")
+        if created or retried:
+            capture.refresh_from_db()
+            transaction.on_commit(lambda: capture_payment.delay(order_id))
+        response = PaymentCaptureSerializer(capture).data
+        response["status_url"] = request.build_absolute_uri(
+            reverse("payment:paypal-capture-status", args=[order_id])
+        )
+        return Response(response, status=202 if capture.status == 1 else 200)
+
+
+class PayPalCaptureStatusView(APIView):
+    """
+    API endpoint that allows to view the status of a PayPal capture.
+    """
+    permission_classes = [IsStudentOrManagement]
+
+    def get(self, request, order_id):
+        capture = PaymentCapture.objects.select_related("payment").filter(
+            order_id=order_id
+        ).first()
+        if capture is None or (
+                capture.user_id != request.user.pk and
+                request.user.role not in [3, 4]
+        ):
+            return Response({"error": "Capture not found"}, status=404)
+        return Response(PaymentCaptureSerializer(capture).data)
+
+
+class PayPalWebhookView(APIView):
+    """
+    API endpoint that receives the PayPal capture events.
+    The events are verified with PayPal and reconcile the captures
+    the task couldn't settle, e.g. pending or timed out ones.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        event = request.data
         try:
-            capture = PayPalOperationsManager().capture_paypal_order(order_id)
-            payments = capture["purchase_units"][0]["payments"]
-            amount = (
-                payments["captures"][0]["amount"]["value"]
+            verified = PayPalOperationsManager().verify_webhook_signature(
+                request.headers,
+                event
             )
-            amount = float(amount)
-            if capture.get("status") == "COMPLETED":
-                semester = get_semester()
-                payment = Payment.objects.create(
-                    order_id=order_id,
-                    amount=amount,
-                    user=request.user,
-                    semester=semester,
-                )
-                payment.save()
-                request.user.loan -= Decimal(amount)
-                request.user.save()
-            return Response(capture)
-        except Exception as e:
-            return Response({"error": str(e)}, status=400)
+        except Exception:
+            verified = False
+        if not verified:
+            return Response({"error": "Invalid webhook event"}, status=400)
+        resource = event.get("resource") or {}
+        order_id = resource.get(
+            "supplementary_data", {}
+        ).get(
+            "related_ids", {}
+        ).get("order_id")
+        event_type = event.get("event_type")
+        if order_id and event_type == "PAYMENT.CAPTURE.COMPLETED":
+            CaptureReconciler(order_id).complete(
+                Decimal(resource["amount"]["value"])
+            )
+        elif order_id and event_type in ["PAYMENT.CAPTURE.DENIED",
+                                         "PAYMENT.CAPTURE.DECLINED"]:
+            CaptureReconciler(order_id).fail(event_type)
+        return Response({"success": True})
 
 
 class payment_success(APIView):
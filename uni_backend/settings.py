@@ -96,10 +96,21 @@ WSGI_APPLICATION = 'uni_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Write transactions take the lock when they begin, so concurrent
+# requests (e.g. lecture registrations) wait for each other instead of
+# failing with "database is locked". The tests use a file database too,
+# since the in-memory one can't be shared by concurrent connections.
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
@@ -213,6 +224,12 @@ PAYPAL_TEST = True
 PAYPAL_API_BASE_URL = os.getenv("PAYPAL_BASE_URL")
 PAYPAL_CLIENT_ID = os.getenv("PAYPAL_ID")
 PAYPAL_CLIENT_SECRET = os.getenv("PAYPAL_CLIENT_SECRET")
+# (connect, read) seconds
+PAYPAL_TIMEOUT = (3.05, 20)
+PAYPAL_MAX_RETRIES = 3
+PAYPAL_POOL_SIZE = 10
+# Id of the webhook receiving the capture events, used to verify them
+PAYPAL_WEBHOOK_ID = os.getenv("PAYPAL_WEBHOOK_ID")
 
 CELERY_BROKER_URL = 'redis://127.0.0.1:6379'
 CELERY_ACCEPT_CONTENT = ['application/json']
@@ -221,8 +238,21 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Asia/Tbilisi'
 
 CELERY_RESULT_BACKEND = 'django-db'
+# Syllabus renders run on their own queue, so their number is bounded by
+# that worker's concurrency: celery -A uni_backend worker -Q syllabus -c 2
+CELERY_TASK_ROUTES = {
+    'course.tasks.generate_syllabus': {'queue': 'syllabus'},
+    'course.tasks.pack_syllabus_batch': {'queue': 'syllabus'},
+}
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 
+# "pdfkit" (wkhtmltopdf), "xhtml2pdf" (pure Python, optional dependency)
+# or a dotted path to a renderer class, see course.utils.pdf_renderers
+SYLLABUS_PDF_RENDERER = os.getenv("SYLLABUS_PDF_RENDERER", "pdfkit")
+SYLLABUS_PDF_RENDERER_POOL_SIZE = int(
+    os.getenv("SYLLABUS_PDF_RENDERER_POOL_SIZE", 2)
+)
+
 
 ROSETTA_MESSAGES_PER_PAGE = 15
 ROSETTA_ENABLE_TRANSLATION_SUGGESTIONS = True
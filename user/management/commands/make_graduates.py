@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from user.utils.graduation import GraduationEvaluator
+
+
+class Command(BaseCommand):
+    help = "Promote the students who have graduated to graduates."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only list the candidates without promoting them."
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Number of students evaluated at once."
+        )
+
+    def handle(self, *args, **options):
+        result = GraduationEvaluator(
+            chunk_size=options["chunk_size"],
+            dry_run=options["dry_run"]
+        ).run()
+        for username in result["graduates"]:
+            self.stdout.write(username)
+        verb = "would be promoted" if result["dry_run"] else "promoted"
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(result['graduates'])} of {result['processed']} "
+            f"students {verb}."
+        ))
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.4 on 2026-10-17 20:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0023_alter_user_government_scholarship'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BatchJobCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='დავალების სახელი')),
+                ('last_pk', models.BigIntegerField(default=0, verbose_name='ბოლო დამუშავებული ID')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='განახლდა')),
+            ],
+        ),
+    ]
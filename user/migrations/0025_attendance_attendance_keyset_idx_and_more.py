@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-17 20:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('course', '0054_grade_grade_keyset_idx_and_more'),
+        ('user', '0024_batchjobcheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date', 'id'], name='attendance_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['date_joined', 'id'], name='user_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-17 21:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0025_attendance_attendance_keyset_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='googleoauthtoken',
+            name='calendar_task_id',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='კალენდრის დავალების id'),
+        ),
+    ]
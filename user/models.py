@@ -127,6 +127,15 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = "username"
     REQUIRED_FIELDS = ["email", "first_name", "last_name"]
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the user list
+            models.Index(
+                fields=["date_joined", "id"],
+                name="user_keyset_idx"
+            ),
+        ]
+
     @property
     def year(self):
         current_year = timezone.now().year
@@ -173,6 +182,10 @@ class Attendance(models.Model):
 
     class Meta:
         unique_together = ["user", "lecture", "date"]
+        indexes = [
+            # Keyset pagination of the attendance list
+            models.Index(fields=["date", "id"], name="attendance_keyset_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user} - {self.lecture} - {self.date}"
@@ -189,9 +202,39 @@ class GoogleOAuthToken(models.Model):
     refresh_token = models.TextField(verbose_name=_("განახლების ტოკენი"))
     token_expiry = models.DateTimeField(verbose_name=_("ტოკენის ვადა"))
     token_type = models.CharField(max_length=100, default="Bearer", verbose_name=_("ტოკენის ტიპი"))
+    # The latest create_calendar_events task of the user
+    calendar_task_id = models.CharField(
+        max_length=255,
+        blank=True,
+        default="",
+        verbose_name=_("კალენდრის დავალების id")
+    )
 
     def is_valid(self):
         """
         Checks if the access token is still valid.
         """
         return timezone.now() < self.token_expiry
+
+
+class BatchJobCheckpoint(models.Model):
+    """
+    Stores the last processed primary key of a chunked batch job,
+    so the job can resume where it stopped after a crash.
+    """
+    name = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name=_("დავალების სახელი")
+    )
+    last_pk = models.BigIntegerField(
+        default=0,
+        verbose_name=_("ბოლო დამუშავებული ID")
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_("განახლდა")
+    )
+
+    def __str__(self):
+        return f"{self.name} - {self.last_pk}"
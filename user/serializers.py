@@ -239,3 +239,66 @@ class AttendanceSerializer(serializers.ModelSerializer):
                 "The date does not match the lecture day."
             )
         return data
+
+
+class BulkAttendanceRowSerializer(serializers.Serializer):
+    """
+    Serializer for one student's attendance in the bulk marking.
+    """
+    user = serializers.IntegerField()
+    first_hour = serializers.BooleanField(default=False)
+    second_hour = serializers.BooleanField(default=False)
+    third_hour = serializers.BooleanField(default=False)
+
+
+class BulkAttendanceSerializer(serializers.Serializer):
+    """
+    Serializer for marking the attendance of a whole lecture session.
+    The students are checked against the roster fetched once,
+    and the attendances are upserted in one query.
+    """
+    lecture = serializers.PrimaryKeyRelatedField(
+        queryset=Lecture.objects.all()
+    )
+    date = serializers.DateField()
+    attendances = BulkAttendanceRowSerializer(many=True, allow_empty=False)
+
+    def validate(self, data):
+        lecture = data["lecture"]
+        request = self.context.get("request")
+        if request.user.role == 2 and request.user != lecture.professor:
+            raise serializers.ValidationError(
+                "You are not the professor of this lecture."
+            )
+        if data["date"].weekday() + 1 != lecture.day:
+            raise serializers.ValidationError(
+                "The date does not match the lecture day."
+            )
+        roster = set(lecture.users.values_list("pk", flat=True))
+        errors = {}
+        seen = set()
+        for number, row in enumerate(data["attendances"]):
+            if row["user"] not in roster:
+                errors[number] = "This user is not enrolled in this lecture."
+            elif row["user"] in seen:
+                errors[number] = "This user is given more than once."
+            seen.add(row["user"])
+        if errors:
+            raise serializers.ValidationError({"attendances": errors})
+        return data
+
+    def create(self, validated_data):
+        hours = ["first_hour", "second_hour", "third_hour"]
+        return Attendance.objects.bulk_create(
+            [
+                Attendance(
+                    user_id=row["user"],
+                    lecture=validated_data["lecture"],
+                    date=validated_data["date"],
+                    **{hour: row[hour] for hour in hours}
+                ) for row in validated_data["attendances"]
+            ],
+            update_conflicts=True,
+            unique_fields=["user", "lecture", "date"],
+            update_fields=hours
+        )
@@ -1,9 +1,14 @@
+import os
 from celery import shared_task
-from django.db.models import Sum
-from course.utils.grade_calculator import GradeCalculator
-from payment.utils.payment_calculator import PaymentCalculator
-from course.models import Grade, GradeRecord, Lecture
+from course.models import Lecture
+from course.utils.grade_record_dispatcher import GradeRecordDispatcher
+from course.utils.grade_records import GradeRecordBuilder
+from payment.utils.loan_reconciler import LoanReconciler
 from user.models import User
+from user.utils.google_calendar import GoogleCalendar
+from user.utils.graduation import GraduationEvaluator
+from utils.helpers import get_semester
+from utils.response_cache import response_cache
 
 
 @shared_task
@@ -11,96 +16,77 @@ def deactivate_student_status():
     """
     Deactivate student status for students who have not
     paid for the current year and semester.
+    Loans are recalculated in bulk, see LoanReconciler.
+    :return: throughput metrics
     """
-    students = User.objects.filter(is_active=True, role=1)
-    for student in students:
-        queryset = student.payments.all()
-        if queryset.exists():
-            PaymentCalculator(student).student_payment(queryset)
-    students.filter(
+    metrics = LoanReconciler().reconcile()
+    metrics["deactivated"] = User.objects.filter(
+        is_active=True,
+        role=1,
         loan__gt=0,
     ).update(is_active=False)
+    if metrics["deactivated"]:
+        # The users were updated without sending the User signals
+        response_cache.bump("user")
+    return metrics
+
+
+@shared_task
+def add_grade_records(pairs):
+    """
+    Add or update grade records for many students at once
+    :param: pairs - list of [student id, lecture id]
+    :return: created and updated counts
+    """
+    # Edits made from now on must enqueue a new recalculation
+    GradeRecordDispatcher.release(pairs)
+    return GradeRecordBuilder(pairs).build()
 
 
 @shared_task
 def add_grade_record(student, lecture):
     """
     Add grade record for students
-    :param: student - User object
-    :param: lecture - Lecture object
+    :param: student - User id
+    :param: lecture - Lecture id
     """
-    student = User.objects.filter(pk=student).first()
-    lecture = Lecture.objects.filter(pk=lecture).first()
-    if lecture.name in ["საბაკალავრო ნაშრომი",
-                        "სამაგისტრო ნაშრომი",
-                        "Master Thesis",
-                        "Bachelor Thesis"]:
-        total_grade = Grade.objects.filter(
-            assignment__lecture=lecture,
-            student=student
-        ).first().grade
-        failed = False
-        if total_grade < 51:
-            failed = True
-    else:
-        grade_calculator = GradeCalculator(student)
-        grades = grade_calculator.calculate_grade(lecture)
-        final_exam_grade = grades["final_exam"]
-        total_grade = grades["final_grade"]
-        failed = False
-        if total_grade < 51:
-            failed = True
-        if final_exam_grade < 18:
-            failed = True
-    instance, created = GradeRecord.objects.get_or_create(
-        student=student,
-        lecture=lecture,
-        failed=failed,
-        defaults={"grade": total_grade}
-    )
-    if not created:
-        instance.grade = total_grade
-        instance.save()
+    return add_grade_records([[student, lecture]])
 
 
 @shared_task
-def make_graduate():
+def make_graduate(dry_run=False):
     """
     Change a Student group to a graduate group for students who have graduated
+    :param: dry_run - only return the candidates without promoting them
+    :return: processed count and graduate usernames
     """
-    users = User.objects.filter(is_active=True)
-    students = users.filter(role=1)
+    return GraduationEvaluator(dry_run=dry_run).run()
+
+
+@shared_task(bind=True)
+def create_calendar_events(self, user):
+    """
+    Create the events of the user's current semester lectures
+    in Google Calendar, reporting the progress in the task state.
+    :param: user - User id
+    :return: number of created/updated events and errors
+    """
+    user = User.objects.get(pk=user)
+    lectures = Lecture.objects.filter(
+        users=user,
+        semester=get_semester()
+    ).select_related("location")
+    google_calendar = GoogleCalendar(
+        user,
+        os.getenv("GOOGLE_CREDENTIALS_PATH"),
+        authorize=False
+    )
+
+    def progress(done, total):
+        self.update_state(
+            state="PROGRESS",
+            meta={"done": done, "total": total}
+        )
 
-    for student in students:
-        student_records = GradeRecord.objects.filter(
-            student=student,
-            is_active=True
-        ).all()
-        if student_records:
-            masters = student_records.filter(
-                lecture__name__in=["სამაგისტრო ნაშრომი", "Master Thesis"]
-            )
-            bachelors = student_records.filter(
-                lecture__name__in=["საბაკალავრო ნაშრომი", "Bachelor Thesis"]
-            )
-            print(bachelors)
-            if masters.exists():
-                print("masters exists")
-                if not masters.first().failed:
-                    student_records = student_records.filter(
-                        lecture__uni_year__in=[5, 6]
-                    )
-                    total_credits = student_records.aggregate(
-                        total_credits=Sum("lecture__course__credits")
-                    )
-                    if total_credits["total_credits"] >= 120:
-                        student.role = 5
-                        student.save()
-            elif bachelors.exists():
-                if not bachelors.first().failed:
-                    total_credits = student_records.aggregate(
-                        total_credits=Sum("lecture__course__credits")
-                    )
-                    if total_credits["total_credits"] >= 240:
-                        student.role = 5
-                        student.save()
+    result = google_calendar.create_events(lectures, progress)
+    return {"events": len(result["events"]), "errors": result["errors"]}
@@ -1,3 +1,495 @@
+import datetime
+import json
+import threading
+from email.parser import BytesParser
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httplib2
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from course.models import Semester, Auditorium, Lecture, Department, \
+    Course, GradeRecord
+from course.tests import LectureFixtureMixin
+from user.models import User, Attendance, GoogleOAuthToken, \
+    BatchJobCheckpoint
+from user.utils.google_calendar import GoogleCalendar, google_credentials
+from user.utils.graduation import GraduationEvaluator
+from user.tasks import deactivate_student_status
+from utils.response_cache import response_cache
 
-# Create your tests here.
+
+class AttendanceFixtureMixin(LectureFixtureMixin):
+    """
+    Puts the lecture in a semester and gives it a professor and a roster.
+    """
+    students_count = 20
+
+    def setUp(self):
+        super().setUp()
+        self.semester = Semester.objects.create(
+            year="2025-2026",
+            semester=1,
+            start_date=datetime.date(2025, 9, 15),
+            end_date=datetime.date(2025, 10, 12),
+            midterm_start=datetime.date(2025, 11, 3),
+            final_start=datetime.date(2026, 1, 5)
+        )
+        self.professor = User.objects.create_user(
+            "Professor",
+            "Professor",
+            "professor@example.com",
+            "pass123!",
+            username="professor",
+            role=2
+        )
+        self.lecture.semester = self.semester
+        self.lecture.professor = self.professor
+        # Wednesday
+        self.lecture.day = 3
+        self.lecture.save()
+        self.lecture.users.add(*self.students)
+        self.client = APIClient()
+        self.client.force_authenticate(self.professor)
+
+
+class BulkAttendanceTest(AttendanceFixtureMixin, TestCase):
+    """
+    Checks that a session's attendance is upserted in one request
+    with a number of queries that doesn't depend on the roster size.
+    """
+    def _mark(self, students, date=datetime.date(2025, 9, 17), hour=True):
+        return self.client.post(
+            reverse("user:attendance-bulk"),
+            {
+                "lecture": self.lecture.pk,
+                "date": date,
+                "attendances": [
+                    {"user": student.pk, "first_hour": hour}
+                    for student in students
+                ]
+            },
+            format="json"
+        )
+
+    def test_query_count_is_constant(self):
+        with CaptureQueriesContext(connection) as small:
+            self._mark(self.students[:2])
+        with CaptureQueriesContext(connection) as large:
+            response = self._mark(self.students)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(Attendance.objects.count(), self.students_count)
+
+    def test_attendance_is_overwritten(self):
+        self._mark(self.students[:1])
+        self._mark(self.students[:1], hour=False)
+        attendance = Attendance.objects.get()
+        self.assertFalse(attendance.first_hour)
+
+    def test_unenrolled_student_is_rejected(self):
+        outsider = User.objects.create_user(
+            "Outsider",
+            "Outsider",
+            "outsider@example.com",
+            "pass123!",
+            username="outsider",
+            role=1
+        )
+        response = self._mark([self.students[0], outsider])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(1, response.data["attendances"])
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_matrix(self):
+        self._mark(self.students[:2])
+        self._mark(self.students[1:2], date=datetime.date(2025, 9, 24))
+        response = self.client.get(
+            reverse("user:attendance-matrix"),
+            {"lecture": self.lecture.pk}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data["dates"],
+            [datetime.date(2025, 9, 17), datetime.date(2025, 9, 24),
+             datetime.date(2025, 10, 1), datetime.date(2025, 10, 8)]
+        )
+        rows = dict(zip(
+            [student["id"] for student in response.data["students"]],
+            response.data["rows"]
+        ))
+        self.assertEqual(len(rows), self.students_count)
+        self.assertEqual(rows[self.students[0].pk], [1, None, None, None])
+        self.assertEqual(rows[self.students[1].pk], [1, 1, None, None])
+
+
+class FakeCalendarHandler(BaseHTTPRequestHandler):
+    """
+    Answers the Calendar API batch requests with the events
+    kept on the server, like the Calendar API would.
+    """
+    def log_message(self, format, *args):
+        pass
+
+    def _call(self, method, path, body):
+        event_id = path.split("?")[0].rsplit("/", 1)[-1]
+        if method == "POST":
+            event = json.loads(body)
+            if event["id"] in self.server.events:
+                return "409 Conflict", {"error": {"code": 409}}
+            self.server.events[event["id"]] = event
+            return "200 OK", event
+        if method == "PUT" and event_id in self.server.events:
+            self.server.events[event_id] = json.loads(body)
+            return "200 OK", self.server.events[event_id]
+        return "404 Not Found", {"error": {"code": 404}}
+
+    def do_POST(self):
+        self.server.batches += 1
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        message = BytesParser().parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode()
+            + body
+        )
+        boundary = "batch_boundary"
+        parts = []
+        for part in message.get_payload():
+            request = part.get_payload().replace("\r\n", "\n")
+            request_line, rest = request.split("\n", 1)
+            method, path, _ = request_line.split(" ")
+            call_body = rest.split("\n\n", 1)[1] if "\n\n" in rest else ""
+            status, response = self._call(method, path, call_body)
+            content_id = part["Content-ID"].replace("<", "<response-", 1)
+            parts.append(
+                f"--{boundary}\r\n"
+                f"Content-Type: application/http\r\n"
+                f"Content-ID: {content_id}\r\n\r\n"
+                f"HTTP/1.1 {status}\r\n"
+                f"Content-Type: application/json\r\n\r\n"
+                f"{json.dumps(response)}\r\n"
+            )
+        content = ("".join(parts) + f"--{boundary}--\r\n").encode()
+        self.send_response(200)
+        self.send_header(
+            "Content-Type",
+            f"multipart/mixed; boundary={boundary}"
+        )
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class GoogleCalendarTest(LectureFixtureMixin, TestCase):
+    """
+    Checks against a local fake Calendar service that the events
+    are sent in batches and that creating them again updates them.
+    """
+    students_count = 1
+
+    def setUp(self):
+        super().setUp()
+        self.server = ThreadingHTTPServer(
+            ("127.0.0.1", 0),
+            FakeCalendarHandler
+        )
+        self.server.events = {}
+        self.server.batches = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        document = json.loads(get_static_doc("calendar", "v3"))
+        document["rootUrl"] = f"http://127.0.0.1:{self.server.server_port}/"
+        self.service = build_from_document(document, http=httplib2.Http())
+
+        auditorium = Auditorium.objects.create(name="101", capacity=30)
+        self.lectures = []
+        for i in range(3):
+            self.lectures.append(Lecture.objects.create(
+                name=f"Mechanics {i}",
+                course=self.lecture.course,
+                uni_year=1,
+                location=auditorium,
+                start_time=datetime.time(10),
+                end_time=datetime.time(12),
+                start_day=datetime.date(2025, 9, 15 + i),
+                start_day_second=datetime.date(2025, 11, 10 + i)
+            ))
+
+    def test_events_are_batched_and_upserted(self):
+        google_calendar = GoogleCalendar(
+            self.students[0],
+            None,
+            service=self.service
+        )
+        google_calendar.batch_size = 4
+        progress = []
+        first = google_calendar.create_events(
+            self.lectures,
+            lambda done, total: progress.append((done, total))
+        )
+        self.assertEqual(len(first["events"]), 6)
+        self.assertEqual(first["errors"], [])
+        self.assertEqual(self.server.batches, 2)
+        self.assertEqual(progress, [(4, 6), (6, 6)])
+
+        self.lectures[0].name = "Mechanics I"
+        second = google_calendar.create_events(self.lectures)
+        self.assertEqual(len(second["events"]), 6)
+        self.assertEqual(second["errors"], [])
+        self.assertEqual(len(self.server.events), 6)
+        self.assertIn(
+            "Mechanics I",
+            [event["summary"] for event in self.server.events.values()]
+        )
+
+
+def refresh_credentials(credentials, request):
+    credentials.token = "refreshed"
+    credentials.expiry = (
+        datetime.datetime.now(datetime.UTC).replace(tzinfo=None) +
+        datetime.timedelta(hours=1)
+    )
+
+
+class GoogleCredentialsCacheTest(TestCase):
+    """
+    Checks that the credentials are loaded once per process
+    and refreshed before they expire.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(
+            "Student",
+            "Student",
+            "student@example.com",
+            "pass123!",
+            username="student",
+            role=1
+        )
+        google_credentials.invalidate(self.user.pk)
+        self.addCleanup(google_credentials.invalidate, self.user.pk)
+
+    def _token(self, expires_in):
+        return GoogleOAuthToken.objects.create(
+            user=self.user,
+            access_token="access",
+            refresh_token="refresh",
+            token_expiry=timezone.now() + expires_in
+        )
+
+    @mock.patch("user.utils.google_calendar.GoogleCredentialsCache."
+                "_refresh_in_background")
+    def test_credentials_are_cached(self, refresh_in_background):
+        self._token(datetime.timedelta(hours=1))
+        GoogleCalendar(self.user, None)
+        with CaptureQueriesContext(connection) as queries:
+            service = GoogleCalendar(self.user, None).service
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(service._http.credentials.token, "access")
+        refresh_in_background.assert_not_called()
+
+    @mock.patch(
+        "google.oauth2.credentials.Credentials.refresh",
+        refresh_credentials
+    )
+    def test_expired_token_is_refreshed(self):
+        self._token(datetime.timedelta(minutes=-1))
+        credentials = google_credentials.get(self.user.pk)
+        self.assertEqual(credentials.token, "refreshed")
+        self.assertEqual(
+            GoogleOAuthToken.objects.get(user=self.user).access_token,
+            "refreshed"
+        )
+
+    @mock.patch("user.utils.google_calendar.GoogleCredentialsCache."
+                "_refresh_in_background")
+    def test_expiring_token_is_refreshed_in_background(
+            self,
+            refresh_in_background
+    ):
+        self._token(datetime.timedelta(minutes=5))
+        credentials = google_credentials.get(self.user.pk)
+        self.assertEqual(credentials.token, "access")
+        refresh_in_background.assert_called_once_with(
+            self.user.pk,
+            credentials
+        )
+
+
+class CreateEventViewTest(TestCase):
+    """
+    Checks that the progress of the user's latest calendar task
+    is found from the database.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(
+            "Student",
+            "Student",
+            "student@example.com",
+            "pass123!",
+            username="student",
+            role=1
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse("user:create_event")
+
+    @mock.patch("user.views.AsyncResult")
+    @mock.patch("user.views.create_calendar_events.delay")
+    @mock.patch("user.views.GoogleCalendar")
+    def test_progress_of_the_latest_task(self, calendar, delay,
+                                         async_result):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 404)
+
+        GoogleOAuthToken.objects.create(
+            user=self.user,
+            access_token="token",
+            refresh_token="refresh",
+            token_expiry=timezone.now() + datetime.timedelta(hours=1)
+        )
+        delay.return_value.id = "calendar-task"
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(
+            GoogleOAuthToken.objects.get().calendar_task_id,
+            "calendar-task"
+        )
+
+        async_result.return_value.state = "PROGRESS"
+        async_result.return_value.info = {"done": 50, "total": 120}
+        response = self.client.get(self.url)
+        async_result.assert_called_with("calendar-task")
+        self.assertEqual(response.data["status"], "progress")
+        self.assertEqual(response.data["done"], 50)
+
+
+class GraduationEvaluatorTest(TestCase):
+    """
+    Checks that the graduation run resumes from its checkpoint
+    and that a dry run doesn't change the users.
+    """
+    def setUp(self):
+        department = Department.objects.create(name="Physics", code="PHY")
+        thesis = Lecture.objects.create(
+            name="Bachelor Thesis",
+            course=Course.objects.create(
+                name="Bachelor Thesis",
+                code="PHY4000",
+                department=department,
+                credits=240
+            ),
+            uni_year=4
+        )
+        self.students = []
+        # Every third student failed the thesis
+        for i in range(6):
+            student = User.objects.create_user(
+                f"Student{i}",
+                f"Student{i}",
+                f"student{i}@example.com",
+                "pass123!",
+                username=f"student{i}",
+                role=1
+            )
+            GradeRecord.objects.create(
+                student=student,
+                lecture=thesis,
+                grade=40 if i % 3 == 2 else 80,
+                failed=i % 3 == 2
+            )
+            self.students.append(student)
+        self.graduates = [
+            student.username for i, student in enumerate(self.students)
+            if i % 3 != 2
+        ]
+
+    def _roles(self):
+        return list(
+            User.objects.filter(
+                pk__in=[student.pk for student in self.students]
+            ).order_by("pk").values_list("role", flat=True)
+        )
+
+    def test_interrupted_run_resumes_from_the_checkpoint(self):
+        evaluate_chunk = GraduationEvaluator._evaluate_chunk
+        calls = []
+
+        def crash_on_second_chunk(evaluator, student_ids):
+            calls.append(student_ids)
+            if len(calls) == 2:
+                raise RuntimeError("worker lost")
+            return evaluate_chunk(evaluator, student_ids)
+
+        with mock.patch.object(
+                GraduationEvaluator,
+                "_evaluate_chunk",
+                crash_on_second_chunk
+        ), self.assertRaises(RuntimeError):
+            GraduationEvaluator(chunk_size=3).run()
+
+        checkpoint = BatchJobCheckpoint.objects.get(
+            name=GraduationEvaluator.checkpoint_name
+        )
+        self.assertEqual(checkpoint.last_pk, self.students[2].pk)
+        self.assertEqual(self._roles(), [5, 5, 1, 1, 1, 1])
+
+        result = GraduationEvaluator(chunk_size=3).run()
+        self.assertEqual(result["processed"], 3)
+        self.assertEqual(result["graduates"], self.graduates[2:])
+        self.assertEqual(self._roles(), [5, 5, 1, 5, 5, 1])
+        self.assertFalse(BatchJobCheckpoint.objects.exists())
+
+    def test_user_responses_are_invalidated(self):
+        before = response_cache.versions(["user"])
+        with self.captureOnCommitCallbacks(execute=True):
+            GraduationEvaluator(dry_run=True).run()
+        self.assertEqual(response_cache.versions(["user"]), before)
+        with self.captureOnCommitCallbacks(execute=True):
+            GraduationEvaluator().run()
+        self.assertNotEqual(response_cache.versions(["user"]), before)
+
+    def test_dry_run_does_not_change_users(self):
+        BatchJobCheckpoint.objects.create(
+            name=GraduationEvaluator.checkpoint_name,
+            last_pk=self.students[2].pk
+        )
+        result = GraduationEvaluator(chunk_size=4, dry_run=True).run()
+        self.assertTrue(result["dry_run"])
+        self.assertEqual(result["processed"], 6)
+        self.assertEqual(result["graduates"], self.graduates)
+        self.assertEqual(self._roles(), [1] * 6)
+        self.assertEqual(
+            BatchJobCheckpoint.objects.get().last_pk,
+            self.students[2].pk
+        )
+
+
+class DeactivateStudentStatusTest(TestCase):
+    """
+    Checks that the students with a loan are deactivated
+    and the cached user responses are invalidated.
+    """
+    def setUp(self):
+        self.student = User.objects.create_user(
+            "Student",
+            "Student",
+            "student@example.com",
+            "pass123!",
+            username="student",
+            role=1,
+            loan=100
+        )
+
+    def test_deactivation_invalidates_user_responses(self):
+        before = response_cache.versions(["user"])
+        with self.captureOnCommitCallbacks(execute=True):
+            metrics = deactivate_student_status()
+        self.assertEqual(metrics["deactivated"], 1)
+        self.student.refresh_from_db()
+        self.assertFalse(self.student.is_active)
+        self.assertNotEqual(response_cache.versions(["user"]), before)
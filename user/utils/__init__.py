@@ -1,2 +1,4 @@
 from .helpers import send_reset_email, validate_passwords
-from .google_calendar import GoogleCalendar
\ No newline at end of file
+from .google_calendar import GoogleCalendar
+from .graduation import GraduationEvaluator
+from .attendance_matrix import AttendanceMatrix
@@ -0,0 +1,114 @@
+import datetime
+from django.db.models import Q
+from user.models import Attendance, User
+from utils.helpers import get_semester
+
+
+class AttendanceMatrix:
+    """
+    This class is responsible for building the attendance of one
+    lecture in a semester as a dense student x date grid.
+
+    Every cell holds the attended hours packed in a bitmask
+    (first hour = 1, second hour = 2, third hour = 4),
+    or None if the attendance wasn't taken for the student that day.
+    """
+    FIRST_HOUR = 1
+    SECOND_HOUR = 2
+    THIRD_HOUR = 4
+
+    def __init__(self, lecture, semester=None):
+        """
+        This function initializes the AttendanceMatrix class.
+        :param lecture: Lecture object
+        :param semester: Semester object, the lecture's semester by default
+        """
+        self.lecture = lecture
+        self.semester = semester or lecture.semester or get_semester()
+
+    def _session_dates(self):
+        """
+        This method lists the lecture days of the semester.
+        :return: List of dates
+        """
+        if self.semester is None or self.lecture.day is None:
+            return []
+        start = self.semester.start_date
+        # Move to the first lecture day of the semester
+        start += datetime.timedelta(
+            days=(self.lecture.day - start.isoweekday()) % 7
+        )
+        dates = []
+        while start <= self.semester.end_date:
+            dates.append(start)
+            start += datetime.timedelta(weeks=1)
+        return dates
+
+    @classmethod
+    def pack(cls, first_hour, second_hour, third_hour):
+        """
+        This method packs the attended hours into a bitmask.
+        :return: int
+        """
+        return (
+            cls.FIRST_HOUR * first_hour |
+            cls.SECOND_HOUR * second_hour |
+            cls.THIRD_HOUR * third_hour
+        )
+
+    def build(self):
+        """
+        This method builds the matrix with two queries,
+        one for the roster and one for the attendances.
+        :return: Dictionary with dates, students and the grid rows
+        """
+        attendances = Attendance.objects.filter(lecture=self.lecture)
+        if self.semester is not None:
+            attendances = attendances.filter(
+                date__range=(self.semester.start_date, self.semester.end_date)
+            )
+        cells = {
+            (user_id, date): self.pack(first_hour, second_hour, third_hour)
+            for user_id, date, first_hour, second_hour, third_hour
+            in attendances.values_list(
+                "user_id",
+                "date",
+                "first_hour",
+                "second_hour",
+                "third_hour"
+            )
+        }
+        dates = sorted(
+            set(self._session_dates()) | {date for _, date in cells}
+        )
+        # Students who left the lecture still keep their attendance row
+        students = list(
+            User.objects.filter(
+                Q(pk__in={user_id for user_id, _ in cells}) |
+                Q(lectures=self.lecture, role__in=[1, 5])
+            ).distinct().order_by(
+                "last_name",
+                "first_name",
+                "pk"
+            ).values_list(
+                "pk",
+                "username",
+                "first_name",
+                "last_name"
+            )
+        )
+        return {
+            "lecture": self.lecture.pk,
+            "dates": dates,
+            "students": [
+                {
+                    "id": pk,
+                    "username": username,
+                    "full_name": f"{first_name} {last_name}"
+                } for pk, username, first_name, last_name in students
+            ],
+            "rows": [
+                [cells.get((pk, date)) for date in dates]
+                for pk, *_ in students
+            ]
+        }
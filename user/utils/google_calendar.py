@@ -1,9 +1,14 @@
 import datetime
+import functools
+import hashlib
+import json
 import os.path
-import pytz
+import threading
+from django.db import connection
 from django.utils import timezone
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
 from google.auth.transport.requests import Request
 from googleapiclient.errors import HttpError
 from google_auth_oauthlib.flow import InstalledAppFlow
@@ -13,79 +18,219 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+SCOPES = ["https://www.googleapis.com/auth/calendar"]
+
+
+@functools.cache
+def calendar_document():
+    """
+    This function returns the Calendar API discovery document,
+    loaded once per process.
+    :return: dict
+    """
+    return json.loads(get_static_doc("calendar", "v3"))
+
+
+class GoogleCredentialsCache:
+    """
+    This class keeps the users' Google credentials per process,
+    so the token isn't loaded from the database on every request.
+
+    Credentials that expire within the refresh margin are still
+    returned, while a background thread refreshes them; expired
+    credentials are refreshed before they are returned.
+    """
+    refresh_margin = datetime.timedelta(minutes=10)
+
+    def __init__(self):
+        self._credentials = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _now():
+        # google-auth compares expiry with naive UTC datetimes
+        return datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+
+    @staticmethod
+    def _credentials_from_token(token):
+        """
+        This method creates the credentials of the stored token.
+        :param token: GoogleOAuthToken object
+        :return: Credentials
+        """
+        return Credentials(
+            token.access_token,
+            refresh_token=token.refresh_token,
+            token_uri="https://oauth2.googleapis.com/token",
+            client_id=os.getenv("GOOGLE_CLIENT_ID"),
+            client_secret=os.getenv("GOOGLE_CLIENT_SECRET"),
+            scopes=SCOPES,
+            expiry=timezone.make_naive(
+                token.token_expiry,
+                datetime.UTC
+            )
+        )
+
+    def store(self, user_id, credentials):
+        """
+        This method saves the credentials to the database and the cache.
+        :param user_id: User id
+        :param credentials: Credentials
+        """
+        GoogleOAuthToken.objects.update_or_create(
+            user_id=user_id,
+            defaults={
+                "access_token": credentials.token,
+                "refresh_token": credentials.refresh_token,
+                "token_expiry": timezone.make_aware(
+                    credentials.expiry,
+                    datetime.UTC
+                ),
+            }
+        )
+        with self._lock:
+            self._credentials[user_id] = credentials
+
+    def refresh(self, user_id, credentials):
+        """
+        This method refreshes the credentials and stores the new token.
+        :param user_id: User id
+        :param credentials: Credentials
+        :return: Credentials
+        """
+        credentials.refresh(Request())
+        self.store(user_id, credentials)
+        return credentials
+
+    def _refresh_in_background(self, user_id, credentials):
+        with self._lock:
+            if user_id in self._refreshing:
+                return
+            self._refreshing.add(user_id)
+
+        def refresh():
+            try:
+                self.refresh(user_id, credentials)
+            except Exception:
+                # The credentials are refreshed on the next use
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing.discard(user_id)
+                connection.close()
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def _load(self, user_id):
+        """
+        This method loads the credentials from the database, refreshing
+        them if they expired, since another process may have
+        refreshed the token already.
+        :param user_id: User id
+        :return: Credentials or None if the user isn't authorized
+        """
+        token = GoogleOAuthToken.objects.filter(user_id=user_id).first()
+        if token is None:
+            return None
+        credentials = self._credentials_from_token(token)
+        if credentials.expired:
+            if not credentials.refresh_token:
+                return None
+            return self.refresh(user_id, credentials)
+        with self._lock:
+            self._credentials[user_id] = credentials
+        return credentials
+
+    def get(self, user_id):
+        """
+        This method returns the valid credentials of the user.
+        :param user_id: User id
+        :return: Credentials or None if the user isn't authorized
+        """
+        credentials = self._credentials.get(user_id)
+        if credentials is None or credentials.expired:
+            credentials = self._load(user_id)
+        if credentials is not None and credentials.refresh_token and \
+                credentials.expiry - self._now() < self.refresh_margin:
+            self._refresh_in_background(user_id, credentials)
+        return credentials
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._credentials.pop(user_id, None)
+
+
+google_credentials = GoogleCredentialsCache()
+
 
 class GoogleCalendar:
     """
     A class for creating events in Google Calendar.
+
+    The events are sent in batch requests and have deterministic ids,
+    so creating them again updates the existing events
+    instead of duplicating them.
     """
-    def __init__(self, user, credentials_path):
+    # Calendar API accepts at most 50 calls per batch request
+    batch_size = 50
+
+    def __init__(self, user, credentials_path, service=None, authorize=True):
         """
         Constructor for the GoogleCalendar class.
         :param user: User
         :param credentials_path: Path to credentials.json file
+        :param service: Google Calendar service object, built from
+        the user's token by default
+        :param authorize: Whether the user may be asked to authorize,
+        False in the background tasks
         """
         self.user = user
         self.credentials_path = credentials_path
-        self.service = self._initialize_service()
+        self.authorize = authorize
+        self.service = service or self._initialize_service()
 
     def _authorize(self):
         """
         This function is used to authorize the user via Google OAuth.
-        :return: Google Calendar service object
+        :return: Credentials
         """
+        if not self.authorize:
+            raise Exception("Google Calendar authorization is required")
         flow = InstalledAppFlow.from_client_secrets_file(
             self.credentials_path,
-            scopes=["https://www.googleapis.com/auth/calendar"]
+            scopes=SCOPES
         )
         credentials = flow.run_local_server(port=0)
-
-        # Create token object
-        token = GoogleOAuthToken(user=self.user)
-        token.access_token = credentials.token
-        token.refresh_token = credentials.refresh_token
-        # Convert to a timezone-aware datetime in UTC
-        token.token_expiry = timezone.now() + (
-                credentials.expiry.replace(tzinfo=pytz.UTC) - timezone.now()
-        )
-        token.save()
-        return build("calendar", "v3", credentials=credentials)
+        google_credentials.store(self.user.pk, credentials)
+        return credentials
 
     def _initialize_service(self):
         """
         This function is used to initialize the Google Calendar service.
+        The credentials and the discovery document are cached,
+        see GoogleCredentialsCache and calendar_document.
         :return: Google Calendar service object
         """
-        try:
-            # Try to get the token from the database
-            token = GoogleOAuthToken.objects.get(user=self.user)
-            # Create credentials object
-            credentials = Credentials(
-                token.access_token,
-                refresh_token=token.refresh_token,
-                token_uri="https://oauth2.googleapis.com/token",
-                client_id=os.getenv("GOOGLE_CLIENT_ID"),
-                client_secret=os.getenv("GOOGLE_CLIENT_SECRET"),
-                scopes=["https://www.googleapis.com/auth/calendar"]
-            )
-            if not credentials.valid:
-                if (
-                        credentials.expired and
-                        credentials.refresh_token
-                ):
-                    # Refresh the token if it"s expired and
-                    # change the token in the database
-                    credentials.refresh(Request())
-                    token.access_token = credentials.token
-                    # Convert to a timezone-aware datetime in UTC
-                    token.token_expiry = timezone.now() + (
-                            credentials.expiry.replace(tzinfo=pytz.UTC) - timezone.now()
-                    )
-                    token.save()
-                else:
-                    return self._authorize()
-        except GoogleOAuthToken.DoesNotExist:
-            return self._authorize()
-        return build("calendar", "v3", credentials=credentials)
+        credentials = google_credentials.get(self.user.pk)
+        if credentials is None:
+            credentials = self._authorize()
+        return build_from_document(
+            calendar_document(),
+            credentials=credentials
+        )
+
+    def event_id(self, lecture, start):
+        """
+        This function is used to create the id of the event,
+        the same for the same user, lecture and start date.
+        Event ids may only have the characters 0-9 and a-v.
+        :param lecture: Lecture
+        :param start: Start date of the event
+        :return: Event id
+        """
+        key = f"{self.user.pk}:{lecture.pk}:{start.isoformat()}"
+        return hashlib.sha1(key.encode()).hexdigest()
 
     def create_event(self, lecture, start):
         """
@@ -104,8 +249,9 @@ class GoogleCalendar:
         )
 
         return {
+            "id": self.event_id(lecture, start),
             "summary": lecture.name,
-            "location": lecture.location.name,
+            "location": lecture.location.name if lecture.location else "",
             'start': {
                 'dateTime': start_date_time.isoformat(),
                 'timeZone': 'Asia/Tbilisi',
@@ -130,29 +276,75 @@ class GoogleCalendar:
             },
         }
 
-    def create_events(self, lectures):
+    def _execute(self, requests, progress=None, done=0, total=0):
+        """
+        This function is used to send the requests in batches.
+        :param requests: List of (event, request) tuples
+        :param progress: Callable receiving the done and total counts
+        :param done: Number of events already done
+        :param total: Total number of events
+        :return: List of (event, response, exception) tuples
+        """
+        results = []
+        for i in range(0, len(requests), self.batch_size):
+            chunk = requests[i:i + self.batch_size]
+            responses = {}
+
+            def callback(request_id, response, exception):
+                responses[request_id] = (response, exception)
+
+            batch = self.service.new_batch_http_request(callback=callback)
+            for index, (_, request) in enumerate(chunk):
+                batch.add(request, request_id=str(index))
+            batch.execute()
+            for index, (event, _) in enumerate(chunk):
+                results.append((event, *responses[str(index)]))
+            if progress is not None:
+                progress(done + len(results), total)
+        return results
+
+    def create_events(self, lectures, progress=None):
         """
         This function is used to create events in Google Calendar.
+        Every lecture has two events, before the midterm and before
+        the final. Events that already exist are updated.
         :param lectures: List of lectures.
-        :return: List of created events.
+        :param progress: Callable receiving the done and total counts
+        :return: Dictionary with the created/updated events and errors.
         """
+        events = [
+            self.create_event(lecture, start)
+            for lecture in lectures
+            for start in [lecture.start_day, lecture.start_day_second]
+        ]
+        calendar = self.service.events()
+        inserted = self._execute(
+            [(event, calendar.insert(calendarId=self.user.email, body=event))
+             for event in events],
+            progress,
+            total=len(events)
+        )
         created_events = []
-
-        for lecture in lectures:
-            before_midterm_start = lecture.start_day
-            before_final_start = lecture.start_day_second
-            try:
-                before_midterm_event = self.create_event(lecture, before_midterm_start)
-                first_created_event = self.service.events().insert(
-                    calendarId=self.user.email,
-                    body=before_midterm_event
-                ).execute()
-                before_final_event = self.create_event(lecture, before_final_start)
-                second_created_event = self.service.events().insert(
-                    calendarId=self.user.email,
-                    body=before_final_event
-                ).execute()
-                created_events.extend([first_created_event, second_created_event])
-            except HttpError as e:
-                raise Exception(f"Error creating event: {e}")
-        return created_events
+        existing = []
+        errors = []
+        for event, response, exception in inserted:
+            if exception is None:
+                created_events.append(response)
+            elif isinstance(exception, HttpError) and \
+                    exception.status_code == 409:
+                existing.append(event)
+            else:
+                errors.append(f"Error creating event: {exception}")
+        updated = self._execute([
+            (event, calendar.update(
+                calendarId=self.user.email,
+                eventId=event["id"],
+                body=event
+            )) for event in existing
+        ])
+        for event, response, exception in updated:
+            if exception is None:
+                created_events.append(response)
+            else:
+                errors.append(f"Error updating event: {exception}")
+        return {"events": created_events, "errors": errors}
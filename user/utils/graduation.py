@@ -0,0 +1,132 @@
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from course.choices import MASTER_THESIS_NAMES, BACHELOR_THESIS_NAMES
+from course.models import GradeRecord
+from user.models import User, BatchJobCheckpoint
+from utils.response_cache import response_cache
+
+
+class GraduationEvaluator:
+    """
+    This class finds the students who have graduated and
+    promotes them to graduates.
+
+    A student with a master thesis graduates if the thesis is passed
+    and they have at least 120 credits in the 5th and 6th years.
+    Otherwise, a student with a bachelor thesis graduates if the thesis
+    is passed and they have at least 240 credits.
+
+    Students are processed in chunks ordered by id, and the last
+    processed id is checkpointed, so a crashed run resumes
+    where it stopped.
+    """
+    checkpoint_name = "make_graduate"
+
+    def __init__(self, chunk_size=500, dry_run=False):
+        """
+        :param chunk_size: number of students evaluated at once
+        :param dry_run: only collect the candidates, don't promote them
+        """
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+
+    def _evaluate_chunk(self, student_ids):
+        """
+        Evaluate the thesis status and credits of a chunk of students
+        with one grouped query.
+        :param student_ids: User ids
+        :return: ids of the students who graduated
+        """
+        master = Q(lecture__name__in=MASTER_THESIS_NAMES)
+        bachelor = Q(lecture__name__in=BACHELOR_THESIS_NAMES)
+        records = GradeRecord.objects.filter(
+            student_id__in=student_ids,
+            is_active=True
+        ).values("student_id").annotate(
+            masters=Count("id", filter=master),
+            masters_passed=Count("id", filter=master & Q(failed=False)),
+            master_credits=Sum(
+                "lecture__course__credits",
+                filter=Q(lecture__uni_year__in=[5, 6])
+            ),
+            bachelors=Count("id", filter=bachelor),
+            bachelors_passed=Count("id", filter=bachelor & Q(failed=False)),
+            total_credits=Sum("lecture__course__credits"),
+        )
+        graduates = []
+        for record in records:
+            if record["masters"]:
+                if (
+                        record["masters_passed"] and
+                        (record["master_credits"] or 0) >= 120
+                ):
+                    graduates.append(record["student_id"])
+            elif record["bachelors"]:
+                if (
+                        record["bachelors_passed"] and
+                        (record["total_credits"] or 0) >= 240
+                ):
+                    graduates.append(record["student_id"])
+        return graduates
+
+    def _chunks(self, last_pk):
+        """
+        Yield chunks of active student ids after the given id.
+        :param last_pk: id to start after
+        """
+        while True:
+            student_ids = list(
+                User.objects.filter(
+                    is_active=True,
+                    role=1,
+                    pk__gt=last_pk
+                ).order_by("pk").values_list(
+                    "pk", flat=True
+                )[:self.chunk_size]
+            )
+            if not student_ids:
+                return
+            yield student_ids
+            last_pk = student_ids[-1]
+
+    def run(self):
+        """
+        Evaluate every active student and promote the graduates.
+        :return: dictionary with the processed count and graduate usernames
+        """
+        last_pk = 0
+        checkpoint = None
+        if not self.dry_run:
+            checkpoint, _ = BatchJobCheckpoint.objects.get_or_create(
+                name=self.checkpoint_name
+            )
+            last_pk = checkpoint.last_pk
+
+        processed = 0
+        graduate_ids = []
+        for student_ids in self._chunks(last_pk):
+            graduates = self._evaluate_chunk(student_ids)
+            graduate_ids.extend(graduates)
+            processed += len(student_ids)
+            if self.dry_run:
+                continue
+            with transaction.atomic():
+                if User.objects.filter(pk__in=graduates).update(role=5):
+                    # The roles were updated without sending
+                    # the User signals
+                    response_cache.bump("user")
+                checkpoint.last_pk = student_ids[-1]
+                checkpoint.save(update_fields=["last_pk", "updated_at"])
+
+        if checkpoint is not None:
+            # The run is complete, the next one starts from the beginning
+            checkpoint.delete()
+        return {
+            "processed": processed,
+            "graduates": list(
+                User.objects.filter(
+                    pk__in=graduate_ids
+                ).order_by("pk").values_list("username", flat=True)
+            ),
+            "dry_run": self.dry_run,
+        }
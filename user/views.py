@@ -1,8 +1,6 @@
 import os
-from django.core.cache import cache
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
-from django.views.decorators.vary import vary_on_cookie
+from celery.result import AsyncResult
+from django.urls import reverse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
@@ -11,14 +9,18 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from course.permissions import IsManagement, IsProfessorOrManagement
-from course.utils.grade_calculator import GradeCalculator
 from payment.permissions import IsStudentOrManagement
-from utils.helpers import get_semester
+from utils.exports import ExportMixin
+from utils.pagination import KeysetPagination
+from utils.response_cache import cache_response
 from .permissions import IsOwnProfessor, IsOwnStudentOrProfessor
 from .serializers import *
 from .permissions import IsOwnerOrManagement
-from course.models import Lecture
+from course.models import Lecture, AcademicSummary
+from .models import GoogleOAuthToken
 from .utils.google_calendar import GoogleCalendar
+from .utils.attendance_matrix import AttendanceMatrix
+from .tasks import create_calendar_events
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -37,6 +39,8 @@ class UserViewSet(viewsets.ModelViewSet):
     If the user is admin, return all users.
     """
     lookup_field = "username"
+    pagination_class = KeysetPagination
+    keyset_fields = ("date_joined", "id")
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ["role", "lectures", "courses"]
 
@@ -88,8 +92,7 @@ class UserViewSet(viewsets.ModelViewSet):
         else:
             return [IsOwnerOrManagement()]
 
-    @method_decorator(cache_page(60 * 10))
-    @method_decorator(vary_on_cookie)
+    @cache_response("user")
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
@@ -97,14 +100,11 @@ class UserViewSet(viewsets.ModelViewSet):
         instance = self.get_object()
         serializer = self.get_serializer(instance)
         response = serializer.data
-        # If the user is a student, calculate the GPA.
+        # If the user is a student, add the GPA from the academic summary.
         if instance.role in [1, 5]:
-            gpa_cache_key = f"gpa_{instance.username}"
-            gpa = cache.get(gpa_cache_key)
-            if gpa is None:
-                gpa = round(GradeCalculator(instance).calculate_gpa(), 2)
-                cache.set(gpa_cache_key, gpa, timeout=60 * 60)
-            response["gpa"] = gpa
+            summary = AcademicSummary.objects.for_student(instance)
+            response["gpa"] = summary.gpa
+            response["total_credits"] = summary.total_credits
         return Response(response)
 
     @action(methods=["post"],
@@ -162,7 +162,7 @@ class BlacklistTokenView(CreateAPIView):
         )
 
 
-class AttendanceViewSet(viewsets.ModelViewSet):
+class AttendanceViewSet(ExportMixin, viewsets.ModelViewSet):
     """
     A ViewSet for marking attendance.
 
@@ -175,12 +175,29 @@ class AttendanceViewSet(viewsets.ModelViewSet):
     students.
     """
     serializer_class = AttendanceSerializer
+    pagination_class = KeysetPagination
+    keyset_fields = ("date", "id")
+    export_fields = [
+        ('id', 'id'),
+        ('user', 'user__username'),
+        ('lecture', 'lecture__name'),
+        ('date', 'date'),
+        ('first_hour', 'first_hour'),
+        ('second_hour', 'second_hour'),
+        ('third_hour', 'third_hour'),
+    ]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['lecture__users', 'date', 'lecture']
     permission_classes = [IsAuthenticated]
 
+    def get_serializer_class(self):
+        if self.action == 'bulk':
+            return BulkAttendanceSerializer
+        return super().get_serializer_class()
+
     def get_permissions(self):
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy',
+                           'bulk', 'matrix']:
             return [IsOwnProfessor()]
         if self.action in ['retrieve']:
             return [IsOwnStudentOrProfessor()]
@@ -204,39 +221,100 @@ class AttendanceViewSet(viewsets.ModelViewSet):
             )
         return queryset.none()
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Mark the attendance of the whole lecture session at once.
+        Existing attendances of the day are overwritten.
+        """
+        serializer = BulkAttendanceSerializer(
+            data=request.data,
+            context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+        attendances = serializer.save()
+        return Response(
+            {'marked': len(attendances)},
+            status=status.HTTP_200_OK
+        )
+
+    @action(detail=False, methods=['get'])
+    def matrix(self, request):
+        """
+        Return the lecture's semester attendance as a student x date grid.
+        Requires the lecture query parameter.
+        """
+        lecture_id = request.query_params.get('lecture', '')
+        lecture = None
+        if lecture_id.isdigit():
+            lecture = Lecture.objects.select_related('semester').filter(
+                pk=lecture_id
+            ).first()
+        if lecture is None:
+            return Response(
+                {'message': 'Lecture not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        if request.user.role == 2 and lecture.professor_id != request.user.pk:
+            return Response(
+                {'message': 'You are not the professor of this lecture.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return Response(AttendanceMatrix(lecture).build())
+
 
 class CreateEventView(APIView):
     """
     A View for creating timetable in Google calendar.
+
+    The user is authorized here, and the events are created
+    by a Celery task. GET returns the progress of the user's
+    latest task.
     """
     permission_classes = [IsStudentOrManagement]
 
-    def get_queryset(self):
-        semester = get_semester()
-        return Lecture.objects.filter(
-            users=self.request.user,
-            semester=semester,
-        )
-
     def post(self, request):
         credentials_path = os.getenv("GOOGLE_CREDENTIALS_PATH")
 
         try:
-            google_calendar = GoogleCalendar(
-                request.user,
-                credentials_path
-            )
-            lectures = self.get_queryset()
-            created_events = google_calendar.create_events(lectures)
-            return Response(
-                {
-                    "message": "Events created successfully",
-                    "events": created_events
-                },
-                status=status.HTTP_200_OK
-            )
+            # Authorizes the user or refreshes the token
+            GoogleCalendar(request.user, credentials_path)
         except Exception as e:
             return Response(
                 {"message": f"Error creating events: {e}"},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        task = create_calendar_events.delay(request.user.pk)
+        # Kept with the token, so every web process finds the task
+        GoogleOAuthToken.objects.filter(
+            user=request.user
+        ).update(calendar_task_id=task.id)
+        return Response(
+            {
+                "message": "Events are being created",
+                "task_id": task.id,
+                "status_url": request.build_absolute_uri(
+                    reverse("user:create_event")
+                )
+            },
+            status=status.HTTP_202_ACCEPTED
+        )
+
+    def get(self, request):
+        task_id = GoogleOAuthToken.objects.filter(
+            user=request.user
+        ).values_list("calendar_task_id", flat=True).first()
+        if not task_id:
+            return Response(
+                {"message": "No events are being created"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        result = AsyncResult(task_id)
+        response = {"task_id": task_id, "status": result.state.lower()}
+        if result.state == "PROGRESS":
+            response.update(result.info)
+        elif result.successful():
+            response.update(result.result)
+        elif result.failed():
+            response["message"] = f"Error creating events: {result.result}"
+        return Response(response, status=status.HTTP_200_OK)
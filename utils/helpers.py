@@ -1,15 +1,76 @@
 import datetime
+import threading
 from course.models import Semester
 
 
+class SemesterResolver:
+    """
+    This class resolves the current semester and memoizes it
+    per process until the semester's end date.
+    The memoized semester is invalidated by the Semester
+    save/delete signals (see course.signals).
+    """
+    def __init__(self):
+        self._semester = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _is_current(self, semester, today):
+        """
+        This method checks if the memoized semester still covers today.
+        :param semester: Semester object
+        :param today: date
+        :return: bool
+        """
+        return (
+            semester is not None and
+            semester.start_date <= today <= semester.end_date
+        )
+
+    def resolve(self):
+        """
+        This method returns the current semester, querying the
+        database only when the memoized one is missing or expired.
+        :return: Semester object or None
+        """
+        today = datetime.datetime.now().date()
+        semester = self._semester
+        if self._is_current(semester, today):
+            self.hits += 1
+            return semester
+        with self._lock:
+            if self._is_current(self._semester, today):
+                self.hits += 1
+                return self._semester
+            self.misses += 1
+            self._semester = Semester.objects.filter(
+                start_date__lte=today,
+                end_date__gte=today
+            ).first()
+            return self._semester
+
+    def invalidate(self):
+        """
+        This method drops the memoized semester.
+        """
+        with self._lock:
+            self._semester = None
+
+    def stats(self):
+        """
+        This method returns the hit/miss counters.
+        :return: dictionary with hits and misses
+        """
+        return {"hits": self.hits, "misses": self.misses}
+
+
+semester_resolver = SemesterResolver()
+
+
 def get_semester():
     """
     This function returns the current semester.
     :return: Semester object
     """
-    now = datetime.datetime.now()
-    semester = Semester.objects.filter(
-        start_date__lte=now,
-        end_date__gte=now
-    ).first()
-    return semester
+    return semester_resolver.resolve()
@@ -0,0 +1,178 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    This class paginates the high volume lists.
+
+    By default it behaves like the global PageNumberPagination.
+    With ?pagination=keyset the pages are cut with a keyset condition
+    on the view's keyset_fields (created_at, id by default), newest
+    first, instead of an OFFSET. The next/previous links carry an
+    opaque cursor with the boundary row.
+
+    With ?count=false no COUNT(*) is run in either mode; one extra row
+    is fetched to know whether there is a next page.
+    """
+    mode_query_param = "pagination"
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    keyset_fields = ("created_at", "id")
+    invalid_cursor_message = "Invalid cursor"
+
+    def _flag(self, request, name):
+        return request.query_params.get(name, "").lower() not in [
+            "false", "0", "no"
+        ]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.with_count = self._flag(request, self.count_query_param)
+        self.keyset = (
+            request.query_params.get(self.mode_query_param) == "keyset" or
+            self.cursor_query_param in request.query_params
+        )
+        if self.keyset:
+            return self._paginate_keyset(queryset, request, view)
+        if self.with_count:
+            return super().paginate_queryset(queryset, request, view)
+        return self._paginate_without_count(queryset, request)
+
+    def get_paginated_response(self, data):
+        if not self.keyset and self.with_count:
+            return super().get_paginated_response(data)
+        response = OrderedDict()
+        if self.with_count:
+            response["count"] = self.count
+        response["next"] = self.get_next_link()
+        response["previous"] = self.get_previous_link()
+        response["results"] = data
+        return Response(response)
+
+    def get_next_link(self):
+        if not self.keyset and self.with_count:
+            return super().get_next_link()
+        return self.next_link
+
+    def get_previous_link(self):
+        if not self.keyset and self.with_count:
+            return super().get_previous_link()
+        return self.previous_link
+
+    # Page numbers without COUNT(*)
+
+    def _paginate_without_count(self, queryset, request):
+        page_size = self.get_page_size(request)
+        try:
+            page_number = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            page_number = 0
+        if page_number < 1:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number,
+                message="Invalid page."
+            ))
+        offset = (page_number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        url = request.build_absolute_uri()
+        self.next_link = None
+        self.previous_link = None
+        if len(rows) > page_size:
+            self.next_link = replace_query_param(
+                url,
+                self.page_query_param,
+                page_number + 1
+            )
+        if page_number == 2:
+            self.previous_link = remove_query_param(url, self.page_query_param)
+        elif page_number > 2:
+            self.previous_link = replace_query_param(
+                url,
+                self.page_query_param,
+                page_number - 1
+            )
+        return rows[:page_size]
+
+    # Keyset pages
+
+    def _fields(self, view):
+        return getattr(view, "keyset_fields", self.keyset_fields)
+
+    def _encode_cursor(self, row, fields, reverse):
+        values = [str(getattr(row, field)) for field in fields]
+        payload = json.dumps([values, reverse]).encode()
+        return base64.urlsafe_b64encode(payload).decode()
+
+    def _decode_cursor(self, cursor, fields, model):
+        try:
+            values, reverse = json.loads(base64.urlsafe_b64decode(cursor))
+            values = [
+                model._meta.get_field(field).to_python(value)
+                for field, value in zip(fields, values, strict=True)
+            ]
+        except (TypeError, ValueError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return values, bool(reverse)
+
+    @staticmethod
+    def _after(fields, values, reverse):
+        """
+        This method builds the keyset condition for the rows after the
+        boundary in the descending order, or before it if reverse.
+        (a, b) < (x, y) is written as a < x OR (a = x AND b < y).
+        """
+        lookup = "gt" if reverse else "lt"
+        condition = Q()
+        for i, field in enumerate(fields):
+            condition |= Q(
+                **{field: value for field, value in zip(fields[:i], values)},
+                **{f"{field}__{lookup}": values[i]}
+            )
+        return condition
+
+    def _paginate_keyset(self, queryset, request, view):
+        page_size = self.get_page_size(request)
+        fields = self._fields(view)
+        cursor = request.query_params.get(self.cursor_query_param)
+        reverse = False
+        if self.with_count:
+            self.count = queryset.count()
+        if cursor:
+            values, reverse = self._decode_cursor(
+                cursor,
+                fields,
+                queryset.model
+            )
+            queryset = queryset.filter(self._after(fields, values, reverse))
+        ordering = [field if reverse else f"-{field}" for field in fields]
+        rows = list(queryset.order_by(*ordering)[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        url = request.build_absolute_uri()
+        self.next_link = None
+        self.previous_link = None
+        if rows and (has_more or reverse):
+            self.next_link = replace_query_param(
+                url,
+                self.cursor_query_param,
+                self._encode_cursor(rows[-1], fields, False)
+            )
+        if rows and cursor and (has_more or not reverse):
+            self.previous_link = replace_query_param(
+                url,
+                self.cursor_query_param,
+                self._encode_cursor(rows[0], fields, True)
+            )
+        return rows
@@ -0,0 +1,150 @@
+import functools
+import hashlib
+import json
+import uuid
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import translation
+from rest_framework.response import Response
+from course.models import ResponseCacheVersion
+
+
+class ResponseCache:
+    """
+    This class caches the responses of the read only viewset actions.
+
+    The entries are keyed on the scope of the queryset rather than on
+    the user, so every user who sees the same queryset shares one entry
+    (e.g. all the students of a department).
+    Every entry also carries the version stamps of the namespaces it
+    depends on. The stamps are replaced by the model signals
+    (see course.signals), which makes the old entries unreachable.
+    The stamps are stored in the database, so a bump is seen by every
+    process. The entries are shared between the processes only if
+    CACHES points to a shared backend; with the default local memory
+    cache every process keeps its own entries.
+    """
+    key_prefix = "response_cache"
+    default_timeout = 60 * 10
+
+    @staticmethod
+    def scope(user):
+        """
+        This method returns the queryset scope of the user.
+        It mirrors the role branches of the cached viewsets' get_queryset.
+        :param user: User object
+        :return: str
+        """
+        if not user.is_authenticated:
+            return "anonymous"
+        role = getattr(user, "role", None)
+        if role in [1, 5]:
+            faculty = user.faculty
+            return f"department:{faculty.department_id if faculty else None}"
+        if role == 4:
+            return f"department:{user.department_id}"
+        if role == 2:
+            return f"professor:{user.pk}"
+        return "all"
+
+    @staticmethod
+    def _stamps(namespaces):
+        return dict(
+            ResponseCacheVersion.objects.filter(
+                namespace__in=namespaces
+            ).values_list("namespace", "stamp")
+        )
+
+    def versions(self, namespaces):
+        """
+        This method returns the current version stamps of the namespaces.
+        Missing stamps are created with a random value, so entries
+        cached before the stamp existed can never match again.
+        :param namespaces: List of namespace names
+        :return: List of stamps
+        """
+        stamps = self._stamps(namespaces)
+        missing = [
+            namespace for namespace in namespaces if namespace not in stamps
+        ]
+        if missing:
+            ResponseCacheVersion.objects.bulk_create(
+                [
+                    ResponseCacheVersion(
+                        namespace=namespace,
+                        stamp=uuid.uuid4().hex
+                    ) for namespace in missing
+                ],
+                ignore_conflicts=True
+            )
+            stamps.update(self._stamps(missing))
+        return [stamps[namespace] for namespace in namespaces]
+
+    def bump(self, *namespaces):
+        """
+        This method invalidates every entry of the namespaces.
+        It is deferred until the transaction commits, so that
+        the responses built from uncommitted data are dropped as well.
+        :param namespaces: Namespace names
+        """
+        def replace_stamps():
+            ResponseCacheVersion.objects.bulk_create(
+                [
+                    ResponseCacheVersion(
+                        namespace=namespace,
+                        stamp=uuid.uuid4().hex
+                    ) for namespace in namespaces
+                ],
+                update_conflicts=True,
+                unique_fields=["namespace"],
+                update_fields=["stamp", "updated_at"]
+            )
+        transaction.on_commit(replace_stamps)
+
+    def key(self, view, request, namespaces, kwargs):
+        """
+        This method builds the cache key of the request.
+        :param view: ViewSet object
+        :param request: Request
+        :param namespaces: List of namespace names
+        :param kwargs: URL keyword arguments
+        :return: str
+        """
+        parts = json.dumps(
+            [
+                self.scope(request.user),
+                translation.get_language(),
+                sorted(request.query_params.lists()),
+                sorted(kwargs.items()),
+                self.versions(namespaces),
+            ],
+            default=str
+        )
+        digest = hashlib.md5(parts.encode()).hexdigest()
+        return f"{self.key_prefix}:{view.basename}:{view.action}:{digest}"
+
+
+response_cache = ResponseCache()
+
+
+def cache_response(*namespaces, timeout=ResponseCache.default_timeout):
+    """
+    This decorator caches the successful responses of a viewset action.
+    The permissions are checked before the action is called,
+    so only the data is shared between the users of one scope.
+    :param namespaces: Namespaces the response depends on
+    :param timeout: Seconds to keep the response
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            key = response_cache.key(view, request, namespaces, kwargs)
+            data = cache.get(key)
+            if data is not None:
+                return Response(data)
+            response = method(view, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, timeout)
+            return response
+        return wrapper
+    return decorator